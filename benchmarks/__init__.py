@@ -0,0 +1 @@
+"""Benchmarks of the pyswtools package"""
@@ -0,0 +1,166 @@
+"""
+Generate a synthetic assembly for the fake backend to benchmark the solidworks commands.
+
+The assembly is a tree of sub assemblies: each assembly has a number of components, the
+sub assemblies of the next level and parts picked at random among a pool. The
+description of the documents is written to a json file, with an empty file for each
+document and drawing so the commands find them on the disk.
+"""
+
+import json
+import os
+import random
+from dataclasses import dataclass
+
+import click
+
+
+@dataclass
+class AssemblyOptions:
+    """
+    Class representing the parameters of a synthetic assembly
+    """
+
+    depth: int = 3
+    breadth: int = 10
+    assemblies: int = 5
+    parts: int = 200
+    configurations: int = 2
+    drawing_fraction: float = 0.5
+    suppressed_fraction: float = 0.02
+    latency: float = 0.0
+    seed: int = 0
+
+
+def count_components(options: AssemblyOptions) -> int:
+    """Get the number of component instances of the assembly"""
+    total, level = 0, 1
+    for depth in range(options.depth):
+        # The last level only contains parts
+        sub_assemblies = options.breadth // 2 if depth < options.depth - 1 else 0
+        total += level * options.breadth
+        level *= sub_assemblies
+    return total
+
+
+def generate_assembly(folder: str, options: AssemblyOptions) -> tuple[str, str]:
+    """
+    Write the description and the files of a synthetic assembly to folder.
+    Return the path to the description and to the main assembly.
+    """
+    rng = random.Random(options.seed)
+    documents = {}
+    drawings = {}
+
+    for idx in range(options.parts):
+        path = f"parts/Part_{idx}.SLDPRT"
+        configurations = [f"Conf_{conf}" for conf in range(options.configurations)]
+        documents[path] = {
+            "configurations": configurations,
+            "mass": {conf: round(rng.uniform(0.01, 5.0), 4) for conf in configurations},
+            "density": rng.choice([1000.0, 2700.0, 7800.0, 7850.0]),
+            "properties": {
+                configurations[0]: {
+                    "Material": {"type": 30, "value": "Steel"},
+                    "Reference": {"type": 30, "value": f"P{idx:05d}"},
+                }
+            },
+        }
+        if rng.random() < options.drawing_fraction:
+            drawings[f"drawings/Part_{idx}.SLDDRW"] = [path]
+
+    # Build the assemblies from the deepest level
+    children = []
+    for depth in reversed(range(options.depth)):
+        names = (
+            ["Main.SLDASM"]
+            if depth == 0
+            else [
+                f"assemblies/Asm_{depth}_{idx}.SLDASM"
+                for idx in range(options.assemblies)
+            ]
+        )
+        for name in names:
+            components = []
+            for idx in range(options.breadth):
+                if len(children) > 0 and idx < options.breadth // 2:
+                    path = rng.choice(children)
+                    component = {"path": f"../{path}" if depth > 0 else path}
+                else:
+                    part = f"parts/Part_{rng.randrange(options.parts)}.SLDPRT"
+                    component = {
+                        "path": f"../{part}" if depth > 0 else part,
+                        "configuration": f"Conf_{rng.randrange(options.configurations)}",
+                    }
+                if rng.random() < options.suppressed_fraction:
+                    component["suppressed"] = True
+                components.append(component)
+            documents[name] = {"components": components}
+        children = names
+
+    description = {
+        "latency": options.latency,
+        "documents": documents,
+        "drawings": drawings,
+    }
+    for path in [*documents, *drawings]:
+        full_path = os.path.join(folder, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "wb"):
+            pass
+
+    description_path = os.path.join(folder, "assembly.json")
+    with open(description_path, "w", encoding="utf8") as f:
+        json.dump(description, f, indent=1)
+    return description_path, os.path.join(folder, "Main.SLDASM")
+
+
+@click.command()
+@click.help_option("-h", "--help")
+@click.argument("folder", type=click.Path(file_okay=False))
+@click.option("--depth", "depth", type=click.IntRange(min=1), default=3)
+@click.option(
+    "--breadth",
+    "breadth",
+    type=click.IntRange(min=1),
+    default=10,
+    help="Number of components of each assembly, half of them being sub assemblies.",
+)
+@click.option(
+    "--assemblies",
+    "assemblies",
+    type=click.IntRange(min=1),
+    default=5,
+    help="Number of different sub assemblies at each level.",
+)
+@click.option("--parts", "parts", type=click.IntRange(min=1), default=200)
+@click.option(
+    "--configurations", "configurations", type=click.IntRange(min=1), default=2
+)
+@click.option("--latency", "latency", type=click.FloatRange(min=0), default=0.0)
+@click.option("--seed", "seed", type=int, default=0)
+# pylint: disable=too-many-arguments
+def generate(
+    folder, depth, breadth, assemblies, parts, configurations, latency, seed
+) -> None:
+    """
+    Generate a synthetic assembly for the fake backend
+    """
+    options = AssemblyOptions(
+        depth=depth,
+        breadth=breadth,
+        assemblies=assemblies,
+        parts=parts,
+        configurations=configurations,
+        latency=latency,
+        seed=seed,
+    )
+    description_path, main_path = generate_assembly(folder, options)
+    click.echo(
+        f"{count_components(options)} components written to {description_path}, "
+        f"main assembly {main_path}"
+    )
+
+
+if __name__ == "__main__":
+    generate()  # pylint: disable=no-value-for-parameter
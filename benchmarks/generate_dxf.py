@@ -0,0 +1,200 @@
+"""
+Generate synthetic dxf files to benchmark the ready_dxf module.
+
+The structure of the document (header, tables, nested blocks) is created with ezdxf.
+The bulk of the entities is then written as raw tags directly in the ENTITIES section,
+which allows to generate files of hundreds of megabytes without building them in memory.
+"""
+
+import io
+import random
+from dataclasses import dataclass
+
+import click
+import ezdxf
+
+SW_TEXT = "SOLIDWORKS Educational Product. For Instructional Use Only."
+
+# Number of entities written at once in the file
+CHUNK_SIZE = 10000
+
+# Average size of a raw entity in bytes, used to reach a target file size
+AVERAGE_ENTITY_SIZE = 150
+
+SIZE_UNITS = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+
+
+@dataclass
+class GeneratorOptions:
+    """
+    Class representing the parameters of a synthetic dxf file
+    """
+
+    entities: int = 1000
+    sw_fraction: float = 0.05
+    duplicate_fraction: float = 0.0
+    block_depth: int = 2
+    block_entities: int = 10
+    seed: int = 0
+
+
+def parse_size(size: str) -> int:
+    """Convert a size like 10K, 20M or 1G to a number of bytes"""
+    size = size.strip().upper().removesuffix("B")
+    unit = size[-1] if size[-1] in SIZE_UNITS else ""
+    return int(float(size[: len(size) - len(unit)]) * SIZE_UNITS[unit])
+
+
+def entities_for_size(size: int) -> int:
+    """Estimate the number of entities needed to reach a file size in bytes"""
+    return max(1, size // AVERAGE_ENTITY_SIZE)
+
+
+def build_base_doc(options: GeneratorOptions) -> ezdxf.document.Drawing:
+    """
+    Create a document with a chain of nested blocks referenced by the model space.
+    Each block contains lines, solidworks texts and a reference to the next block.
+    """
+    rng = random.Random(options.seed)
+    doc = ezdxf.new("R2010")
+    msp = doc.modelspace()
+
+    names = [f"BLOCK_{depth}" for depth in range(options.block_depth)]
+    for depth, name in enumerate(names):
+        bloc = doc.blocks.new(name)
+        for _ in range(options.block_entities):
+            if rng.random() < options.sw_fraction:
+                bloc.add_mtext(SW_TEXT)
+            else:
+                bloc.add_line(
+                    (rng.uniform(0, 100), rng.uniform(0, 100)),
+                    (rng.uniform(0, 100), rng.uniform(0, 100)),
+                )
+        if depth + 1 < len(names):
+            bloc.add_blockref(names[depth + 1], (rng.uniform(0, 10), 0))
+
+    if len(names) > 0:
+        msp.add_blockref(names[0], (0, 0))
+    return doc
+
+
+def raw_entity(rng: random.Random, owner: str, sw_fraction: float) -> tuple[str, str]:
+    """
+    Write the tags of a random LINE, ARC, CIRCLE or solidworks MTEXT without its handle.
+    Return the type and the tags.
+    """
+    head = f"330\n{owner}\n100\nAcDbEntity\n  8\n0\n"
+    x, y = rng.uniform(0, 1000), rng.uniform(0, 1000)
+    if rng.random() < sw_fraction:
+        return "MTEXT", (
+            head
+            + f"100\nAcDbMText\n 10\n{x:.6f}\n 20\n{y:.6f}\n 30\n0.0\n"
+            + f" 40\n2.5\n 71\n1\n  1\n{SW_TEXT}\n"
+        )
+
+    kind = rng.random()
+    if kind < 0.6:
+        return "LINE", (
+            head
+            + f"100\nAcDbLine\n 10\n{x:.6f}\n 20\n{y:.6f}\n 30\n0.0\n"
+            + f" 11\n{x + rng.uniform(-50, 50):.6f}\n"
+            + f" 21\n{y + rng.uniform(-50, 50):.6f}\n 31\n0.0\n"
+        )
+    circle = (
+        f"100\nAcDbCircle\n 10\n{x:.6f}\n 20\n{y:.6f}\n 30\n0.0\n"
+        + f" 40\n{rng.uniform(1, 20):.6f}\n"
+    )
+    if kind < 0.8:
+        return "CIRCLE", head + circle
+    return "ARC", (
+        head
+        + circle
+        + f"100\nAcDbArc\n 50\n{rng.uniform(0, 360):.6f}\n"
+        + f" 51\n{rng.uniform(0, 360):.6f}\n"
+    )
+
+
+def generate_dxf(path: str, options: GeneratorOptions) -> int:
+    """
+    Write a synthetic dxf file to path and return its size in bytes.
+    The raw entities are spliced at the end of the ENTITIES section and the $HANDSEED
+    of the header is moved after their handles.
+    """
+    doc = build_base_doc(options)
+    owner = doc.modelspace().layout_key
+    stream = io.StringIO()
+    doc.write(stream)
+    text = stream.getvalue()
+
+    # ezdxf writes the next free handle, the raw entities take the following ones
+    seed_start = text.index("$HANDSEED\n  5\n") + len("$HANDSEED\n  5\n")
+    seed_end = text.index("\n", seed_start)
+    first_handle = int(text[seed_start:seed_end], 16)
+    text = text[:seed_start] + f"{first_handle + options.entities:X}" + text[seed_end:]
+    splice = text.index("  0\nENDSEC\n", text.index("  2\nENTITIES\n"))
+
+    rng = random.Random(options.seed + 1)
+    recent = []
+    with open(path, "w", encoding="utf8", newline="\n") as f:
+        f.write(text[:splice])
+        for chunk_start in range(0, options.entities, CHUNK_SIZE):
+            chunk = []
+            for handle in range(
+                first_handle + chunk_start,
+                first_handle + min(chunk_start + CHUNK_SIZE, options.entities),
+            ):
+                if len(recent) > 0 and rng.random() < options.duplicate_fraction:
+                    # Same geometry as a recent entity, only the handle changes
+                    dxftype, tags = rng.choice(recent)
+                else:
+                    dxftype, tags = raw_entity(rng, owner, options.sw_fraction)
+                    recent.append((dxftype, tags))
+                    if len(recent) > 100:
+                        recent.pop(0)
+                chunk.append(f"  0\n{dxftype}\n  5\n{handle:X}\n{tags}")
+            f.write("".join(chunk))
+        f.write(text[splice:])
+        return f.tell()
+
+
+@click.command()
+@click.help_option("-h", "--help")
+@click.argument("output_path", type=click.Path(dir_okay=False))
+@click.option("--entities", "entities", type=click.IntRange(min=0), default=None)
+@click.option(
+    "--size",
+    "size",
+    default=None,
+    help="Target size of the file like 10K or 200M, overrides --entities.",
+)
+@click.option("--sw-fraction", "sw_fraction", type=click.FloatRange(0, 1), default=0.05)
+@click.option(
+    "--duplicate-fraction",
+    "duplicate_fraction",
+    type=click.FloatRange(0, 1),
+    default=0.0,
+)
+@click.option("--block-depth", "block_depth", type=click.IntRange(min=0), default=2)
+@click.option("--seed", "seed", type=int, default=0)
+# pylint: disable=too-many-arguments
+def generate(
+    output_path, entities, size, sw_fraction, duplicate_fraction, block_depth, seed
+) -> None:
+    """
+    Generate a synthetic dxf file
+    """
+    if size is not None:
+        entities = entities_for_size(parse_size(size))
+    options = GeneratorOptions(
+        entities=1000 if entities is None else entities,
+        sw_fraction=sw_fraction,
+        duplicate_fraction=duplicate_fraction,
+        block_depth=block_depth,
+        seed=seed,
+    )
+    written = generate_dxf(output_path, options)
+    click.echo(f"{output_path}: {options.entities} entities, {written} bytes")
+
+
+if __name__ == "__main__":
+    generate()  # pylint: disable=no-value-for-parameter
@@ -0,0 +1,25 @@
+"""
+Create the solidworks files of a recorded session as empty files, so the commands find
+them on the disk when the trace is replayed from folder.
+"""
+
+import click
+
+from pyswtools.backends import ReplayBackend
+
+
+@click.command()
+@click.help_option("-h", "--help")
+@click.argument("trace_path", type=click.Path(exists=True, dir_okay=False))
+@click.argument("folder", type=click.Path(file_okay=False))
+def replay_files(trace_path, folder) -> None:
+    """
+    Create the solidworks files of a trace under folder
+    """
+    backend = ReplayBackend(trace_path)
+    created = backend.create_files(folder)
+    click.echo(f"{created} files created under {folder}")
+
+
+if __name__ == "__main__":
+    replay_files()  # pylint: disable=no-value-for-parameter
@@ -0,0 +1,328 @@
+"""
+Run the benchmarks of the ready_dxf module on synthetic dxf files.
+
+For each size, a folder of synthetic files is generated once, then each benchmark is run
+several times on it. Only the step being measured is timed, the loading of the documents
+is excluded when a benchmark works on a document already in memory.
+The results are written to a json file which can be compared with the one of a previous
+version with --compare.
+"""
+
+import json
+import os
+import platform
+import shutil
+import statistics
+import tempfile
+import time
+from dataclasses import dataclass, asdict, field
+from datetime import datetime
+from importlib import metadata
+
+import click
+import ezdxf
+
+from pyswtools.ready_dxf.batch_utilities import clean_folder
+from pyswtools.ready_dxf.definitions import CleanOptions
+from pyswtools.ready_dxf.dxf_utilities import check_file_and_folder, clean, remove_sw
+from pyswtools.ready_dxf.rule_utilities import RULES
+from pyswtools.ready_dxf.stats_utilities import stats_batch
+from pyswtools.ready_dxf.stream_utilities import stream_clean
+
+from .generate_dxf import (
+    GeneratorOptions,
+    entities_for_size,
+    generate_dxf,
+    parse_size,
+)
+
+BENCHMARKS = {}
+
+
+def register_benchmark(func):
+    """Add a benchmark to the registry of benchmarks"""
+    BENCHMARKS[func.__name__.removeprefix("bench_")] = func
+    return func
+
+
+@dataclass
+class BenchmarkCase:
+    """
+    Class representing the synthetic files a benchmark is run on
+    """
+
+    folder: str
+    save_folder: str
+    paths: list[str]
+    jobs: int = 0
+
+
+@dataclass
+class BenchmarkResult:
+    """
+    Class representing the timings of a benchmark for a size of file
+    """
+
+    name: str
+    size: str
+    files: int
+    entities: int
+    bytes: int
+    times: list[float] = field(default_factory=list)
+
+    def dict(self):
+        """
+        Convert the class to a dict structure
+        """
+        data = asdict(self)
+        data["min"] = min(self.times)
+        data["median"] = statistics.median(self.times)
+        return data
+
+
+def time_call(func, *args) -> float:
+    """Get the time spent to call func"""
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def load_docs(case: BenchmarkCase) -> list[ezdxf.document.Drawing]:
+    """Load all the files of a case"""
+    return [ezdxf.readfile(path) for path in case.paths]
+
+
+@register_benchmark
+def bench_check_file_and_folder(case: BenchmarkCase) -> float:
+    """Load, clean and save the folder with ezdxf"""
+    return time_call(check_file_and_folder, case.folder, case.save_folder)
+
+
+@register_benchmark
+def bench_remove_sw(case: BenchmarkCase) -> float:
+    """Remove the solidworks texts of documents already loaded"""
+    docs = load_docs(case)
+    return sum(time_call(remove_sw, doc) for doc in docs)
+
+
+@register_benchmark
+def bench_rules(case: BenchmarkCase) -> float:
+    """Apply all the cleaning rules to documents already loaded"""
+    options = CleanOptions(rules=list(RULES))
+    docs = load_docs(case)
+    return sum(time_call(clean, doc, options) for doc in docs)
+
+
+@register_benchmark
+def bench_merge_duplicates(case: BenchmarkCase) -> float:
+    """Merge the duplicate segments of documents already loaded"""
+    options = CleanOptions(merge_duplicates=True)
+    docs = load_docs(case)
+    return sum(time_call(clean, doc, options) for doc in docs)
+
+
+@register_benchmark
+def bench_optimize_path(case: BenchmarkCase) -> float:
+    """Order the cuts of documents already loaded"""
+    options = CleanOptions(optimize_path=True)
+    docs = load_docs(case)
+    return sum(time_call(clean, doc, options) for doc in docs)
+
+
+@register_benchmark
+def bench_stream(case: BenchmarkCase) -> float:
+    """Clean the files with the stream engine"""
+    return sum(
+        time_call(stream_clean, path, os.path.join(case.save_folder, f"{idx}.dxf"))
+        for idx, path in enumerate(case.paths)
+    )
+
+
+@register_benchmark
+def bench_clean_folder(case: BenchmarkCase) -> float:
+    """Clean the folder with a single process"""
+    return time_call(
+        lambda: list(clean_folder(case.folder, case.save_folder, jobs=1, force=True))
+    )
+
+
+@register_benchmark
+def bench_clean_folder_parallel(case: BenchmarkCase) -> float:
+    """Clean the folder with a pool of processes"""
+    return time_call(
+        lambda: list(
+            clean_folder(case.folder, case.save_folder, jobs=case.jobs, force=True)
+        )
+    )
+
+
+@register_benchmark
+def bench_stats(case: BenchmarkCase) -> float:
+    """Measure the files with a pool of processes"""
+    return time_call(lambda: list(stats_batch(case.paths, case.jobs)))
+
+
+def generate_case(
+    root: str, size: str, files: int, options: GeneratorOptions
+) -> tuple[BenchmarkCase, int]:
+    """
+    Generate the files of a size in their own folder.
+    Return the case and the total number of bytes.
+    """
+    folder = os.path.join(root, size)
+    os.makedirs(folder)
+    paths = []
+    written = 0
+    for idx in range(files):
+        path = os.path.join(folder, f"part_{idx}.dxf")
+        options.seed = idx
+        written += generate_dxf(path, options)
+        paths.append(path)
+    return BenchmarkCase(folder, os.path.join(root, f"{size}_cleaned"), paths), written
+
+
+def compare_results(results: list[dict], previous_path: str) -> list[str]:
+    """
+    Compare the median times with the ones of a previous run.
+    A ratio above 1 means that the benchmark is slower.
+    """
+    with open(previous_path, encoding="utf8") as f:
+        previous = {
+            (result["name"], result["size"]): result
+            for result in json.load(f)["results"]
+        }
+
+    lines = []
+    for result in results:
+        old = previous.get((result["name"], result["size"]))
+        if old is None:
+            continue
+        ratio = result["median"] / old["median"] if old["median"] > 0 else float("inf")
+        lines.append(
+            f"{result['name']:>24} {result['size']:>6}: "
+            f"{old['median']:.3f}s -> {result['median']:.3f}s (x{ratio:.2f})"
+        )
+    return lines
+
+
+def get_version() -> str:
+    """Get the version of the installed package"""
+    try:
+        return metadata.version("pyswtools")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+@click.command()
+@click.help_option("-h", "--help")
+@click.option(
+    "--sizes",
+    "sizes",
+    default="10K,1M,20M",
+    help="Comma separated sizes of the files, like 10K,1M,200M.",
+)
+@click.option("--files", "files", type=click.IntRange(min=1), default=4)
+@click.option(
+    "--benchmarks",
+    "names",
+    default=",".join(BENCHMARKS),
+    help="Comma separated benchmarks to run.",
+)
+@click.option("--repeat", "repeat", type=click.IntRange(min=1), default=3)
+@click.option("--jobs", "jobs", type=click.IntRange(min=0), default=0)
+@click.option("--sw-fraction", "sw_fraction", type=click.FloatRange(0, 1), default=0.05)
+@click.option(
+    "--duplicate-fraction",
+    "duplicate_fraction",
+    type=click.FloatRange(0, 1),
+    default=0.05,
+)
+@click.option("--block-depth", "block_depth", type=click.IntRange(min=0), default=2)
+@click.option(
+    "--output",
+    "-o",
+    "output_path",
+    type=click.Path(dir_okay=False),
+    default="benchmark_results.json",
+)
+@click.option(
+    "--compare",
+    "compare_path",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="Results of a previous run to compare with.",
+)
+# pylint: disable=too-many-arguments,too-many-locals
+def run(
+    sizes,
+    files,
+    names,
+    repeat,
+    jobs,
+    sw_fraction,
+    duplicate_fraction,
+    block_depth,
+    output_path,
+    compare_path,
+) -> None:
+    """
+    Run the benchmarks of the ready_dxf module
+    """
+    names = [name.strip() for name in names.split(",") if name.strip() != ""]
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if len(unknown) > 0:
+        raise click.UsageError(
+            f"Unknown benchmarks: {', '.join(unknown)}. "
+            f"Available benchmarks: {', '.join(BENCHMARKS)}"
+        )
+
+    results = []
+    root = tempfile.mkdtemp(prefix="pyswtools_bench_")
+    try:
+        for size in sizes.split(","):
+            size = size.strip()
+            options = GeneratorOptions(
+                entities=entities_for_size(parse_size(size)),
+                sw_fraction=sw_fraction,
+                duplicate_fraction=duplicate_fraction,
+                block_depth=block_depth,
+            )
+            case, written = generate_case(root, size, files, options)
+            case.jobs = jobs
+            for name in names:
+                result = BenchmarkResult(
+                    name, size, files, options.entities * files, written
+                )
+                for _ in range(repeat):
+                    shutil.rmtree(case.save_folder, ignore_errors=True)
+                    os.makedirs(case.save_folder)
+                    result.times.append(BENCHMARKS[name](case))
+                results.append(result.dict())
+                click.echo(
+                    f"{name:>24} {size:>6}: {results[-1]['median']:.3f}s "
+                    f"(min {results[-1]['min']:.3f}s)"
+                )
+            shutil.rmtree(case.folder)
+            shutil.rmtree(case.save_folder, ignore_errors=True)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    data = {
+        "version": get_version(),
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "ezdxf": ezdxf.__version__,
+        "results": results,
+    }
+    with open(output_path, "w", encoding="utf8") as f:
+        json.dump(data, f, indent=2)
+    click.echo(f"Results written to {output_path}")
+
+    if compare_path is not None:
+        click.echo("\n".join(compare_results(results, compare_path)))
+
+
+if __name__ == "__main__":
+    run()  # pylint: disable=no-value-for-parameter
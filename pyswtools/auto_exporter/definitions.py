@@ -0,0 +1,44 @@
+"""Definitions shared by the auto_exporter module"""
+
+from enum import Enum
+from dataclasses import dataclass
+
+
+class MeshFormat(str, Enum):
+    """Class representing the indexed formats of the welded meshes"""
+
+    PLY = "ply"
+    THREEMF = "3mf"
+
+
+@dataclass
+class ExportOptions:
+    """
+    Class representing the options of the export
+    """
+
+    weld_format: MeshFormat | None = None
+    weld_tolerance: float = 1e-5
+    keep_stl: bool = True
+
+
+@dataclass
+class WeldResult:
+    """
+    Class representing the result of the welding of a STL file
+    """
+
+    path: str
+    triangles: int
+    vertices_before: int
+    vertices_after: int
+    stl_size: int
+    output_size: int
+    degenerate: int = 0
+
+    @property
+    def reduction(self) -> float:
+        """Size saved by the indexed mesh relatively to the STL"""
+        if self.stl_size == 0:
+            return 0.0
+        return 1 - self.output_size / self.stl_size
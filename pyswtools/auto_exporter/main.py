@@ -3,37 +3,29 @@ Auto export of solidworks files to other extensions
 """
 
 import os
-import math
 import click
 
 # pylint: disable=relative-beyond-top-level
-from ..utils import check_system, check_system_verbose
+from ..utils import check_system_verbose
 from ..config import get_config
-
-if check_system():
-    # pylint: disable=import-error
-    import win32com.client
-    import pythoncom
-
-    Views = []
-    VT_Views = win32com.client.VARIANT(pythoncom.VT_VARIANT, Views)
-    VT_BYREF = win32com.client.VARIANT(pythoncom.VT_BYREF | pythoncom.VT_I4, -1)
-
-    from stl import mesh
+from ..helper_sw import get_byref_int, get_views, open_app
+from .definitions import ExportOptions, MeshFormat
+from .mesh_utilities import weld_stl
+from .stl_utilities import rotate_stl
 
 
 def open_active_sw_file(sw_app, path, filename):
     """
     Open a sw part file and focus it
     """
-    sw_doc = sw_app.OpenDoc6(path, 1, 1, "", VT_BYREF, VT_BYREF)
+    sw_doc = sw_app.OpenDoc6(path, 1, 1, "", get_byref_int(), get_byref_int())
 
-    sw_app.ActivateDoc3(filename, True, 2, VT_BYREF)
+    sw_app.ActivateDoc3(filename, True, 2, get_byref_int())
 
     return sw_doc
 
 
-def export_stl(sw_doc, path, output_filename):
+def export_stl(sw_doc, path, output_filename, options):
     """
     Export the current doc to a STL file
     """
@@ -42,16 +34,18 @@ def export_stl(sw_doc, path, output_filename):
     click.echo(stl_path)
     sw_doc.SaveAs3(stl_path, 0, 2)
 
-    my_mesh = mesh.Mesh.from_file(stl_path, True)
-    my_mesh.rotate(
-        [
-            1.0,
-            0.0,
-            0.0,
-        ],
-        math.radians(-90),
-    )
-    my_mesh.save(stl_path)
+    # Solidworks exports with Y up, rotate the file in place to have Z up
+    rotate_stl(stl_path)
+
+    if options.weld_format is not None:
+        result = weld_stl(
+            stl_path, options.weld_format, options.weld_tolerance, options.keep_stl
+        )
+        click.echo(
+            f"  {result.path}: {result.vertices_before} -> {result.vertices_after} "
+            f"vertices, {result.stl_size} -> {result.output_size} bytes "
+            f"({result.reduction:.1%} smaller)"
+        )
 
 
 def export_dxf(sw_doc, path, output_filename, curr_filename):
@@ -110,7 +104,7 @@ def export_dxf(sw_doc, path, output_filename, curr_filename):
         False,
         False,
         0,
-        VT_Views,
+        get_views(),
     )
     if ret:
         click.echo("  Ok")
@@ -118,7 +112,7 @@ def export_dxf(sw_doc, path, output_filename, curr_filename):
         click.echo("  Could not save the selection")
 
 
-def export_file(sw_doc, paths, filename, mode):
+def export_file(sw_doc, paths, filename, mode, options):
     """
     Export the file sw_doc corresponding to the current mode
     """
@@ -144,7 +138,7 @@ def export_file(sw_doc, paths, filename, mode):
             click.echo(f"  - {sw_conf}")
 
         if file_mode == "STL":
-            export_stl(sw_doc, paths["stl_path"], output_filename)
+            export_stl(sw_doc, paths["stl_path"], output_filename, options)
         elif file_mode == "DXF":
             export_dxf(sw_doc, paths["dxf_path"], output_filename, filename)
 
@@ -153,13 +147,32 @@ def export_file(sw_doc, paths, filename, mode):
 @click.help_option("-h", "--help")
 @click.argument("input_path", type=click.Path(exists=True, file_okay=False))
 @click.argument("mode", type=click.Choice(["Auto", "STL", "DXF"]))
-def auto_export(input_path, mode) -> None:
+@click.option(
+    "--weld",
+    "weld_format",
+    type=click.Choice(MeshFormat),
+    default=None,
+    help="Weld the duplicate vertices of the STL files and save them in this indexed format.",
+)
+@click.option(
+    "--weld-tolerance",
+    "weld_tolerance",
+    type=click.FloatRange(min=0, min_open=True),
+    default=None,
+    help="Distance under which the vertices are welded. Default from the config.",
+)
+@click.option(
+    "--keep-stl/--no-keep-stl",
+    "keep_stl",
+    default=True,
+    help="Keep the STL files next to the welded meshes.",
+)
+def auto_export(input_path, mode, weld_format, weld_tolerance, keep_stl) -> None:
     """
     Export a part or a directory of part to other extensions
     """
     if not check_system_verbose():
-        pass
-        # return
+        return
 
     # Prepare folder
     # TODO create only the one needed ?
@@ -175,11 +188,14 @@ def auto_export(input_path, mode) -> None:
         os.mkdir(paths["stl_path"])
 
     conf = get_config()
-
-    sw_app = win32com.client.Dispatch(
-        f"SldWorks.Application.{(int(conf.sw_version)-2012+20)}"
+    options = ExportOptions(
+        weld_format,
+        weld_tolerance if weld_tolerance is not None else conf.stl_weld_tolerance,
+        keep_stl,
     )
 
+    sw_app = open_app()
+
     for root, _, files in os.walk(input_path):
         if "/STL" in root or "/DXF" in root:
             continue
@@ -191,7 +207,7 @@ def auto_export(input_path, mode) -> None:
                 continue
 
             sw_doc = open_active_sw_file(sw_app, curr_path, file)
-            export_file(sw_doc, paths, file, mode)
+            export_file(sw_doc, paths, file, mode, options)
 
             sw_app.CloseDoc(file)
             # TODO close the file if not pen initially
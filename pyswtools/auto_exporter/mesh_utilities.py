@@ -0,0 +1,153 @@
+"""
+Module to weld the vertices of the STL files and save them as indexed meshes.
+
+A STL stores the 3 vertices of each triangle, so a vertex shared by several triangles is
+written several times. The coordinates are rounded to a grid of the weld tolerance and the
+vertices falling in the same cell are replaced by a single one with np.unique. The
+triangles then only store the indices of their vertices in a PLY or 3MF file.
+"""
+
+import os
+import zipfile
+
+import numpy as np
+
+from .definitions import MeshFormat, WeldResult
+from .stl_utilities import HEADER_SIZE, TRIANGLE_DTYPE, is_binary_stl
+
+# Number of vertices or triangles formatted at once in a 3MF file. The coordinates are
+# written with 9 digits to keep the exact float32 values
+WRITE_CHUNK_SIZE = 1 << 16
+
+CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="model" ContentType="application/vnd.ms-package.3dmanufacturing-3dmodel+xml"/>
+</Types>
+"""
+
+RELATIONSHIPS = """<?xml version="1.0" encoding="UTF-8"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Target="/3D/3dmodel.model" Id="rel0" Type="http://schemas.microsoft.com/3dmanufacturing/2013/01/3dmodel"/>
+</Relationships>
+"""
+
+
+def read_vertices(path: str) -> np.ndarray:
+    """Read the vertices of the triangles of a STL file as an array (triangles * 3, 3)"""
+    if is_binary_stl(path):
+        triangles = np.fromfile(path, dtype=TRIANGLE_DTYPE, offset=HEADER_SIZE)
+        return triangles["data"][:, 3:].reshape(-1, 3)
+
+    vertices = []
+    with open(path, "rb") as f:
+        for line in f:
+            words = line.split()
+            if len(words) == 4 and words[0] == b"vertex":
+                vertices.append([float(word) for word in words[1:]])
+    return np.array(vertices, dtype=np.float32).reshape(-1, 3)
+
+
+def weld(vertices: np.ndarray, tolerance: float) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Merge the vertices in the same cell of a grid of size tolerance.
+    Return the welded vertices and the faces (triangles, 3) of indices, without the
+    triangles collapsed by the welding.
+    """
+    cells = np.round(vertices / tolerance).astype(np.int64)
+    # Compare the 3 coordinates of a cell as a single value
+    keys = np.ascontiguousarray(cells).view(np.dtype((np.void, 24))).ravel()
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    faces = inverse.reshape(-1, 3).astype(np.int32)
+    valid = (
+        (faces[:, 0] != faces[:, 1])
+        & (faces[:, 1] != faces[:, 2])
+        & (faces[:, 0] != faces[:, 2])
+    )
+    return vertices[first], faces[valid]
+
+
+def write_ply(vertices: np.ndarray, faces: np.ndarray, path: str) -> None:
+    """Write an indexed mesh to a binary PLY file"""
+    header = (
+        "ply\n"
+        "format binary_little_endian 1.0\n"
+        f"element vertex {len(vertices)}\n"
+        "property float x\n"
+        "property float y\n"
+        "property float z\n"
+        f"element face {len(faces)}\n"
+        "property list uchar int vertex_indices\n"
+        "end_header\n"
+    )
+    records = np.empty(len(faces), dtype=[("count", "u1"), ("indices", "<i4", (3,))])
+    records["count"] = 3
+    records["indices"] = faces
+    with open(path, "wb") as f:
+        f.write(header.encode("ascii"))
+        f.write(vertices.astype("<f4").tobytes())
+        f.write(records.tobytes())
+
+
+def write_3mf(vertices: np.ndarray, faces: np.ndarray, path: str) -> None:
+    """Write an indexed mesh to a 3MF file. The units of the STL are kept as mm."""
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", CONTENT_TYPES)
+        archive.writestr("_rels/.rels", RELATIONSHIPS)
+        with archive.open("3D/3dmodel.model", "w") as f:
+            f.write(
+                b'<?xml version="1.0" encoding="UTF-8"?>\n'
+                b'<model unit="millimeter" xml:lang="en-US" '
+                b'xmlns="http://schemas.microsoft.com/3dmanufacturing/core/2015/02">\n'
+                b'<resources>\n<object id="1" type="model">\n<mesh>\n<vertices>\n'
+            )
+            for start in range(0, len(vertices), WRITE_CHUNK_SIZE):
+                chunk = vertices[start : start + WRITE_CHUNK_SIZE].tolist()
+                f.write(
+                    "".join(
+                        f'<vertex x="{x:.9g}" y="{y:.9g}" z="{z:.9g}"/>\n'
+                        for x, y, z in chunk
+                    ).encode("ascii")
+                )
+            f.write(b"</vertices>\n<triangles>\n")
+            for start in range(0, len(faces), WRITE_CHUNK_SIZE):
+                chunk = faces[start : start + WRITE_CHUNK_SIZE].tolist()
+                f.write(
+                    "".join(
+                        f'<triangle v1="{a}" v2="{b}" v3="{c}"/>\n' for a, b, c in chunk
+                    ).encode("ascii")
+                )
+            f.write(
+                b"</triangles>\n</mesh>\n</object>\n</resources>\n"
+                b'<build>\n<item objectid="1"/>\n</build>\n</model>\n'
+            )
+
+
+def weld_stl(
+    stl_path: str, mesh_format: MeshFormat, tolerance: float, keep_stl: bool = True
+) -> WeldResult:
+    """
+    Weld the vertices of a STL file and save the mesh next to it in the indexed format.
+    The STL file is removed if keep_stl is False.
+    """
+    vertices = read_vertices(stl_path)
+    welded, faces = weld(vertices, tolerance)
+
+    output_path = f"{os.path.splitext(stl_path)[0]}.{mesh_format.value}"
+    if mesh_format is MeshFormat.PLY:
+        write_ply(welded, faces, output_path)
+    else:
+        write_3mf(welded, faces, output_path)
+
+    result = WeldResult(
+        output_path,
+        len(faces),
+        len(vertices),
+        len(welded),
+        os.path.getsize(stl_path),
+        os.path.getsize(output_path),
+        len(vertices) // 3 - len(faces),
+    )
+    if not keep_stl:
+        os.remove(stl_path)
+    return result
@@ -0,0 +1,115 @@
+"""
+Module to transform the STL files written by solidworks in place.
+
+A binary STL is a header of 80 bytes, the number of triangles and a record of 50 bytes per
+triangle: the normal and the 3 vertices as 12 float32 followed by an uint16 attribute. The
+file is memory mapped and rotated a chunk at a time, so the memory used does not depend
+on the size of the mesh. An ASCII STL is rewritten line by line.
+"""
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+HEADER_SIZE = 84
+TRIANGLE_DTYPE = np.dtype([("data", "<f4", (12,)), ("attr", "<u2")])
+
+# Number of triangles mapped and rotated at once
+CHUNK_SIZE = 1 << 16
+
+
+def is_binary_stl(path: str) -> bool:
+    """
+    Return True if the file is a binary STL. The size of a binary STL is given by its
+    number of triangles, an ASCII STL starts with solid but a binary header can too.
+    """
+    size = os.path.getsize(path)
+    if size < HEADER_SIZE:
+        return False
+    with open(path, "rb") as f:
+        f.seek(80)
+        count = int(np.frombuffer(f.read(4), dtype="<u4")[0])
+    return size == HEADER_SIZE + count * TRIANGLE_DTYPE.itemsize
+
+
+def rotate_points(points: np.ndarray) -> np.ndarray:
+    """
+    Turn points (..., 3) from the Y up axes of solidworks to Z up: (x, y, z) becomes
+    (x, -z, y). It is the rotation of numpy-stl rotate([1, 0, 0], radians(-90)).
+    """
+    return np.stack([points[..., 0], -points[..., 2], points[..., 1]], axis=-1)
+
+
+def rotate_binary_stl(path: str) -> int:
+    """
+    Rotate the normals and the vertices of a binary STL in place.
+    Return the number of triangles.
+    """
+    with open(path, "rb") as f:
+        f.seek(80)
+        count = int(np.frombuffer(f.read(4), dtype="<u4")[0])
+
+    for start in range(0, count, CHUNK_SIZE):
+        # Map a chunk at a time so its pages are released once written
+        triangles = np.memmap(
+            path,
+            dtype=TRIANGLE_DTYPE,
+            mode="r+",
+            offset=HEADER_SIZE + start * TRIANGLE_DTYPE.itemsize,
+            shape=(min(CHUNK_SIZE, count - start),),
+        )
+        data = triangles["data"]
+        # The normal and the 3 vertices are rotated the same way
+        data[:] = rotate_points(data.reshape(-1, 4, 3)).reshape(-1, 12)
+        triangles.flush()
+        del triangles, data
+    return count
+
+
+def rotate_line(line: bytes) -> bytes:
+    """Rotate the vector of a facet normal or vertex line of an ASCII STL"""
+    words = line.split()
+    if len(words) == 4 and words[0] == b"vertex":
+        prefix = b"vertex"
+    elif len(words) == 5 and words[:2] == [b"facet", b"normal"]:
+        prefix = b"facet normal"
+    else:
+        return line
+    indent = line[: len(line) - len(line.lstrip())]
+    x, y, z = rotate_points(np.array([float(word) for word in words[-3:]]))
+    return indent + prefix + b" %e %e %e\n" % (x, y, z)
+
+
+def rotate_ascii_stl(path: str) -> int:
+    """
+    Rotate the normals and the vertices of an ASCII STL by rewriting it line by line.
+    Return the number of triangles.
+    """
+    count = 0
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp"
+    )
+    try:
+        with open(path, "rb") as input_stream, os.fdopen(fd, "wb") as output_stream:
+            for line in input_stream:
+                if line.lstrip().startswith(b"facet"):
+                    count += 1
+                output_stream.write(rotate_line(line))
+        shutil.copymode(path, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return count
+
+
+def rotate_stl(path: str) -> int:
+    """
+    Turn a STL file written by solidworks from Y up to Z up in place.
+    Return the number of triangles.
+    """
+    if is_binary_stl(path):
+        return rotate_binary_stl(path)
+    return rotate_ascii_stl(path)
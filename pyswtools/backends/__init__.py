@@ -0,0 +1,51 @@
+"""
+Backends used to reach solidworks. The commands use the current backend, chosen with the
+--backend option of the CLI: the COM backend on Windows, the fake backend which answers
+from a description of the documents on any system, or the replay backend which answers
+from the trace of a recorded session.
+"""
+
+from .base import Backend
+from .caching import CacheStats, CachingBackend
+from .com import ComBackend
+from .definitions import BackendError, BackendType, RefType
+from .fake import FakeBackend
+from .recording import RecordingBackend, ReplayBackend
+from .tracing import ComProfiler, TracingBackend
+
+# pylint: disable=invalid-name
+_backend: Backend = ComBackend()
+
+
+def get_backend() -> Backend:
+    """Get the backend used by the commands"""
+    return _backend
+
+
+def set_backend(backend: Backend) -> None:
+    """Set the backend used by the commands"""
+    # pylint: disable=global-statement
+    global _backend
+    _backend = backend
+
+
+def create_backend(
+    backend_type: BackendType,
+    path: str | None = None,
+    latency: float | None = None,
+    latency_scale: float = 1.0,
+) -> Backend:
+    """
+    Create a backend. The fake backend needs the path to the description of the
+    documents and can override its latency. The replay backend needs the path to a trace
+    and scales its latencies.
+    """
+    if backend_type is BackendType.FAKE:
+        if path is None:
+            raise BackendError("The fake backend needs a description file")
+        return FakeBackend(path, latency)
+    if backend_type is BackendType.REPLAY:
+        if path is None:
+            raise BackendError("The replay backend needs a trace file")
+        return ReplayBackend(path, latency_scale)
+    return ComBackend()
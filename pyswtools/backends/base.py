@@ -0,0 +1,38 @@
+"""
+Interface of the backends used to talk to solidworks
+"""
+
+from .definitions import RefType
+
+
+class Backend:
+    """
+    Class representing a way to reach the solidworks api. The objects returned by
+    open_app behave as the solidworks COM objects.
+    """
+
+    name = ""
+
+    def is_available(self) -> bool:
+        """Return True if the backend can be used on this system"""
+        raise NotImplementedError
+
+    def open_app(self, sw_version: int):
+        """Get the solidworks application object"""
+        raise NotImplementedError
+
+    def byref(self, ref_type: RefType):
+        """Create an output argument whose value is set by the called member"""
+        raise NotImplementedError
+
+    def views(self):
+        """Create the empty array of views given to the exports"""
+        raise NotImplementedError
+
+    def identity(self, obj):
+        """
+        Get a key identifying a solidworks object, the same for all the objects standing
+        for it, or None if the backend can not tell
+        """
+        # pylint: disable=unused-argument
+        return None
@@ -0,0 +1,212 @@
+"""
+Memoisation of the properties of the solidworks objects.
+
+The commands read the same facts of a component several times, each read being a call
+to solidworks. The caching proxies keep the value of the read only properties of each
+object, and the objects they return are proxies too so the cache covers the whole tree.
+Showing a configuration or adding a property invalidates the values of the object it is
+called on and of the objects obtained from it, saving a document invalidates all of them.
+The values and the invalidations are shared by the proxies of the same object, identified
+by the backend, so an object reached through two paths sees the changes made through both.
+A change made to an object the backend can not identify invalidates all the values.
+"""
+
+import inspect
+from dataclasses import dataclass
+
+from .base import Backend
+from .definitions import RefType
+from .tracing import PLAIN_TYPES
+
+# Properties whose value only changes with a mutating call, in lower case
+CACHED_PROPERTIES = frozenset(
+    [
+        "extension",
+        "getchildren",
+        "getconfigurationnames",
+        "getmodeldoc2",
+        "getnames",
+        "getpathname",
+        "getsuppression2",
+        "name2",
+        "referencedconfiguration",
+    ]
+)
+
+# Calls which change the object they are called on, in lower case
+MUTATING_MEMBERS = frozenset(["showconfiguration2", "add3"])
+
+# Calls which may change any document, in lower case
+SAVING_MEMBERS = frozenset(["save3", "saveas3"])
+
+
+@dataclass
+class CacheStats:
+    """
+    Class representing the use of the cache of the properties
+    """
+
+    hits: int = 0
+    misses: int = 0
+    invalidations: int = 0
+
+    def dict(self):
+        """
+        Convert the class to a dict structure
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+class PropertyCache:
+    """
+    Class representing the cached properties shared by the proxies. A value is valid
+    while no invalidation happened since it was read, on its object, on the objects it
+    was obtained from or on all of them.
+    """
+
+    def __init__(self, identity=None) -> None:
+        self.stats = CacheStats()
+        self.clock = 0
+        self.invalidated = 0
+        self._identity = identity
+        # identity -> lower case name -> (clock of the read, value, proxy which read it)
+        self._values = {}
+        # identity -> clock of its last invalidation
+        self._invalidations = {}
+
+    def get_values(self, target) -> tuple:
+        """
+        Get the identity of an object, None if it has none, and the values shared by
+        its proxies
+        """
+        key = None if self._identity is None else self._identity(target)
+        if key is None:
+            return None, {}
+        try:
+            return key, self._values.setdefault(key, {})
+        except TypeError:
+            return None, {}
+
+    def invalidate(self, proxy=None) -> None:
+        """Invalidate the values of a proxy and its descendants, or all the values"""
+        self.clock += 1
+        self.stats.invalidations += 1
+        key = None if proxy is None else proxy._key  # pylint: disable=protected-access
+        if key is None:
+            self.invalidated = self.clock
+        else:
+            self._invalidations[key] = self.clock
+
+    def is_valid(self, proxy, read_at: int) -> bool:
+        """Check if a value read by a proxy at a time is still valid"""
+        if self.invalidated > read_at:
+            return False
+        while proxy is not None:
+            key = proxy._key  # pylint: disable=protected-access
+            if key is not None and self._invalidations.get(key, 0) > read_at:
+                return False
+            proxy = proxy._parent  # pylint: disable=protected-access
+        return True
+
+    def wrap(self, value, parent=None):
+        """Wrap the objects of a returned value in caching proxies"""
+        if isinstance(value, (CachingProxy, *PLAIN_TYPES)):
+            return value
+        if isinstance(value, (tuple, list)):
+            return type(value)(self.wrap(item, parent) for item in value)
+        return CachingProxy(value, self, parent)
+
+
+def unwrap(value):
+    """Get the objects wrapped in an argument"""
+    if isinstance(value, CachingProxy):
+        return value._target  # pylint: disable=protected-access
+    if isinstance(value, (tuple, list)):
+        return type(value)(unwrap(item) for item in value)
+    return value
+
+
+class CachingProxy:
+    """
+    Class representing a solidworks object whose read only properties are memoised
+    """
+
+    def __init__(self, target, cache: PropertyCache, parent=None) -> None:
+        object.__setattr__(self, "_target", target)
+        object.__setattr__(self, "_cache", cache)
+        object.__setattr__(self, "_parent", parent)
+        key, values = cache.get_values(target)
+        object.__setattr__(self, "_key", key)
+        object.__setattr__(self, "_values", values)
+
+    def __getattr__(self, name: str):
+        key = name.lower()
+        cache = self._cache
+        if key in CACHED_PROPERTIES:
+            if key in self._values:
+                read_at, value, reader = self._values[key]
+                # The value may have been read by another proxy of the same object
+                if cache.is_valid(self, read_at) and (
+                    reader is self or cache.is_valid(reader, read_at)
+                ):
+                    cache.stats.hits += 1
+                    return value
+            cache.stats.misses += 1
+            read_at = cache.clock
+            value = cache.wrap(getattr(self._target, name), self)
+            self._values[key] = (read_at, value, self)
+            return value
+
+        value = getattr(self._target, name)
+        # The COM objects are callable, only the methods are routines
+        if not inspect.isroutine(value):
+            return cache.wrap(value, self)
+
+        def call(*args):
+            result = value(*unwrap(args))
+            if key in MUTATING_MEMBERS:
+                cache.invalidate(self)
+            elif key in SAVING_MEMBERS:
+                cache.invalidate()
+            return cache.wrap(result, self)
+
+        return call
+
+    def __setattr__(self, name: str, value) -> None:
+        setattr(self._target, name, unwrap(value))
+        self._cache.invalidate(self)
+
+
+class CachingBackend(Backend):
+    """
+    Class representing a backend whose read only properties are memoised
+    """
+
+    def __init__(self, backend: Backend) -> None:
+        self.backend = backend
+        self.cache = PropertyCache(backend.identity)
+        self.name = backend.name
+
+    @property
+    def stats(self) -> CacheStats:
+        """Get the hits and misses of the cache"""
+        return self.cache.stats
+
+    def is_available(self) -> bool:
+        return self.backend.is_available()
+
+    def open_app(self, sw_version: int):
+        return self.cache.wrap(self.backend.open_app(sw_version))
+
+    def byref(self, ref_type: RefType):
+        return self.backend.byref(ref_type)
+
+    def views(self):
+        return self.backend.views()
+
+    def identity(self, obj):
+        return self.backend.identity(unwrap(obj))
@@ -0,0 +1,57 @@
+"""
+Backend talking to solidworks through COM. win32com is only imported when the backend is
+used so the package can be imported on any system.
+"""
+
+import platform
+
+from .base import Backend
+from .definitions import RefType
+
+
+class ComBackend(Backend):
+    """
+    Class representing the solidworks application reached with win32com
+    """
+
+    name = "com"
+
+    def is_available(self) -> bool:
+        return platform.system() == "Windows"
+
+    def open_app(self, sw_version: int):
+        # pylint: disable=import-error,import-outside-toplevel
+        import win32com.client
+
+        return win32com.client.Dispatch(
+            f"SldWorks.Application.{(int(sw_version)-2012+20)}"
+        )
+
+    def byref(self, ref_type: RefType):
+        # pylint: disable=import-error,import-outside-toplevel
+        import win32com.client
+        import pythoncom
+
+        if ref_type is RefType.INT:
+            return win32com.client.VARIANT(pythoncom.VT_BYREF | pythoncom.VT_I4, -1)
+        if ref_type is RefType.STR:
+            return win32com.client.VARIANT(pythoncom.VT_BYREF | pythoncom.VT_BSTR, "")
+        return win32com.client.VARIANT(pythoncom.VT_BYREF | pythoncom.VT_BOOL, bool())
+
+    def views(self):
+        # pylint: disable=import-error,import-outside-toplevel
+        import win32com.client
+        import pythoncom
+
+        return win32com.client.VARIANT(pythoncom.VT_VARIANT, [])
+
+    def identity(self, obj):
+        # pylint: disable=import-error,import-outside-toplevel
+        import pythoncom
+
+        # The IUnknown interface of a COM object is the same for all its wrappers
+        try:
+            oleobj = obj._oleobj_  # pylint: disable=protected-access
+            return oleobj.QueryInterface(pythoncom.IID_IUnknown)
+        except (AttributeError, pythoncom.com_error):
+            return None
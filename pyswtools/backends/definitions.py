@@ -0,0 +1,23 @@
+"""Definitions shared by the backends"""
+
+from enum import Enum
+
+
+class BackendType(str, Enum):
+    """Class representing the backend used to talk to solidworks"""
+
+    COM = "com"
+    FAKE = "fake"
+    REPLAY = "replay"
+
+
+class RefType(str, Enum):
+    """Class representing the type of an output argument of a solidworks call"""
+
+    INT = "int"
+    STR = "str"
+    BOOL = "bool"
+
+
+class BackendError(Exception):
+    """Raised when a backend can not be created"""
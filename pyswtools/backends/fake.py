@@ -0,0 +1,763 @@
+"""
+In memory backend answering as solidworks from a description of the documents.
+
+The description is a json file, or a yaml file if PyYAML is installed. The paths are
+relative to the description:
+
+    latency: 0.001                          # seconds spent in each call, optional
+    documents:
+      Main.SLDASM:
+        configurations: [Default]
+        components:
+          - path: Plate.SLDPRT
+            configuration: Long             # optional, first configuration by default
+            name: Plate-1                   # optional, numbered from the file name
+            suppressed: false               # optional
+      Plate.SLDPRT:
+        configurations: [Default, Long]
+        mass: {Default: 1.2, Long: 2.4}     # a single value or one per configuration
+        density: 7800
+        properties: {Default: {Material: {type: 30, value: Steel}}}
+        bodies: [[{box: [0, 0, 0, 100, 50, 0], area: 5000}]]  # the faces of each body
+        triangles: 200                      # size of the exported STL
+    drawings:
+      Plate.SLDDRW: [Plate.SLDPRT]
+
+The files which are not described are opened as empty parts. An assembly opened with the
+lightweight option has lightweight components, without document. The members of the fake
+objects are found without case like with win32com, and each access to a member costs the
+latency.
+"""
+
+import json
+import math
+import os
+import time
+
+import ezdxf
+import numpy as np
+
+from .base import Backend
+from .definitions import BackendError, RefType
+
+try:
+    import yaml
+
+    DESCRIPTION_ERRORS = (OSError, ValueError, yaml.YAMLError)
+except ImportError:
+    yaml = None
+    DESCRIPTION_ERRORS = (OSError, ValueError)
+
+# The fake objects share their state inside the module
+# pylint: disable=protected-access
+
+# Option of OpenDoc6 loading the components of an assembly lightweight
+OPEN_LOAD_LIGHTWEIGHT = 128
+
+# Members of each fake class: lower case name -> (function, is property)
+MEMBERS = {}
+SETTERS = {}
+
+
+def com_property(name: str):
+    """Declare a method as a property of the COM interface"""
+
+    def decorator(func):
+        func.com_member = (name, True)
+        return func
+
+    return decorator
+
+
+def com_method(name: str):
+    """Declare a method as a method of the COM interface"""
+
+    def decorator(func):
+        func.com_member = (name, False)
+        return func
+
+    return decorator
+
+
+def com_setter(name: str):
+    """Declare a method as the setter of a property of the COM interface"""
+
+    def decorator(func):
+        func.com_setter = name
+        return func
+
+    return decorator
+
+
+def get_members(cls) -> tuple[dict, dict]:
+    """Get the COM members and setters of a fake class by lower case name"""
+    if cls not in MEMBERS:
+        members, setters = {}, {}
+        for klass in reversed(cls.__mro__):
+            for func in vars(klass).values():
+                if hasattr(func, "com_member"):
+                    name, is_property = func.com_member
+                    members[name.lower()] = (func, is_property)
+                if hasattr(func, "com_setter"):
+                    setters[func.com_setter.lower()] = func
+        MEMBERS[cls], SETTERS[cls] = members, setters
+    return MEMBERS[cls], SETTERS[cls]
+
+
+def load_description(path: str) -> dict:
+    """Read the description of the documents from a json or yaml file"""
+    with open(path, encoding="utf8") as f:
+        if path.lower().endswith((".yaml", ".yml")):
+            if yaml is None:
+                raise BackendError("PyYAML is needed to read a yaml description")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def get_key(path: str) -> str:
+    """Get the key of a path in the fake application"""
+    return os.path.normcase(os.path.abspath(path))
+
+
+class FakeRef:  # pylint: disable=too-few-public-methods
+    """
+    Class representing an output argument of a call
+    """
+
+    def __init__(self, value) -> None:
+        self.value = value
+
+
+class FakeObject:
+    """
+    Class representing an object of the solidworks api
+    """
+
+    def __init__(self, app) -> None:
+        self._app = app
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        members, _ = get_members(type(self))
+        if name.lower() not in members:
+            raise AttributeError(f"{type(self).__name__} has no member {name}")
+        func, is_property = members[name.lower()]
+        if is_property:
+            self._app.wait()
+            return func(self)
+
+        def call(*args):
+            self._app.wait()
+            return func(self, *args)
+
+        return call
+
+    def __setattr__(self, name: str, value) -> None:
+        if name.startswith("_"):
+            object.__setattr__(self, name, value)
+            return
+        _, setters = get_members(type(self))
+        if name.lower() not in setters:
+            raise AttributeError(f"{type(self).__name__} can not set {name}")
+        self._app.wait()
+        setters[name.lower()](self, value)
+
+
+class FakeApp(FakeObject):
+    """
+    Class representing the solidworks application
+    """
+
+    def __init__(self, description: dict, root: str, latency: float) -> None:
+        super().__init__(self)
+        self._latency = latency
+        self._calls = 0
+        self._documents = {
+            get_key(os.path.join(root, path)): desc or {}
+            for path, desc in (description.get("documents") or {}).items()
+        }
+        self._drawings = {
+            get_key(os.path.join(root, path)): [
+                get_key(os.path.join(root, ref)) for ref in refs
+            ]
+            for path, refs in (description.get("drawings") or {}).items()
+        }
+        self._names = {
+            os.path.basename(key): key for key in [*self._documents, *self._drawings]
+        }
+        self._docs = {}
+
+    def wait(self) -> None:
+        """Spend the latency of a call"""
+        self._calls += 1
+        if self._latency > 0:
+            time.sleep(self._latency)
+
+    def find(self, path: str) -> str | None:
+        """Get the key of a document from its path or its file name"""
+        key = get_key(path)
+        if key in self._documents or key in self._drawings:
+            return key
+        return self._names.get(os.path.basename(key))
+
+    def get_doc(self, path: str):
+        """
+        Get the document at path. A file which is not described is an empty part,
+        None is returned if it does not exist.
+        """
+        key = self.find(path)
+        if key is None or key not in self._documents:
+            if not os.path.isfile(path):
+                return None
+            key = get_key(path)
+            self._documents[key] = {}
+        if key not in self._docs:
+            self._docs[key] = FakeDoc(self, key, self._documents[key])
+        return self._docs[key]
+
+    @com_method("OpenDoc6")
+    def com_open_doc6(self, path, type_doc, options, configuration, errors, warnings):
+        """Open a document in a configuration, its components lightweight if asked"""
+        # pylint: disable=unused-argument,too-many-arguments
+        doc = self.get_doc(path)
+        if doc is None:
+            return None
+        if options & OPEN_LOAD_LIGHTWEIGHT and doc._components is None:
+            doc._lightweight = True
+        if configuration in doc._configurations:
+            doc._active = configuration
+        return doc
+
+    @com_method("OpenDoc")
+    def com_open_doc(self, path, type_doc):
+        """Open a document"""
+        # pylint: disable=unused-argument
+        return self.get_doc(path)
+
+    @com_method("ActivateDoc3")
+    def com_activate_doc3(self, name, use_user_preferences, option, errors):
+        """Activate an opened document"""
+        # pylint: disable=unused-argument
+        return self.get_doc(name)
+
+    @com_method("CloseDoc")
+    def com_close_doc(self, name):
+        """Close a document"""
+        # pylint: disable=unused-argument
+        return True
+
+    def get_references(self, key: str) -> list:
+        """Get the documents referenced by a document, once each"""
+        if key in self._drawings:
+            references = self._drawings[key]
+        else:
+            references = [
+                get_key(os.path.join(os.path.dirname(key), comp["path"]))
+                for comp in (self._documents.get(key) or {}).get("components") or []
+            ]
+        return list(dict.fromkeys(references))
+
+    @com_method("GetDocumentDependencies2")
+    def com_get_document_dependencies2(self, path, traverse, search, read_only):
+        """
+        Get the name and the path of each document referenced by a document, or by its
+        references too with traverse
+        """
+        # pylint: disable=unused-argument
+        key = self.find(path)
+        if key is None:
+            return None
+        references = self.get_references(key)
+        if traverse:
+            idx = 0
+            while idx < len(references):
+                references += [
+                    reference
+                    for reference in self.get_references(references[idx])
+                    if reference not in references
+                ]
+                idx += 1
+        dependencies = []
+        for reference in references:
+            dependencies += [
+                os.path.splitext(os.path.basename(reference))[0],
+                reference,
+            ]
+        return tuple(dependencies)
+
+
+class FakeDoc(FakeObject):
+    """
+    Class representing a part or an assembly document
+    """
+
+    def __init__(self, app: FakeApp, path: str, description: dict) -> None:
+        super().__init__(app)
+        self._path = path
+        self._description = description
+        self._configurations = list(description.get("configurations", ["Default"]))
+        self._active = self._configurations[0]
+        self._properties = {
+            conf: {name: dict(prop) for name, prop in props.items()}
+            for conf, props in (description.get("properties") or {}).items()
+        }
+        self._components = None
+        self._lightweight = False
+        self._extension = FakeExtension(app, self)
+        self._selection_manager = FakeSelectionManager(app)
+        self._equation_manager = FakeEquationMgr(app)
+
+    def get_value(self, name: str, configuration: str, default=None):
+        """Get a value of the description, which can depend on the configuration"""
+        value = self._description.get(name, default)
+        if isinstance(value, dict):
+            return value.get(configuration, default)
+        return value
+
+    def get_mass(self, configuration: str) -> float:
+        """Get the mass of a configuration, summed over the components if not given"""
+        mass = self.get_value("mass", configuration)
+        if mass is not None:
+            return float(mass)
+        mass = 0.0
+        for component in self.get_components():
+            doc = component.get_doc()
+            if doc is not None:
+                mass += doc.get_mass(component.referenced_configuration())
+        return mass
+
+    def get_components(self) -> list:
+        """Get the top level components"""
+        if self._components is None:
+            self._components = make_components(
+                self._app, self._path, self._description, "", self._lightweight
+            )
+        return self._components
+
+    @com_method("GetComponents")
+    def com_get_components(self, top_level_only):
+        """Get the components, only the top level ones or all of them"""
+        components = self.get_components()
+        if not top_level_only:
+            pending, components = list(components), []
+            while len(pending) > 0:
+                component = pending.pop(0)
+                components.append(component)
+                pending = list(component.get_children()) + pending
+        return tuple(components) if len(components) > 0 else None
+
+    @com_property("GetConfigurationNames")
+    def com_get_configuration_names(self):
+        """Get the names of the configurations"""
+        return tuple(self._configurations)
+
+    @com_property("Extension")
+    def com_extension(self):
+        """Get the extension of the document"""
+        return self._extension
+
+    @com_method("ShowConfiguration2")
+    def com_show_configuration2(self, name):
+        """Activate a configuration"""
+        if name not in self._configurations:
+            return False
+        self._active = name
+        return True
+
+    @com_method("GetBodies2")
+    def com_get_bodies2(self, type_body, visible_only):
+        """Get the bodies of the part"""
+        # pylint: disable=unused-argument
+        bodies = self._description.get("bodies") or []
+        if len(bodies) == 0:
+            return None
+        return tuple(
+            FakeBody(self._app, [FakeFace(self._app, face) for face in faces])
+            for faces in bodies
+        )
+
+    @com_property("SelectionManager")
+    def com_selection_manager(self):
+        """Get the selection manager of the document"""
+        return self._selection_manager
+
+    @com_property("GetEquationMgr")
+    def com_get_equation_mgr(self):
+        """Get the equation manager of the document"""
+        return self._equation_manager
+
+    @com_property("GetPathName")
+    def com_get_path_name(self):
+        """Get the path of the document"""
+        return self._path
+
+    @com_method("ExportToDWG2")
+    def com_export_to_dwg2(self, path, *_args):
+        """Export the selected face to a dxf"""
+        face = self._selection_manager._selected
+        if face is None:
+            return False
+        write_face_dxf(path, face.get_box())
+        return True
+
+    @com_method("SaveAs3")
+    def com_save_as3(self, path, version, options):
+        """Save the document, only the STL files are written"""
+        # pylint: disable=unused-argument
+        if path.lower().endswith(".stl"):
+            write_fake_stl(path, int(self._description.get("triangles", 12)))
+        return 0
+
+    @com_method("Save3")
+    def com_save3(self, options, errors, warnings):
+        """Save the document"""
+        # pylint: disable=unused-argument
+        return True
+
+
+def make_components(
+    app: FakeApp, path: str, description: dict, prefix: str, lightweight: bool = False
+) -> list:
+    """Create the components of a document, their names starting with prefix"""
+    components = []
+    numbers = {}
+    for comp in description.get("components") or []:
+        comp_path = get_key(os.path.join(os.path.dirname(path), comp["path"]))
+        stem = os.path.splitext(os.path.basename(comp_path))[0]
+        numbers[stem] = numbers.get(stem, 0) + 1
+        name = prefix + comp.get("name", f"{stem}-{numbers[stem]}")
+        components.append(FakeComponent(app, name, comp_path, comp, lightweight))
+    return components
+
+
+class FakeComponent(FakeObject):
+    """
+    Class representing a component of an assembly
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        app: FakeApp,
+        name: str,
+        path: str,
+        description: dict,
+        lightweight: bool = False,
+    ) -> None:
+        super().__init__(app)
+        self._name = name
+        self._path = path
+        self._description = description
+        self._lightweight = lightweight
+        self._children = None
+
+    def get_doc(self):
+        """Get the document of the component, None if it is suppressed"""
+        if self._description.get("suppressed", False):
+            return None
+        return self._app.get_doc(self._path)
+
+    def get_model_doc2(self):
+        """Get the document of the component, None if it is suppressed or lightweight"""
+        if self._lightweight:
+            return None
+        return self.get_doc()
+
+    def referenced_configuration(self) -> str:
+        """Get the configuration used by the component"""
+        if "configuration" in self._description:
+            return self._description["configuration"]
+        doc = self._app.get_doc(self._path)
+        return doc._configurations[0] if doc is not None else "Default"
+
+    def get_children(self) -> list:
+        """Get the components of the sub assembly"""
+        if self._children is None:
+            doc = self.get_doc()
+            self._children = (
+                []
+                if doc is None
+                else make_components(
+                    self._app,
+                    self._path,
+                    doc._description,
+                    self._name + "/",
+                    self._lightweight,
+                )
+            )
+        return self._children
+
+    @com_property("Name2")
+    def com_name2(self):
+        """Get the name of the component"""
+        return self._name
+
+    @com_property("ReferencedConfiguration")
+    def com_referenced_configuration(self):
+        """Get the configuration used by the component"""
+        return self.referenced_configuration()
+
+    @com_property("GetSuppression2")
+    def com_get_suppression2(self):
+        """Get the suppression state, 0 suppressed, 1 lightweight or 2 fully resolved"""
+        if self._description.get("suppressed", False):
+            return 0
+        return 1 if self._lightweight else 2
+
+    @com_property("GetModelDoc2")
+    def com_get_model_doc2(self):
+        """Get the document of the component"""
+        return self.get_model_doc2()
+
+    @com_property("GetChildren")
+    def com_get_children(self):
+        """Get the children components"""
+        return tuple(self.get_children())
+
+    @com_property("GetPathName")
+    def com_get_path_name(self):
+        """Get the path of the document of the component"""
+        return self._path
+
+
+class FakeExtension(FakeObject):
+    """
+    Class representing the extension of a document
+    """
+
+    def __init__(self, app: FakeApp, doc: FakeDoc) -> None:
+        super().__init__(app)
+        self._doc = doc
+
+    @com_property("CreateMassProperty2")
+    def com_create_mass_property2(self):
+        """Get the mass properties of the active configuration"""
+        doc = self._doc
+        density = doc.get_value("density", doc._active, 1000.0)
+        return FakeMassProperty(self._app, doc.get_mass(doc._active), float(density))
+
+    @com_method("CustomPropertyManager")
+    def com_custom_property_manager(self, configuration):
+        """Get the custom properties of a configuration"""
+        return FakeCustomPropertyManager(
+            self._app, self._doc._properties.setdefault(configuration, {})
+        )
+
+
+class FakeMassProperty(FakeObject):
+    """
+    Class representing the mass properties of a document
+    """
+
+    def __init__(self, app: FakeApp, mass: float, density: float) -> None:
+        super().__init__(app)
+        self._mass = mass
+        self._density = density
+
+    @com_property("Mass")
+    def com_mass(self):
+        """Get the mass"""
+        return self._mass
+
+    @com_property("Density")
+    def com_density(self):
+        """Get the density"""
+        return self._density
+
+
+class FakeCustomPropertyManager(FakeObject):
+    """
+    Class representing the custom properties of a configuration
+    """
+
+    def __init__(self, app: FakeApp, properties: dict) -> None:
+        super().__init__(app)
+        self._properties = properties
+
+    @com_property("GetNames")
+    def com_get_names(self):
+        """Get the names of the properties, None if there are none"""
+        return tuple(self._properties) if len(self._properties) > 0 else None
+
+    @com_method("GetType2")
+    def com_get_type2(self, name):
+        """Get the type of a property"""
+        return self._properties[name].get("type", 30)
+
+    @com_method("Get6")
+    def com_get6(self, name, use_cached, value, resolved, was_resolved, link):
+        """Get the value of a property in the output arguments"""
+        # pylint: disable=unused-argument,too-many-arguments
+        prop = self._properties.get(name)
+        if prop is None:
+            return 1
+        value.value = str(prop.get("value", ""))
+        resolved.value = value.value
+        was_resolved.value = True
+        link.value = False
+        return 0
+
+    @com_method("Add3")
+    def com_add3(self, name, type_prop, value, option):
+        """Add or replace a property"""
+        # pylint: disable=unused-argument
+        self._properties[name] = {"type": type_prop, "value": value}
+        return 0
+
+
+class FakeBody(FakeObject):  # pylint: disable=too-few-public-methods
+    """
+    Class representing a body of a part
+    """
+
+    def __init__(self, app: FakeApp, faces: list) -> None:
+        super().__init__(app)
+        self._faces = faces
+
+    @com_method("GetFaces")
+    def com_get_faces(self):
+        """Get the faces of the body"""
+        return tuple(self._faces)
+
+
+class FakeFace(FakeObject):
+    """
+    Class representing a face of a body
+    """
+
+    def __init__(self, app: FakeApp, description: dict) -> None:
+        super().__init__(app)
+        self._description = description
+
+    def get_box(self) -> tuple:
+        """Get the bounding box (min x, min y, min z, max x, max y, max z)"""
+        return tuple(float(value) for value in self._description.get("box", [0] * 6))
+
+    @com_property("GetBox")
+    def com_get_box(self):
+        """Get the bounding box"""
+        return self.get_box()
+
+    @com_property("GetArea")
+    def com_get_area(self):
+        """Get the area"""
+        return float(self._description.get("area", 0.0))
+
+
+class FakeSelectionManager(FakeObject):
+    """
+    Class representing the selection of a document
+    """
+
+    def __init__(self, app: FakeApp) -> None:
+        super().__init__(app)
+        self._selected = None
+
+    @com_property("CreateSelectData")
+    def com_create_select_data(self):
+        """Create the options of a selection"""
+        return FakeObject(self._app)
+
+    @com_method("AddSelectionListObject")
+    def com_add_selection_list_object(self, selected, data):
+        """Select an object"""
+        # pylint: disable=unused-argument
+        self._selected = selected
+        return True
+
+
+class FakeEquationMgr(FakeObject):
+    """
+    Class representing the equations of a document
+    """
+
+    def __init__(self, app: FakeApp) -> None:
+        super().__init__(app)
+        self._file_path = ""
+
+    @com_property("FilePath")
+    def com_file_path(self):
+        """Get the path of the file of equations"""
+        return self._file_path
+
+    @com_setter("FilePath")
+    def com_set_file_path(self, value):
+        """Set the path of the file of equations"""
+        self._file_path = value
+
+
+def write_fake_stl(path: str, triangles: int) -> None:
+    """Write a binary STL of a wavy square with about the number of triangles"""
+    cells = max(1, math.ceil(math.sqrt(triangles / 2)))
+    xs, ys = np.meshgrid(np.linspace(0, 100, cells + 1), np.linspace(0, 100, cells + 1))
+    points = np.stack([xs, np.sin(xs / 10) * np.cos(ys / 10), ys], axis=-1)
+    a, b = points[:-1, :-1], points[:-1, 1:]
+    c, d = points[1:, 1:], points[1:, :-1]
+    vertices = np.concatenate(
+        [np.stack([a, b, c], axis=-2), np.stack([a, c, d], axis=-2)]
+    )
+    vertices = vertices.reshape(-1, 3, 3)  # pylint: disable=too-many-function-args
+    normals = np.cross(vertices[:, 1] - vertices[:, 0], vertices[:, 2] - vertices[:, 0])
+    normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+
+    records = np.zeros(len(vertices), dtype=[("data", "<f4", (12,)), ("attr", "<u2")])
+    records["data"] = np.concatenate([normals, vertices.reshape(-1, 9)], axis=1)
+    with open(path, "wb") as f:
+        f.write(b"pyswtools fake backend".ljust(80, b" "))
+        f.write(np.uint32(len(records)).tobytes())
+        f.write(records.tobytes())
+
+
+def write_face_dxf(path: str, box: tuple) -> None:
+    """Write the outline of a planar face to a dxf from its bounding box"""
+    extents = [box[i + 3] - box[i] for i in range(3)]
+    # Drop the axis along which the face is flat
+    flat = extents.index(min(extents))
+    axes = [i for i in range(3) if i != flat]
+    width, height = extents[axes[0]], extents[axes[1]]
+
+    doc = ezdxf.new()
+    doc.modelspace().add_lwpolyline(
+        [(0, 0), (width, 0), (width, height), (0, height)], close=True
+    )
+    doc.saveas(path)
+
+
+class FakeBackend(Backend):
+    """
+    Class representing an in memory solidworks built from a description file
+    """
+
+    name = "fake"
+
+    def __init__(self, description_path: str, latency: float | None = None) -> None:
+        try:
+            description = load_description(description_path) or {}
+        except DESCRIPTION_ERRORS as err:
+            raise BackendError(f"Could not read {description_path}: {err}") from err
+        if latency is None:
+            latency = float(description.get("latency", 0.0))
+        self.app = FakeApp(
+            description, os.path.dirname(os.path.abspath(description_path)), latency
+        )
+
+    def is_available(self) -> bool:
+        return True
+
+    def open_app(self, sw_version: int):
+        return self.app
+
+    def byref(self, ref_type: RefType):
+        if ref_type is RefType.INT:
+            return FakeRef(-1)
+        if ref_type is RefType.STR:
+            return FakeRef("")
+        return FakeRef(False)
+
+    def views(self):
+        return []
+
+    def identity(self, obj):
+        # Each fake object stands for a single solidworks object
+        return obj
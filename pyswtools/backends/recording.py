@@ -0,0 +1,492 @@
+"""
+Recording of the sessions with solidworks and their replay without it.
+
+The recording proxies write each property access, method call and property assignment
+to a trace with its arguments, its returned value and its duration. The objects are
+identified by a handle, numbered in the order they are returned. The paths under the
+directory of the session are stored relative to it so the trace can be replayed from
+another directory, on another system.
+
+A trace is a json lines file, compressed with gzip when its name ends with .gz. The first
+line is a header, each other line is a call:
+
+    [handle, kind, member, arguments, result, duration, output arguments]
+
+with kind "a" to open the application, "g" to get a property, "c" to call a method and
+"s" to set a property. The replay answers each call with the recorded result of the same
+member of the same object with the same arguments, in the order they were recorded, the
+last one being repeated once they are all used.
+
+Each object of the trace also has an origin: the origin of its parent, the member and the
+arguments of the call which returned it. The objects got twice by the same calls share
+their origin, so a call missing on an object is answered with the calls of the objects
+of the same origin. The replay thus tolerates a session which reads an object once
+instead of twice, as with the cache of the properties, but it still fails on a call
+recorded on no object of the same origin.
+"""
+
+import gzip
+import inspect
+import json
+import os
+import time
+from collections import deque
+
+from .base import Backend
+from .definitions import BackendError, RefType
+from .fake import FakeRef
+from .tracing import PLAIN_TYPES
+
+TRACE_VERSION = 1
+ROOT = "${root}"
+APP_HANDLE = -1
+SW_EXTENSIONS = (".sldprt", ".sldasm", ".slddrw")
+
+
+def open_trace(path: str, mode: str):
+    """Open a trace, compressed with gzip if its name ends with .gz"""
+    if path.lower().endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf8")
+    return open(path, mode, encoding="utf8")  # pylint: disable=consider-using-with
+
+
+def list_handles(value):
+    """Get the handles of the objects of a value of a trace, in order"""
+    if isinstance(value, list):
+        for item in value:
+            yield from list_handles(item)
+    elif isinstance(value, dict) and "o" in value:
+        yield value["o"]
+
+
+class PathMapper:
+    """
+    Class representing the conversion of the paths under a root directory to the paths
+    of a trace
+    """
+
+    def __init__(self, root: str) -> None:
+        self.root = os.path.abspath(root)
+        self._case_root = os.path.normcase(self.root)
+
+    def to_trace(self, value: str) -> str:
+        """Get the path of a trace from a path under the root"""
+        case_value = os.path.normcase(value)
+        if case_value == self._case_root:
+            return ROOT
+        if not case_value.startswith(self._case_root + os.sep):
+            return value
+        rest = value[len(self.root) :]
+        for sep in (os.sep, os.altsep):
+            if sep is not None:
+                rest = rest.replace(sep, "/")
+        return ROOT + rest
+
+    def from_trace(self, value: str) -> str:
+        """Get the path under the root from a path of a trace"""
+        if not value.startswith(ROOT):
+            return value
+        return self.root + value[len(ROOT) :].replace("/", os.sep)
+
+
+def list_sw_files(root: str) -> list[str]:
+    """Get the solidworks files under root, relative to it"""
+    files = []
+    for r, _, fs in os.walk(root):
+        for f in fs:
+            if f.lower().endswith(SW_EXTENSIONS):
+                files.append(os.path.relpath(os.path.join(r, f), root))
+    return sorted(file.replace(os.sep, "/") for file in files)
+
+
+class RecordingProxy:
+    """
+    Class representing a solidworks object whose calls are written to a trace
+    """
+
+    def __init__(self, target, recorder, handle: int) -> None:
+        object.__setattr__(self, "_target", target)
+        object.__setattr__(self, "_recorder", recorder)
+        object.__setattr__(self, "_handle", handle)
+
+    def __getattr__(self, name: str):
+        start = time.perf_counter()
+        value = getattr(self._target, name)
+        duration = time.perf_counter() - start
+        # The COM objects are callable, only the methods are routines
+        if not inspect.isroutine(value):
+            result = self._recorder.encode(value)
+            self._recorder.write(self._handle, "g", name, [], result, duration, [])
+            return self._recorder.wrap(value, result)
+
+        def call(*args):
+            start = time.perf_counter()
+            result = value(*self._recorder.unwrap(args))
+            end = time.perf_counter()
+            encoded = self._recorder.encode(result)
+            self._recorder.write(
+                self._handle,
+                "c",
+                name,
+                self._recorder.encode_args(args),
+                encoded,
+                duration + end - start,
+                self._recorder.ref_values(args),
+            )
+            return self._recorder.wrap(result, encoded)
+
+        return call
+
+    def __setattr__(self, name: str, value) -> None:
+        args = self._recorder.encode_args((value,))
+        start = time.perf_counter()
+        setattr(self._target, name, self._recorder.unwrap(value))
+        duration = time.perf_counter() - start
+        self._recorder.write(self._handle, "s", name, args, None, duration, [])
+
+
+class RecordingBackend(Backend):
+    """
+    Class representing a backend whose calls are written to a trace
+    """
+
+    def __init__(self, backend: Backend, trace_path: str) -> None:
+        self.backend = backend
+        self.name = backend.name
+        self.trace_path = trace_path
+        self.calls = 0
+        self._paths = PathMapper(os.getcwd())
+        self._handles = 0
+        # Output arguments and views given to the calls, kept alive to keep their id
+        self._refs = {}
+        self._views = {}
+        try:
+            self._file = open_trace(trace_path, "w")
+        except OSError as err:
+            raise BackendError(f"Could not write {trace_path}: {err}") from err
+        header = {
+            "version": TRACE_VERSION,
+            "backend": backend.name,
+            "files": list_sw_files(self._paths.root),
+        }
+        self._file.write(json.dumps(header) + "\n")
+
+    def is_available(self) -> bool:
+        return self.backend.is_available()
+
+    def open_app(self, sw_version: int):
+        start = time.perf_counter()
+        app = self.backend.open_app(sw_version)
+        duration = time.perf_counter() - start
+        result = self.encode(app)
+        self.write(APP_HANDLE, "a", "open_app", [sw_version], result, duration, [])
+        return self.wrap(app, result)
+
+    def byref(self, ref_type: RefType):
+        ref = self.backend.byref(ref_type)
+        self._refs[id(ref)] = (ref, ref_type)
+        return ref
+
+    def views(self):
+        views = self.backend.views()
+        self._views[id(views)] = views
+        return views
+
+    def identity(self, obj):
+        return self.backend.identity(self.unwrap(obj))
+
+    def close(self) -> None:
+        """Finish the trace"""
+        if not self._file.closed:
+            self._file.close()
+
+    def write(self, *event) -> None:
+        """Write a call to the trace"""
+        event = list(event)
+        event[5] = round(event[5], 7)
+        self._file.write(json.dumps(event, separators=(",", ":")) + "\n")
+        self.calls += 1
+
+    def encode(self, value):
+        """
+        Get the value of a trace from a returned value, giving a handle to each new
+        object
+        """
+        if isinstance(value, str):
+            return self._paths.to_trace(value)
+        if isinstance(value, bytes):
+            return {"b": value.hex()}
+        if isinstance(value, PLAIN_TYPES):
+            return value
+        if isinstance(value, (tuple, list)):
+            return [self.encode(item) for item in value]
+        if isinstance(value, RecordingProxy):
+            return {"o": value._handle}  # pylint: disable=protected-access
+        # The COM objects resolve their members dynamically
+        if hasattr(type(value), "__getattr__"):
+            self._handles += 1
+            return {"o": self._handles}
+        return {"x": str(value)}
+
+    def encode_args(self, args) -> list:
+        """Get the arguments of a trace from the arguments of a call"""
+        encoded = []
+        for arg in args:
+            if id(arg) in self._refs:
+                encoded.append({"r": self._refs[id(arg)][1].value})
+            elif id(arg) in self._views:
+                encoded.append({"v": 1})
+            elif isinstance(arg, (str, bytes, RecordingProxy, *PLAIN_TYPES)):
+                encoded.append(self.encode(arg))
+            elif isinstance(arg, (tuple, list)):
+                encoded.append(self.encode_args(arg))
+            else:
+                encoded.append({"x": type(arg).__name__})
+        return encoded
+
+    def ref_values(self, args) -> list:
+        """Get the values set by a call to its output arguments"""
+        return [self.encode(arg.value) for arg in args if id(arg) in self._refs]
+
+    def wrap(self, value, encoded):
+        """Wrap the objects of a returned value in recording proxies"""
+        if isinstance(encoded, dict) and "o" in encoded:
+            if isinstance(value, RecordingProxy):
+                return value
+            return RecordingProxy(value, self, encoded["o"])
+        if isinstance(value, (tuple, list)):
+            return type(value)(
+                self.wrap(item, code) for item, code in zip(value, encoded)
+            )
+        return value
+
+    def unwrap(self, value):
+        """Get the objects wrapped in an argument"""
+        if isinstance(value, RecordingProxy):
+            return value._target  # pylint: disable=protected-access
+        if isinstance(value, (tuple, list)):
+            return type(value)(self.unwrap(item) for item in value)
+        return value
+
+
+class ReplayClock:  # pylint: disable=too-few-public-methods
+    """
+    Class representing the latency spent by the replay. The short latencies are
+    accumulated and slept together as sleep overshoots them.
+    """
+
+    def __init__(self, scale: float) -> None:
+        self.scale = scale
+        self._debt = 0.0
+
+    def wait(self, duration: float) -> None:
+        """Spend the latency of a call"""
+        if self.scale <= 0:
+            return
+        self._debt += duration * self.scale
+        if self._debt >= 1e-3:
+            start = time.perf_counter()
+            time.sleep(self._debt)
+            self._debt -= time.perf_counter() - start
+
+
+class ReplayObject:
+    """
+    Class representing a solidworks object answering with the calls of a trace
+    """
+
+    def __init__(self, backend, handle: int) -> None:
+        object.__setattr__(self, "_backend", backend)
+        object.__setattr__(self, "_handle", handle)
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        backend = self._backend
+        if not backend.is_method(self._handle, name):
+            return backend.answer(self._handle, "g", name, ())
+
+        def call(*args):
+            return backend.answer(self._handle, "c", name, args)
+
+        return call
+
+    def __setattr__(self, name: str, value) -> None:
+        self._backend.answer(self._handle, "s", name, (value,))
+
+
+class ReplayBackend(Backend):
+    """
+    Class representing a solidworks answering with the calls of a trace. The paths of the
+    trace are replayed under the current directory.
+    """
+
+    name = "replay"
+
+    def __init__(self, trace_path: str, latency_scale: float = 1.0) -> None:
+        self._paths = PathMapper(os.getcwd())
+        self._clock = ReplayClock(latency_scale)
+        self._objects = {}
+        self._refs = {}
+        self._views = {}
+        self.calls = {}
+        self.methods = set()
+        # Origin of each handle, and the calls of the objects of each origin
+        self._origins = {APP_HANDLE: 0}
+        self._origin_ids = {}
+        self.similar_calls = {}
+        self._origin_methods = set()
+        try:
+            with open_trace(trace_path, "r") as f:
+                self.header = json.loads(f.readline())
+                for line in f:
+                    self.add_call(json.loads(line))
+        except (OSError, ValueError, IndexError) as err:
+            raise BackendError(f"Could not read the trace {trace_path}: {err}") from err
+        if self.header.get("version") != TRACE_VERSION:
+            raise BackendError(
+                f"{trace_path} is not a trace of version {TRACE_VERSION}"
+            )
+
+    def add_call(self, event: list) -> None:
+        """Add a call of the trace"""
+        handle, kind, member, args, result, duration, refs = event
+        member = member.lower()
+        encoded = json.dumps(args, separators=(",", ":"))
+        key = (handle, kind, member, encoded)
+        if key not in self.calls:
+            self.calls[key] = deque()
+        self.calls[key].append((result, duration, refs))
+
+        origin = self._origins.get(handle)
+        similar = (origin, kind, member, self.similar_args(args))
+        if similar not in self.similar_calls:
+            self.similar_calls[similar] = deque()
+        self.similar_calls[similar].append((result, duration, refs))
+        if kind == "c":
+            self.methods.add((handle, member))
+            self._origin_methods.add((origin, member))
+        for position, returned in enumerate(list_handles([result, refs])):
+            if returned not in self._origins:
+                origin_key = (*similar, position)
+                if origin_key not in self._origin_ids:
+                    self._origin_ids[origin_key] = len(self._origin_ids) + 1
+                self._origins[returned] = self._origin_ids[origin_key]
+
+    def similar_args(self, args: list) -> str:
+        """Get the arguments of a call with the objects replaced by their origin"""
+
+        def replace(value):
+            if isinstance(value, list):
+                return [replace(item) for item in value]
+            if isinstance(value, dict) and "o" in value:
+                return {"s": self._origins.get(value["o"])}
+            return value
+
+        return json.dumps(replace(args), separators=(",", ":"))
+
+    def is_method(self, handle: int, member: str) -> bool:
+        """Return True if the member of an object was called as a method"""
+        member = member.lower()
+        if (handle, member) in self.methods:
+            return True
+        return (self._origins.get(handle), member) in self._origin_methods
+
+    def answer(self, handle: int, kind: str, member: str, args: tuple):
+        """
+        Get the recorded answer of a call and spend its latency. A call missing on the
+        object is answered with the calls of the objects of the same origin.
+        """
+        encoded_args = self.encode_args(args)
+        encoded = json.dumps(encoded_args, separators=(",", ":"))
+        queue = self.calls.get((handle, kind, member.lower(), encoded))
+        if queue is None:
+            queue = self.similar_calls.get(
+                (
+                    self._origins.get(handle),
+                    kind,
+                    member.lower(),
+                    self.similar_args(encoded_args),
+                )
+            )
+        if queue is None:
+            raise BackendError(f"The trace has no call to {member} with {encoded}")
+        result, duration, refs = queue.popleft() if len(queue) > 1 else queue[0]
+        self._clock.wait(duration)
+        output_args = [arg for arg in args if id(arg) in self._refs]
+        for arg, value in zip(output_args, refs):
+            arg.value = self.decode(value)
+        return self.decode(result)
+
+    def encode_args(self, args) -> list:
+        """Get the arguments of a trace from the arguments of a call"""
+        encoded = []
+        for arg in args:
+            if id(arg) in self._refs:
+                encoded.append({"r": self._refs[id(arg)][1].value})
+            elif id(arg) in self._views:
+                encoded.append({"v": 1})
+            elif isinstance(arg, ReplayObject):
+                encoded.append({"o": arg._handle})  # pylint: disable=protected-access
+            elif isinstance(arg, str):
+                encoded.append(self._paths.to_trace(arg))
+            elif isinstance(arg, bytes):
+                encoded.append({"b": arg.hex()})
+            elif isinstance(arg, PLAIN_TYPES):
+                encoded.append(arg)
+            elif isinstance(arg, (tuple, list)):
+                encoded.append(self.encode_args(arg))
+            else:
+                encoded.append({"x": type(arg).__name__})
+        return encoded
+
+    def decode(self, value):
+        """Get the returned value from a value of the trace"""
+        if isinstance(value, str):
+            return self._paths.from_trace(value)
+        if isinstance(value, list):
+            return tuple(self.decode(item) for item in value)
+        if not isinstance(value, dict):
+            return value
+        if "o" in value:
+            if value["o"] not in self._objects:
+                self._objects[value["o"]] = ReplayObject(self, value["o"])
+            return self._objects[value["o"]]
+        if "b" in value:
+            return bytes.fromhex(value["b"])
+        return value.get("x")
+
+    def is_available(self) -> bool:
+        return True
+
+    def open_app(self, sw_version: int):
+        return self.answer(APP_HANDLE, "a", "open_app", (sw_version,))
+
+    def byref(self, ref_type: RefType):
+        ref = FakeRef({RefType.INT: -1, RefType.STR: ""}.get(ref_type, False))
+        self._refs[id(ref)] = (ref, ref_type)
+        return ref
+
+    def views(self):
+        views = []
+        self._views[id(views)] = views
+        return views
+
+    def identity(self, obj):
+        # The objects are created once per handle
+        return obj
+
+    def create_files(self, folder: str) -> int:
+        """
+        Create the solidworks files of the recorded session as empty files under folder
+        if they are missing. Return the number of files created.
+        """
+        created = 0
+        for file in self.header.get("files", []):
+            path = os.path.join(folder, file.replace("/", os.sep))
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "wb"):
+                    pass
+                created += 1
+        return created
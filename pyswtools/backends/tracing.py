@@ -0,0 +1,210 @@
+"""
+Tracing of the calls made to solidworks.
+
+The application object is wrapped in a proxy which times each property access and method
+call, and wraps the objects it returns in their turn. The calls are aggregated by member
+name and by call site, the line of the commands which made the call.
+"""
+
+import inspect
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass
+
+from .base import Backend
+from .definitions import RefType
+
+# Values returned as they are by the proxy
+PLAIN_TYPES = (str, bytes, int, float, bool, type(None))
+
+BACKENDS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+@dataclass
+class CallStat:
+    """
+    Class representing the calls to a member
+    """
+
+    calls: int = 0
+    duration: float = 0.0
+
+    def dict(self):
+        """
+        Convert the class to a dict structure
+        """
+        return {
+            "calls": self.calls,
+            "duration": self.duration,
+            "mean": self.duration / self.calls if self.calls > 0 else 0.0,
+        }
+
+
+class ComProfiler:
+    """
+    Class representing the calls recorded by the tracing proxies
+    """
+
+    def __init__(self) -> None:
+        self.members = {}
+        self.sites = {}
+        # Hits and misses of the cache of the properties above the profiler, if any
+        self.cache_stats = None
+
+    def record(self, member: str, site: str, duration: float) -> None:
+        """Add a call to a member from a call site"""
+        for stats, key in ((self.members, member), (self.sites, (member, site))):
+            if key not in stats:
+                stats[key] = CallStat()
+            stats[key].calls += 1
+            stats[key].duration += duration
+
+    def dict(self):
+        """
+        Convert the calls to a dict structure, sorted by duration
+        """
+        members = sorted(self.members.items(), key=lambda i: -i[1].duration)
+        sites = sorted(self.sites.items(), key=lambda i: -i[1].duration)
+        data = {
+            "calls": sum(stat.calls for stat in self.members.values()),
+            "duration": sum(stat.duration for stat in self.members.values()),
+            "members": [{"member": k, **v.dict()} for k, v in members],
+            "sites": [{"member": k[0], "site": k[1], **v.dict()} for k, v in sites],
+        }
+        if self.cache_stats is not None:
+            data["cache"] = self.cache_stats.dict()
+        return data
+
+    def report(self, top: int) -> str:
+        """Get the tables of the top members and call sites by duration"""
+        data = self.dict()
+        lines = [
+            f"{data['calls']} calls to solidworks in {data['duration']:.3f}s",
+        ]
+        if "cache" in data:
+            lines.append(
+                f"Cached properties: {data['cache']['hits']} hits, "
+                f"{data['cache']['misses']} misses, "
+                f"{data['cache']['invalidations']} invalidations"
+            )
+        lines += [
+            f"{'Member':<32} | {'Calls':>8} | {'Total s':>9} | {'Mean ms':>8}",
+        ]
+        for item in data["members"][:top]:
+            lines.append(
+                f"{item['member']:<32} | {item['calls']:>8} | "
+                f"{item['duration']:>9.3f} | {item['mean'] * 1000:>8.3f}"
+            )
+        lines.append("")
+        lines.append(
+            f"{'Member':<32} | {'Call site':<48} | {'Calls':>8} | {'Total s':>9}"
+        )
+        for item in data["sites"][:top]:
+            lines.append(
+                f"{item['member']:<32} | {item['site']:<48} | {item['calls']:>8} | "
+                f"{item['duration']:>9.3f}"
+            )
+        return "\n".join(lines)
+
+    def export(self, path: str) -> None:
+        """Write the calls to a json file"""
+        with open(path, "w", encoding="utf8") as f:
+            json.dump(self.dict(), f, indent=2)
+
+
+def get_call_site(depth: int) -> str:
+    """
+    Get the file, line and function of the caller at depth, out of the proxies of the
+    backends
+    """
+    frame = sys._getframe(depth + 1)  # pylint: disable=protected-access
+    while frame.f_back is not None and frame.f_code.co_filename.startswith(
+        BACKENDS_DIR
+    ):
+        frame = frame.f_back
+    code = frame.f_code
+    # The modules of the commands are all named main.py, keep their package
+    path = os.path.normpath(code.co_filename).split(os.sep)[-2:]
+    return f"{'/'.join(path)}:{frame.f_lineno} {code.co_name}"
+
+
+def wrap(value, profiler: ComProfiler):
+    """Wrap the objects of a returned value in tracing proxies"""
+    if isinstance(value, (TracingProxy, *PLAIN_TYPES)):
+        return value
+    if isinstance(value, (tuple, list)):
+        return type(value)(wrap(item, profiler) for item in value)
+    return TracingProxy(value, profiler)
+
+
+def unwrap(value):
+    """Get the objects wrapped in an argument"""
+    if isinstance(value, TracingProxy):
+        return value._target  # pylint: disable=protected-access
+    if isinstance(value, (tuple, list)):
+        return type(value)(unwrap(item) for item in value)
+    return value
+
+
+class TracingProxy:
+    """
+    Class representing a solidworks object whose calls are recorded
+    """
+
+    def __init__(self, target, profiler: ComProfiler) -> None:
+        object.__setattr__(self, "_target", target)
+        object.__setattr__(self, "_profiler", profiler)
+
+    def __getattr__(self, name: str):
+        site = get_call_site(1)
+        start = time.perf_counter()
+        value = getattr(self._target, name)
+        duration = time.perf_counter() - start
+        # The COM objects are callable, only the methods are routines
+        if not inspect.isroutine(value):
+            self._profiler.record(name, site, duration)
+            return wrap(value, self._profiler)
+
+        def call(*args):
+            start = time.perf_counter()
+            result = value(*unwrap(args))
+            self._profiler.record(
+                name, get_call_site(1), duration + time.perf_counter() - start
+            )
+            return wrap(result, self._profiler)
+
+        return call
+
+    def __setattr__(self, name: str, value) -> None:
+        site = get_call_site(1)
+        start = time.perf_counter()
+        setattr(self._target, name, unwrap(value))
+        self._profiler.record(f"{name}=", site, time.perf_counter() - start)
+
+
+class TracingBackend(Backend):
+    """
+    Class representing a backend whose calls are recorded
+    """
+
+    def __init__(self, backend: Backend) -> None:
+        self.backend = backend
+        self.profiler = ComProfiler()
+        self.name = backend.name
+
+    def is_available(self) -> bool:
+        return self.backend.is_available()
+
+    def open_app(self, sw_version: int):
+        return TracingProxy(self.backend.open_app(sw_version), self.profiler)
+
+    def byref(self, ref_type: RefType):
+        return self.backend.byref(ref_type)
+
+    def views(self):
+        return self.backend.views()
+
+    def identity(self, obj):
+        return self.backend.identity(unwrap(obj))
@@ -6,18 +6,9 @@ import os
 import click
 
 # pylint: disable=relative-beyond-top-level
-from ..utils import check_system, check_system_verbose
+from ..utils import check_system_verbose
 from ..helper_sw import open_app_and_file, is_assembly, is_temp, is_file
 
-if check_system():
-    # pylint: disable=import-error
-    import win32com.client
-    import pythoncom
-
-    Views = []
-    VT_Views = win32com.client.VARIANT(pythoncom.VT_VARIANT, Views)
-    VT_BYREF = win32com.client.VARIANT(pythoncom.VT_BYREF | pythoncom.VT_I4, -1)
-
 
 def list_component(sw_comps, list_of_comps):
     """
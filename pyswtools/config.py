@@ -10,7 +10,7 @@ from pathlib import Path
 import click
 import rtoml as toml
 from appdirs import user_config_dir
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError, validator
 
 Shortcut = str
 UrlAlias = str
@@ -21,6 +21,42 @@ class Config(BaseModel):  # type: ignore
     """Config object"""
 
     sw_version: int = 2022
+    dxf_rules: list[str] = ["solidworks_text"]
+    dxf_dimension_layers: list[str] = ["*DIM*"]
+    dxf_hidden_linetypes: list[str] = ["HIDDEN*", "DASHED*", "PHANTOM*"]
+    dxf_construction_layers: list[str] = ["*CONSTRUCTION*"]
+    dxf_flatten_curves: bool = False
+    dxf_merge_duplicates: bool = False
+    dxf_validate_contours: bool = False
+    dxf_optimize_path: bool = False
+    dxf_compact: bool = False
+    dxf_version: str = ""
+    dxf_binary: bool = False
+    dxf_tolerance: float = 1e-3
+    dxf_chord_tolerance: float = 1e-2
+    dxf_snap_tolerance: float = 0.0
+    dxf_sheet_width: float = 3000.0
+    dxf_sheet_height: float = 1500.0
+    dxf_nest_spacing: float = 5.0
+    stl_weld_tolerance: float = 1e-5
+    stat_cache_size: int = 100000
+    stat_cache_hash: bool = False
+
+    # pylint: disable=no-self-argument
+    @validator(
+        "dxf_rules",
+        "dxf_dimension_layers",
+        "dxf_hidden_linetypes",
+        "dxf_construction_layers",
+        pre=True,
+    )
+    def split_list(cls, value):
+        """
+        Split the lists given as a comma separated string
+        """
+        if isinstance(value, str):
+            return [item.strip() for item in value.split(",") if item.strip() != ""]
+        return value
 
     @classmethod
     def parse_toml(cls, file: Path) -> "Config":
@@ -124,8 +160,14 @@ def set_value(name: str, value) -> None:
             click.echo(f"The config value {name} does not exists")
         else:
             conf[name] = value
+            # The value is converted to the type of the field before being written
+            try:
+                conf = Config.parse_obj(conf).dict()
+            except ValidationError as err:
+                click.echo(f"Invalid value for {name}: {err}")
+                return
             toml.dump(conf, config_file)
-            click.echo(f"{name} set to {value}")
+            click.echo(f"{name} set to {conf[name]}")
     else:
         click.echo(
             "No pyswtools.toml exists cannot update its value. Call the init command first."
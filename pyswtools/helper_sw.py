@@ -4,15 +4,14 @@ Sets of functions to help using the api of solidworks
 
 import os
 
-import win32com.client
-import pythoncom
-
-
+from .backends import RefType, get_backend
 from .config import get_config
 
-Views = []
-VT_Views = win32com.client.VARIANT(pythoncom.VT_VARIANT, Views)
-VT_BYREF = win32com.client.VARIANT(pythoncom.VT_BYREF | pythoncom.VT_I4, -1)
+# Options of OpenDoc6
+OPEN_SILENT = 1
+OPEN_READ_ONLY = 2
+OPEN_OVERRIDE_DEFAULT_LIGHTWEIGHT = 64
+OPEN_LOAD_LIGHTWEIGHT = 128
 
 
 def open_app():
@@ -21,12 +20,30 @@ def open_app():
     """
     conf = get_config()
 
-    return win32com.client.Dispatch(
-        f"SldWorks.Application.{(int(conf.sw_version)-2012+20)}"
-    )
+    return get_backend().open_app(conf.sw_version)
+
+
+def get_byref_int():
+    """Create an output integer argument"""
+    return get_backend().byref(RefType.INT)
+
+
+def get_byref_str():
+    """Create an output string argument"""
+    return get_backend().byref(RefType.STR)
 
 
-def open_app_and_file(path_file: str):
+def get_byref_bool():
+    """Create an output boolean argument"""
+    return get_backend().byref(RefType.BOOL)
+
+
+def get_views():
+    """Create the empty array of views of the exports"""
+    return get_backend().views()
+
+
+def open_app_and_file(path_file: str, options: int = OPEN_SILENT):
     """
     Create app, open document in it and then activate it
     """
@@ -34,37 +51,46 @@ def open_app_and_file(path_file: str):
     sw_app = open_app()
 
     # Open the file
-    sw_doc, filename = open_file(sw_app, path_file)
+    sw_doc, filename = open_file(sw_app, path_file, options)
 
     return sw_app, sw_doc, filename
 
 
-def open_file(sw_app, path_file: str):
+def open_file(sw_app, path_file: str, options: int = OPEN_SILENT):
     """
     Create open document activate it
     """
     # Open the assembly
 
-    # Default file type is part
-    type_file = 1
-    if is_assembly(path_file):
-        type_file = 2
-    elif is_drawing(path_file):
-        type_file = 3
+    type_file = get_type_file(path_file)
 
     sw_doc = sw_app.OpenDoc6(
-        os.path.abspath(path_file), type_file, 1, "", VT_BYREF, VT_BYREF
+        os.path.abspath(path_file),
+        type_file,
+        options,
+        "",
+        get_byref_int(),
+        get_byref_int(),
     )
 
     # Get the filename
     _, filename = os.path.split(path_file)
 
     # Activate it
-    sw_app.ActivateDoc3(filename, True, 2, VT_BYREF)
+    sw_app.ActivateDoc3(filename, True, 2, get_byref_int())
 
     return sw_doc, filename
 
 
+def get_type_file(path: str) -> int:
+    """Get the type of document of a path, part by default"""
+    if is_assembly(path):
+        return 2
+    if is_drawing(path):
+        return 3
+    return 1
+
+
 def is_drawing(path: str) -> bool:
     """Return True if paths point to a drawing file"""
     return ".SLDDRW" in path.upper()
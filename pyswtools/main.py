@@ -4,6 +4,15 @@ Main file of the package which define the CLI and each submodule
 
 import click
 
+from .backends import (
+    BackendError,
+    BackendType,
+    CachingBackend,
+    RecordingBackend,
+    TracingBackend,
+    create_backend,
+    set_backend,
+)
 from .config import config
 from .ready_dxf.main import ready_dxf
 from .copy_full_assembly.main import copy_full_assembly
@@ -12,7 +21,6 @@ from .stat.main import stat
 from .clean.main import clean
 from .properties.main import properties
 
-
 __version__ = "0.8.1"
 __author__ = "Devillez Louis"
 __maintainer__ = "Devillez Louis"
@@ -22,10 +30,115 @@ __email__ = "louis.devillez@gmail.com"
 @click.group()
 @click.version_option(__version__, "-v", "--version")
 @click.help_option("-h", "--help")
-def cli() -> None:
+@click.option(
+    "--backend",
+    "backend",
+    type=click.Choice(BackendType),
+    default=BackendType.COM,
+    help="Backend used to reach solidworks. fake answers from a description file.",
+)
+@click.option(
+    "--backend-file",
+    "backend_file",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="Documents of the fake backend or trace of the replay backend.",
+)
+@click.option(
+    "--latency",
+    "latency",
+    type=click.FloatRange(min=0),
+    default=None,
+    help="Seconds spent in each call of the fake backend. Default from the description.",
+)
+@click.option(
+    "--latency-scale",
+    "latency_scale",
+    type=click.FloatRange(min=0),
+    default=1.0,
+    help="Factor applied to the recorded latencies by the replay backend, 0 to skip them.",
+)
+@click.option(
+    "--record",
+    "record_path",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Record the calls to solidworks to a trace, compressed if it ends with .gz.",
+)
+@click.option(
+    "--profile-com",
+    "profile_com",
+    is_flag=True,
+    default=False,
+    help="Count and time the calls to solidworks and display the slowest ones.",
+)
+@click.option(
+    "--profile-top",
+    "profile_top",
+    type=click.IntRange(min=1),
+    default=20,
+    help="Number of members and call sites displayed by --profile-com.",
+)
+@click.option(
+    "--profile-output",
+    "profile_output",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Write the calls recorded by --profile-com to a json file instead.",
+)
+@click.option(
+    "--com-cache/--no-com-cache",
+    "com_cache",
+    default=True,
+    help="Memoise the read only properties of the solidworks objects.",
+)
+# pylint: disable=too-many-arguments
+def cli(
+    backend,
+    backend_file,
+    latency,
+    latency_scale,
+    record_path,
+    com_cache,
+    profile_com,
+    profile_top,
+    profile_output,
+) -> None:
     """
     Combination of commands to help you work with solidworks
     """
+    try:
+        sw_backend = create_backend(backend, backend_file, latency, latency_scale)
+        if record_path is not None:
+            sw_backend = RecordingBackend(sw_backend, record_path)
+    except BackendError as err:
+        raise click.UsageError(str(err)) from err
+
+    ctx = click.get_current_context()
+    if record_path is not None:
+        ctx.call_on_close(sw_backend.close)
+    # The profiler sees the calls which reach solidworks, under the cache
+    profiler = None
+    if profile_com:
+        sw_backend = TracingBackend(sw_backend)
+        profiler = sw_backend.profiler
+        ctx.call_on_close(lambda: report_profile(profiler, profile_top, profile_output))
+    if com_cache:
+        sw_backend = CachingBackend(sw_backend)
+        if profiler is not None:
+            profiler.cache_stats = sw_backend.stats
+    set_backend(sw_backend)
+
+
+def report_profile(profiler, top: int, output_path: str | None) -> None:
+    """
+    Display the calls recorded by the profiler or write them to a json file
+    """
+    if output_path is None:
+        click.echo(profiler.report(top))
+    else:
+        profiler.export(output_path)
+        click.echo(f"Calls to solidworks written to {output_path}")
 
 
 cli.add_command(config)
@@ -37,4 +150,4 @@ cli.add_command(clean)
 cli.add_command(properties)
 
 if __name__ == "__main__":
-    cli()
+    cli()  # pylint: disable=no-value-for-parameter
@@ -7,17 +7,17 @@ import click
 import copy
 
 # pylint: disable=relative-beyond-top-level
-from ..utils import check_system, check_system_verbose, do_windows_clipboard
-from ..helper_sw import open_app_and_file, is_temp, is_assembly, is_file, open_file
-
-if check_system():
-    # pylint: disable=import-error
-    import win32com.client
-    import pythoncom
-
-    Views = []
-    VT_Views = win32com.client.VARIANT(pythoncom.VT_VARIANT, Views)
-    VT_BYREF = win32com.client.VARIANT(pythoncom.VT_BYREF | pythoncom.VT_I4, -1)
+from ..utils import check_system_verbose, do_windows_clipboard
+from ..helper_sw import (
+    open_app_and_file,
+    is_temp,
+    is_assembly,
+    is_file,
+    open_file,
+    get_byref_bool,
+    get_byref_int,
+    get_byref_str,
+)
 
 
 def fetch_properties(sw_doc):
@@ -37,19 +37,11 @@ def fetch_properties(sw_doc):
         for name_prop in names_props:
             type_prop = ext.GetType2(name_prop)
 
-            value_prop = win32com.client.VARIANT(
-                pythoncom.VT_BYREF | pythoncom.VT_BSTR, ""
-            )
-            resolved_value_prop = win32com.client.VARIANT(
-                pythoncom.VT_BYREF | pythoncom.VT_BSTR, ""
-            )
+            value_prop = get_byref_str()
+            resolved_value_prop = get_byref_str()
 
-            was_resolved = win32com.client.VARIANT(
-                pythoncom.VT_BYREF | pythoncom.VT_BOOL, bool()
-            )
-            link_to_property = win32com.client.VARIANT(
-                pythoncom.VT_BYREF | pythoncom.VT_BOOL, bool()
-            )
+            was_resolved = get_byref_bool()
+            link_to_property = get_byref_bool()
 
             ext.Get6(
                 name_prop,
@@ -76,7 +68,7 @@ def apply_props_to_doc(sw_doc, props):
             ext.Add3(k, v["type"], v["value"], 0)
 
     # Need to save the document
-    sw_doc.save3(1, VT_BYREF, VT_BYREF)
+    sw_doc.save3(1, get_byref_int(), get_byref_int())
 
 
 def apply_props_to_children(sw_comp_children, props):
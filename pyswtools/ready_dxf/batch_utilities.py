@@ -0,0 +1,309 @@
+"""Module to apply the cleaning process to a batch of files"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from functools import partial
+from typing import Iterable, Iterator
+
+from ..utils import hash_file
+from .closure_utilities import format_gap, get_validation_path
+from .definitions import CleanOptions, CleanReport, Engine, FileResult, FileStatus
+from .dxf_utilities import clean_and_save, get_rules_version
+from .file_utilities import (
+    check_file,
+    discover_files,
+    link_or_copy,
+    unlink_shared,
+)
+from .manifest_utilities import Manifest
+from .stream_utilities import StreamNotSupported, stream_clean
+
+
+def clean_with_engine(
+    path: str, save_path: str, engine: Engine, options: CleanOptions
+) -> tuple[Engine, CleanReport]:
+    """
+    Clean the file at path with the requested engine and return the engine used.
+    In AUTO mode, the stream engine is tried first and ezdxf is used as a fallback.
+    The stream engine only knows how to remove the solidworks text.
+    """
+    if engine is Engine.STREAM and not options.is_stream_compatible():
+        raise StreamNotSupported("The stream engine only applies solidworks_text")
+
+    if engine is not Engine.EZDXF and options.is_stream_compatible():
+        try:
+            start = time.perf_counter()
+            removed = stream_clean(path, save_path)
+            return Engine.STREAM, CleanReport(
+                deleted={"solidworks_text": removed},
+                timings={"solidworks_text": time.perf_counter() - start},
+            )
+        except StreamNotSupported:
+            if engine is Engine.STREAM:
+                raise
+
+    return Engine.EZDXF, clean_and_save(path, save_path, options)
+
+
+def clean_file(
+    path: str,
+    save_path: str,
+    engine: Engine = Engine.AUTO,
+    options: CleanOptions | None = None,
+    digest: str = "",
+) -> FileResult:
+    """
+    Read, clean and save a single file. The hash of the file is computed if the digest
+    is not given.
+    Errors are reported in the result instead of being raised so a batch is never aborted.
+    """
+    if not check_file(path):
+        return FileResult(path, save_path, FileStatus.IGNORED)
+
+    start = time.perf_counter()
+    try:
+        digest = digest or hash_file(path)
+        unlink_shared(save_path)
+        unlink_shared(get_validation_path(save_path))
+        used_engine, report = clean_with_engine(
+            path, save_path, engine, options or CleanOptions()
+        )
+    # pylint: disable=broad-except
+    except Exception as err:
+        return FileResult(
+            path,
+            save_path,
+            FileStatus.ERROR,
+            error=f"{type(err).__name__}: {err}",
+            duration=time.perf_counter() - start,
+        )
+    return FileResult(
+        path,
+        save_path,
+        FileStatus.CLEANED,
+        duration=time.perf_counter() - start,
+        engine=used_engine,
+        digest=digest,
+        report=report,
+    )
+
+
+def clean_known_file(
+    path: str,
+    save_path: str,
+    digest: str,
+    engine: Engine = Engine.AUTO,
+    options: CleanOptions | None = None,
+) -> FileResult:
+    """Clean a single file whose hash can be already known, for the pool of processes"""
+    return clean_file(path, save_path, engine, options, digest)
+
+
+def get_number_jobs(jobs: int) -> int:
+    """
+    Get the number of processes to use. 0 means one per core.
+    """
+    if jobs <= 0:
+        return os.cpu_count() or 1
+    return jobs
+
+
+def clean_batch(
+    pairs: Iterable[tuple[str, str]],
+    jobs: int = 1,
+    engine: Engine = Engine.AUTO,
+    options: CleanOptions | None = None,
+    digests: dict[str, str] | None = None,
+) -> Iterator[FileResult]:
+    """
+    Clean each (input, output) pair and yield the results in the same order as the pairs.
+    With more than one job, the files are spread over a pool of processes.
+    The hashes of the inputs already known can be given in digests.
+    """
+    jobs = get_number_jobs(jobs)
+    pairs = list(pairs)
+    digests = digests or {}
+
+    if jobs == 1 or len(pairs) < 2:
+        for path, save_path in pairs:
+            yield clean_file(path, save_path, engine, options, digests.get(path, ""))
+        return
+
+    jobs = min(jobs, len(pairs))
+    # Send the files by chunks to limit the overhead of the inter-process communication
+    chunksize = max(1, len(pairs) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        yield from executor.map(
+            partial(clean_known_file, engine=engine, options=options),
+            [path for path, _ in pairs],
+            [save_path for _, save_path in pairs],
+            [digests.get(path, "") for path, _ in pairs],
+            chunksize=chunksize,
+        )
+
+
+def group_duplicates(
+    pairs: list[tuple[str, str]],
+) -> tuple[list[tuple[str, str]], dict[str, list[tuple[str, str]]], dict[str, str]]:
+    """
+    Hash the inputs and keep the first pair of each content.
+    Return the unique pairs, the copies of each unique input and the hashes.
+    """
+    digests = {}
+    first = {}
+    unique = []
+    copies = {}
+    for path, save_path in pairs:
+        try:
+            digests[path] = hash_file(path)
+        except OSError:
+            # The error is reported when the file is cleaned
+            unique.append((path, save_path))
+            continue
+        if digests[path] in first:
+            copies.setdefault(first[digests[path]], []).append((path, save_path))
+        else:
+            first[digests[path]] = path
+            unique.append((path, save_path))
+    return unique, copies, digests
+
+
+def clean_folder(
+    path: str,
+    save_path: str,
+    jobs: int = 1,
+    engine: Engine = Engine.AUTO,
+    force: bool = False,
+    options: CleanOptions | None = None,
+) -> Iterator[FileResult]:
+    """
+    Clean all the dxf files of a folder recursively and yield the results.
+    The files which did not change since the previous run are skipped unless force is set
+    and the outputs of the removed inputs are pruned.
+    The files with the same content are cleaned once and the result is linked to the
+    outputs of the copies.
+    """
+    # The manifest is also loaded when forced to prune the outputs of the removed inputs
+    manifest = Manifest.load(path, save_path, get_rules_version(options))
+
+    seen = set()
+    pending = []
+    stats = {}
+    for npath, nsave_path in discover_files(path, save_path):
+        if not check_file(npath):
+            yield FileResult(npath, nsave_path, FileStatus.IGNORED)
+            continue
+
+        seen.add(manifest.key(npath))
+        stats[npath] = os.stat(npath)
+        if not force and manifest.is_unchanged(npath, nsave_path, stats[npath]):
+            yield FileResult(npath, nsave_path, FileStatus.SKIPPED)
+        else:
+            pending.append((npath, nsave_path))
+
+    unique, copies, digests = group_duplicates(pending)
+
+    try:
+        for result in clean_batch(unique, jobs, engine, options, digests):
+            if result.status is FileStatus.CLEANED:
+                manifest.update(result.path, stats[result.path], result.digest)
+            else:
+                manifest.remove(result.path)
+            yield result
+
+            for npath, nsave_path in copies.get(result.path, []):
+                if result.status is FileStatus.CLEANED:
+                    link_or_copy(result.save_path, nsave_path)
+                    if os.path.exists(get_validation_path(result.save_path)):
+                        link_or_copy(
+                            get_validation_path(result.save_path),
+                            get_validation_path(nsave_path),
+                        )
+                    manifest.update(npath, stats[npath], result.digest)
+                    yield FileResult(
+                        npath,
+                        nsave_path,
+                        FileStatus.DUPLICATE,
+                        digest=result.digest,
+                        # The copy has the same report but took no time
+                        report=(
+                            replace(result.report, timings={})
+                            if result.report is not None
+                            else None
+                        ),
+                    )
+                else:
+                    manifest.remove(npath)
+                    yield FileResult(
+                        npath,
+                        nsave_path,
+                        FileStatus.ERROR,
+                        error=f"same content as {result.path}, {result.error}",
+                    )
+
+        for npath, nsave_path in manifest.prune(seen):
+            yield FileResult(npath, nsave_path, FileStatus.PRUNED)
+    finally:
+        # Keep the progress even if the batch is interrupted
+        manifest.save()
+
+
+def summarize(results: list[FileResult], duration: float) -> str:
+    """
+    Build a summary of the results of a batch
+    """
+    count = {status: 0 for status in FileStatus}
+    for result in results:
+        count[result.status] += 1
+
+    lines = [
+        f"{count[FileStatus.CLEANED]} cleaned, {count[FileStatus.ERROR]} errors, "
+        f"{count[FileStatus.IGNORED]} ignored, {count[FileStatus.SKIPPED]} unchanged, "
+        f"{count[FileStatus.PRUNED]} pruned, {count[FileStatus.DUPLICATE]} duplicates "
+        f"in {duration:.2f}s"
+    ]
+    engines = {
+        engine: sum(1 for result in results if result.engine is engine)
+        for engine in (Engine.STREAM, Engine.EZDXF)
+    }
+    lines.append(
+        f"{engines[Engine.STREAM]} with the stream engine, "
+        f"{engines[Engine.EZDXF]} with ezdxf"
+    )
+    report = CleanReport()
+    for result in results:
+        if result.report is not None:
+            report.merge(result.report)
+    for name, timing in report.timings.items():
+        if name in report.deleted:
+            lines.append(f"- {name}: {report.deleted[name]} deleted in {timing:.3f}s")
+        else:
+            lines.append(f"- {name}: {timing:.3f}s")
+    if "flattened_curves" in report.measures:
+        lines.append(
+            f"Flattened curves: {report.measures['flattened_curves']:.0f} converted, "
+            f"{report.measures['max_flatten_deviation']:.4f} of maximum deviation"
+        )
+    if "exploded_blocks" in report.measures:
+        lines.append(f"Exploded blocks: {report.measures['exploded_blocks']:.0f}")
+    if "bytes_saved" in report.measures:
+        lines.append(f"Bytes saved: {report.measures['bytes_saved']:.0f}")
+    if "open_ends" in report.measures:
+        lines.append(
+            f"Open contours: {report.measures['open_ends']:.0f} open ends in "
+            f"{report.measures['open_files']:.0f} files, largest gap "
+            f"{format_gap(report.measures['max_gap'])}, "
+            f"{report.measures['snapped_gaps']:.0f} gaps snapped"
+        )
+    if "travel_before" in report.measures:
+        lines.append(
+            f"Travel distance: {report.measures['travel_before']:.1f} before, "
+            f"{report.measures['travel_after']:.1f} after"
+        )
+
+    for result in results:
+        if result.status is FileStatus.ERROR:
+            lines.append(f"- {result.path}: {result.error}")
+    return "\n".join(lines)
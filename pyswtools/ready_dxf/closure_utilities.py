@@ -0,0 +1,216 @@
+"""
+Module to check that the contours of the model space are closed.
+
+The ends of the open curves are put in a grid: the ends closer than the tolerance are
+joined, and an end joined to no other one is an open end of a contour. The open ends
+closer than the snap tolerance are paired and moved to the same point.
+"""
+
+import json
+import math
+import os
+
+import numpy as np
+import ezdxf
+
+from .definitions import ContourValidation
+from .geometry_utilities import close_pairs, cluster_points, get_arc_wcs, query_pairs
+
+# Entities whose ends can be moved without changing their shape too much
+MOVABLE_TYPES = ("LINE", "LWPOLYLINE", "POLYLINE")
+
+# The gap of an open end is first searched up to this factor of the tolerance, or up to
+# twice the snap tolerance
+GAP_SEARCH_FACTOR = 1000
+
+
+def get_ends(entity) -> tuple[tuple[float, float], tuple[float, float]] | None:
+    """
+    Get the ends of an open curve in the xy plane.
+    Return None for the closed curves and the entities which are not curves.
+    """
+    dxftype = entity.dxftype()
+    if dxftype == "LINE":
+        start, end = entity.dxf.start, entity.dxf.end
+        return (start.x, start.y), (end.x, end.y)
+    if dxftype == "ARC":
+        wcs = get_arc_wcs(entity)
+        if wcs is None:
+            return None
+        x, y, radius, start, end = wcs
+        start, end = math.radians(start), math.radians(end)
+        return (
+            (x + radius * math.cos(start), y + radius * math.sin(start)),
+            (x + radius * math.cos(end), y + radius * math.sin(end)),
+        )
+    if dxftype in ("LWPOLYLINE", "POLYLINE"):
+        return get_polyline_ends(entity)
+    if dxftype in ("SPLINE", "ELLIPSE"):
+        return get_curve_ends(entity)
+    return None
+
+
+def get_polyline_ends(
+    entity,
+) -> tuple[tuple[float, float], tuple[float, float]] | None:
+    """Get the ends of an open 2d polyline, None if it is closed"""
+    if entity.dxftype() == "LWPOLYLINE":
+        if entity.closed or len(entity) < 2:
+            return None
+        points = entity.get_points("xy")
+        return tuple(points[0]), tuple(points[-1])
+    if entity.is_closed or not entity.is_2d_polyline or len(entity) < 2:
+        return None
+    start, end = entity.vertices[0].dxf.location, entity.vertices[-1].dxf.location
+    return (start.x, start.y), (end.x, end.y)
+
+
+def get_curve_ends(entity) -> tuple[tuple[float, float], tuple[float, float]] | None:
+    """Get the ends of an open spline or elliptic arc, None if it is closed"""
+    if entity.dxftype() == "SPLINE":
+        if entity.closed:
+            return None
+        tool = entity.construction_tool()
+        start, end = tool.point(0), tool.point(tool.max_t)
+    else:
+        tool = entity.construction_tool()
+        start, end = tool.start_point, tool.end_point
+    if start.isclose(end):
+        return None
+    return (start.x, start.y), (end.x, end.y)
+
+
+def move_end(entity, side: int, point: tuple[float, float]) -> None:
+    """Move the start (side 0) or the end (side 1) of a movable curve to point"""
+    dxftype = entity.dxftype()
+    if dxftype == "LINE":
+        name = "start" if side == 0 else "end"
+        entity.dxf.set(name, (point[0], point[1], entity.dxf.get(name).z))
+    elif dxftype == "LWPOLYLINE":
+        idx = 0 if side == 0 else len(entity) - 1
+        vertex = list(entity[idx])
+        vertex[0], vertex[1] = point
+        entity[idx] = vertex
+    else:
+        vertex = entity.vertices[0 if side == 0 else -1]
+        vertex.dxf.location = (point[0], point[1], vertex.dxf.location.z)
+
+
+def snap_gaps(
+    entities: list, points: np.ndarray, owners: np.ndarray, snap_tolerance: float
+) -> tuple[list[tuple[float, float, float]], np.ndarray]:
+    """
+    Pair the open ends closer than snap_tolerance, the closest first, and move them to
+    the same point. Return the snapped gaps (x, y, gap) and which ends were snapped.
+    """
+    snapped = []
+    used = np.zeros(len(points), dtype=bool)
+    pair_i, pair_j, dist = close_pairs(points, snap_tolerance)
+    for idx in np.argsort(dist, kind="stable"):
+        i, j = pair_i[idx], pair_j[idx]
+        # Joining the two ends of a curve would collapse it
+        if used[i] or used[j] or owners[i] // 2 == owners[j] // 2:
+            continue
+        entity_i, entity_j = entities[owners[i] // 2], entities[owners[j] // 2]
+        movable_i = entity_i.dxftype() in MOVABLE_TYPES
+        movable_j = entity_j.dxftype() in MOVABLE_TYPES
+        if not movable_i and not movable_j:
+            continue
+
+        if movable_i and movable_j:
+            target = (points[i] + points[j]) / 2
+        else:
+            target = points[j] if movable_i else points[i]
+        target = (float(target[0]), float(target[1]))
+        if movable_i:
+            move_end(entity_i, owners[i] % 2, target)
+        if movable_j:
+            move_end(entity_j, owners[j] % 2, target)
+        used[i] = used[j] = True
+        snapped.append((*target, float(dist[idx])))
+    return snapped, used
+
+
+def validate_contours(
+    doc: ezdxf.document.Drawing, tolerance: float, snap_tolerance: float = 0.0
+) -> ContourValidation:
+    """
+    Find the open ends of the contours of the model space, the ends closer than
+    tolerance being joined. With a snap tolerance, close the gaps smaller than it.
+    """
+    entities = []
+    ends = []
+    for entity in doc.modelspace():
+        entity_ends = get_ends(entity)
+        if entity_ends is not None:
+            entities.append(entity)
+            ends.extend(entity_ends)
+    if len(ends) == 0:
+        return ContourValidation()
+
+    # End 2 * k is the start of the entity k and 2 * k + 1 its end
+    points = np.array(ends, dtype=float)
+    node = cluster_points(points, tolerance)
+    degree = np.bincount(node)
+    open_ends = np.flatnonzero(degree[node] == 1)
+
+    validation = ContourValidation()
+    if snap_tolerance > tolerance and len(open_ends) > 1:
+        snapped, used = snap_gaps(
+            entities, points[open_ends], open_ends, snap_tolerance
+        )
+        validation.snapped = snapped
+        open_ends = open_ends[~used]
+
+    radius = max(GAP_SEARCH_FACTOR * tolerance, 2 * snap_tolerance)
+    gaps = get_gaps(points[open_ends], open_ends, radius)
+    validation.open_ends = [
+        (x, y, gap) for (x, y), gap in zip(points[open_ends].tolist(), gaps.tolist())
+    ]
+    return validation
+
+
+def get_gaps(points: np.ndarray, owners: np.ndarray, radius: float) -> np.ndarray:
+    """
+    Get the distance from each open end to the closest open end of another curve,
+    infinite if there is none. The ends with no other end within radius are searched
+    again from the mean spacing of the ends, the radius being doubled each time until
+    it covers all the ends.
+    """
+    gaps = np.full(len(points), np.inf)
+    pair_i, pair_j, dist = close_pairs(points, radius)
+    other = owners[pair_i] // 2 != owners[pair_j] // 2
+    np.minimum.at(gaps, pair_i[other], dist[other])
+    np.minimum.at(gaps, pair_j[other], dist[other])
+
+    far = np.flatnonzero(np.isinf(gaps))
+    if len(far) == 0:
+        return gaps
+    extent = float(np.ptp(points, axis=0).max())
+    # Start from the mean spacing of the ends, as if they were spread evenly
+    radius = max(radius, extent / math.sqrt(len(points)) / 2)
+    while len(far) > 0 and radius < 2 * extent:
+        radius *= 2
+        query, point, dist = query_pairs(points[far], points, radius)
+        other = owners[far[query]] // 2 != owners[point] // 2
+        found = np.full(len(far), np.inf)
+        np.minimum.at(found, query[other], dist[other])
+        gaps[far] = found
+        far = far[np.isinf(found)]
+    return gaps
+
+
+def format_gap(gap: float) -> str:
+    """Format the size of a gap, the gap of an open end without any other being unbounded"""
+    return f"{gap:.4f}" if math.isfinite(gap) else "unbounded"
+
+
+def get_validation_path(save_path: str) -> str:
+    """Get the path of the json report of the contours of a cleaned file"""
+    return os.path.splitext(save_path)[0] + "_contours.json"
+
+
+def write_validation(validation: ContourValidation, report_path: str) -> None:
+    """Write the open ends and the snapped gaps of a file to a json report"""
+    with open(report_path, "w", encoding="utf8") as f:
+        json.dump(validation.dict(), f, indent=2)
@@ -0,0 +1,206 @@
+"""
+Module to compact the dxf documents before saving them.
+
+The blocks referenced only once from a layout are exploded, then the blocks which can not
+be reached from a layout, the empty blocks and the table entries (layers, linetypes, text
+styles and dimension styles) used by no entity are removed.
+"""
+
+import ezdxf
+
+# Table entries which must always exist in a document
+PROTECTED_ENTRIES = {
+    "layers": {"0", "DEFPOINTS"},
+    "linetypes": {"BYLAYER", "BYBLOCK", "CONTINUOUS"},
+    "styles": {"STANDARD"},
+    "dimstyles": {"STANDARD"},
+}
+
+# Header variables referencing a table entry
+HEADER_ENTRIES = {
+    "layers": "$CLAYER",
+    "linetypes": "$CELTYPE",
+    "styles": "$TEXTSTYLE",
+    "dimstyles": "$DIMSTYLE",
+}
+
+
+def get_block_references(entity) -> list[str]:
+    """Get the names of the blocks used by an entity"""
+    dxftype = entity.dxftype()
+    if dxftype == "INSERT":
+        return [entity.dxf.name]
+    if dxftype == "DIMENSION" and entity.dxf.hasattr("geometry"):
+        return [entity.dxf.geometry]
+    return []
+
+
+def get_reachable_blocks(doc: ezdxf.document.Drawing) -> set[str]:
+    """Get the names (upper case) of the blocks reachable from the layouts"""
+    pending = [bloc for bloc in doc.blocks if bloc.is_any_layout]
+    reachable = {bloc.name.upper() for bloc in pending}
+    while len(pending) > 0:
+        bloc = pending.pop()
+        for entity in bloc:
+            for name in get_block_references(entity):
+                if name.upper() not in reachable and name in doc.blocks:
+                    reachable.add(name.upper())
+                    pending.append(doc.blocks.get(name))
+    return reachable
+
+
+def is_protected_block(name: str) -> bool:
+    """
+    The arrow blocks (starting with _) can be referenced by the dimension styles and
+    are kept
+    """
+    return name.startswith("_")
+
+
+def explode_single_use_blocks(doc: ezdxf.document.Drawing) -> int:
+    """
+    Explode the references of the blocks used once in all the document when the
+    reference is in a layout. Return the number of exploded references.
+    """
+    reachable = get_reachable_blocks(doc)
+    counts = {}
+    for bloc in doc.blocks:
+        if bloc.name.upper() not in reachable:
+            continue
+        for entity in bloc:
+            for name in get_block_references(entity):
+                # A MINSERT draws the block several times
+                weight = entity.mcount if entity.dxftype() == "INSERT" else 2
+                counts[name.upper()] = counts.get(name.upper(), 0) + weight
+
+    candidates = []
+    for bloc in doc.blocks:
+        if not bloc.is_any_layout:
+            continue
+        for entity in bloc.query("INSERT"):
+            name = entity.dxf.name
+            if (
+                counts.get(name.upper(), 0) == 1
+                and not name.startswith("*")
+                and not is_protected_block(name)
+                and entity.has_uniform_scaling
+            ):
+                candidates.append(entity)
+
+    for insert in candidates:
+        insert.explode()
+    return len(candidates)
+
+
+def purge_blocks(doc: ezdxf.document.Drawing) -> int:
+    """
+    Delete the blocks which can not be reached from a layout and the empty blocks with
+    their references. Return the number of deleted blocks.
+    """
+    deleted = 0
+    while True:
+        reachable = get_reachable_blocks(doc)
+        empty = {
+            bloc.name.upper()
+            for bloc in doc.blocks
+            if not bloc.is_any_layout
+            and len(bloc) == 0
+            and not is_protected_block(bloc.name)
+        }
+        to_delete = [
+            bloc.name
+            for bloc in doc.blocks
+            if not bloc.is_any_layout
+            and not is_protected_block(bloc.name)
+            and (bloc.name.upper() not in reachable or bloc.name.upper() in empty)
+        ]
+        if len(to_delete) == 0:
+            return deleted
+
+        if len(empty) > 0:
+            for bloc in doc.blocks:
+                references = [
+                    entity
+                    for entity in bloc
+                    if entity.dxftype() == "INSERT" and entity.dxf.name.upper() in empty
+                ]
+                for entity in references:
+                    bloc.delete_entity(entity)
+        for name in to_delete:
+            doc.blocks.delete_block(name, safe=False)
+        deleted += len(to_delete)
+
+
+def add_used_entries(used: dict[str, set[str]], entity) -> None:
+    """Add the names (upper case) of the table entries used by an entity"""
+    used["layers"].add(entity.dxf.get("layer", "0").upper())
+    used["linetypes"].add(entity.dxf.get("linetype", "BYLAYER").upper())
+    if entity.dxf.hasattr("style"):
+        used["styles"].add(entity.dxf.style.upper())
+    if entity.dxf.hasattr("dimstyle"):
+        used["dimstyles"].add(entity.dxf.dimstyle.upper())
+
+
+def collect_used_entries(doc: ezdxf.document.Drawing) -> dict[str, set[str]]:
+    """Get the names (upper case) of the table entries used in the document"""
+    used = {table: set(names) for table, names in PROTECTED_ENTRIES.items()}
+    for table, variable in HEADER_ENTRIES.items():
+        if variable in doc.header:
+            used[table].add(str(doc.header[variable]).upper())
+
+    for bloc in doc.blocks:
+        used["layers"].add(bloc.block.dxf.layer.upper())
+        for entity in bloc:
+            add_used_entries(used, entity)
+            # The attributes of a reference are not entities of the block
+            if entity.dxftype() == "INSERT":
+                for attrib in entity.attribs:
+                    add_used_entries(used, attrib)
+
+    # The table entries can reference other table entries
+    for layer in doc.layers:
+        if layer.dxf.name.upper() in used["layers"]:
+            used["linetypes"].add(layer.dxf.linetype.upper())
+    for dimstyle in doc.dimstyles:
+        if dimstyle.dxf.name.upper() in used["dimstyles"]:
+            used["styles"].add(dimstyle.dxf.get("dimtxsty", "STANDARD").upper())
+    for style in doc.styles:
+        # The shape files used by the complex linetypes have no name
+        if style.dxf.name == "" or style.is_shape_file:
+            used["styles"].add(style.dxf.name.upper())
+    return used
+
+
+def purge_tables(doc: ezdxf.document.Drawing) -> int:
+    """Delete the table entries used by no entity and return their number"""
+    used = collect_used_entries(doc)
+    deleted = 0
+    for table_name in PROTECTED_ENTRIES:
+        table = getattr(doc, table_name)
+        unused = [
+            entry.dxf.name
+            for entry in table
+            if entry.dxf.name.upper() not in used[table_name]
+        ]
+        for name in unused:
+            table.remove(name)
+        deleted += len(unused)
+    return deleted
+
+
+def compact(doc: ezdxf.document.Drawing) -> tuple[int, int]:
+    """
+    Explode the single use blocks then purge the blocks and the tables.
+    Return the number of exploded references and of deleted blocks and table entries.
+    """
+    exploded, deleted = 0, 0
+    while True:
+        # Once a block is exploded and purged, the blocks it references can be used
+        # only once in their turn
+        exploded_once = explode_single_use_blocks(doc)
+        deleted += purge_blocks(doc)
+        exploded += exploded_once
+        if exploded_once == 0:
+            break
+    deleted += purge_tables(doc)
+    return exploded, deleted
@@ -0,0 +1,240 @@
+"""Definitions shared by the ready_dxf module"""
+
+import json
+import math
+from enum import Enum
+from dataclasses import dataclass, field, asdict
+
+# Versions in which the cleaned files can be written
+DXF_VERSIONS = ["R2000", "R2004", "R2007", "R2010", "R2013", "R2018"]
+
+
+class FileStatus(str, Enum):
+    """Class representing the outcome of the cleaning of a file"""
+
+    CLEANED = "cleaned"
+    ERROR = "error"
+    IGNORED = "ignored"
+    SKIPPED = "skipped"
+    PRUNED = "pruned"
+    DUPLICATE = "duplicate"
+
+
+class Engine(str, Enum):
+    """Class representing the engine used to clean a file"""
+
+    AUTO = "auto"
+    STREAM = "stream"
+    EZDXF = "ezdxf"
+
+
+@dataclass
+class ContourValidation:
+    """
+    Class representing the open ends of the contours of a document
+    """
+
+    # (x, y, distance to the closest other open end, infinite if there is none)
+    open_ends: list[tuple[float, float, float]] = field(default_factory=list)
+    # (x, y, size of the gap closed)
+    snapped: list[tuple[float, float, float]] = field(default_factory=list)
+
+    @property
+    def max_gap(self) -> float:
+        """
+        Size of the largest gap left open, infinite if an open end has no other open end
+        """
+        return max((gap for *_, gap in self.open_ends), default=0.0)
+
+    def dict(self):
+        """
+        Convert the class to a dict structure
+        """
+        return {
+            "open_ends": [
+                {"x": x, "y": y, "gap": gap if math.isfinite(gap) else None}
+                for x, y, gap in self.open_ends
+            ],
+            "snapped": [{"x": x, "y": y, "gap": gap} for x, y, gap in self.snapped],
+            "max_gap": self.max_gap if math.isfinite(self.max_gap) else None,
+        }
+
+
+@dataclass
+class CleanReport:
+    """
+    Class representing what the cleaning engine did on a document
+    """
+
+    deleted: dict[str, int] = field(default_factory=dict)
+    timings: dict[str, float] = field(default_factory=dict)
+    measures: dict[str, float] = field(default_factory=dict)
+    validation: ContourValidation | None = None
+
+    def merge(self, other: "CleanReport") -> None:
+        """Add the values of an other report to this one"""
+        for name, value in other.deleted.items():
+            self.deleted[name] = self.deleted.get(name, 0) + value
+        for name, value in other.timings.items():
+            self.timings[name] = self.timings.get(name, 0.0) + value
+        for name, value in other.measures.items():
+            # The measures starting with max_ keep the largest value instead of the sum
+            if name.startswith("max_"):
+                self.measures[name] = max(self.measures.get(name, value), value)
+            else:
+                self.measures[name] = self.measures.get(name, 0.0) + value
+
+
+@dataclass
+class FileResult:
+    """
+    Class representing the result of the cleaning process for a single file
+    """
+
+    path: str
+    save_path: str
+    status: FileStatus
+    error: str = ""
+    duration: float = 0.0
+    engine: Engine | None = None
+    digest: str = ""
+    report: CleanReport | None = None
+
+
+@dataclass
+class CleanOptions:
+    """
+    Class representing the options of the cleaning process
+    """
+
+    rules: list[str] = field(default_factory=lambda: ["solidworks_text"])
+    dimension_layers: list[str] = field(default_factory=lambda: ["*DIM*"])
+    hidden_linetypes: list[str] = field(
+        default_factory=lambda: ["HIDDEN*", "DASHED*", "PHANTOM*"]
+    )
+    construction_layers: list[str] = field(default_factory=lambda: ["*CONSTRUCTION*"])
+    flatten_curves: bool = False
+    merge_duplicates: bool = False
+    validate_contours: bool = False
+    optimize_path: bool = False
+    compact: bool = False
+    dxf_version: str = ""
+    binary: bool = False
+    tolerance: float = 1e-3
+    chord_tolerance: float = 1e-2
+    snap_tolerance: float = 0.0
+
+    @classmethod
+    def from_config(cls, conf) -> "CleanOptions":
+        """Create the options from the config of the tool"""
+        return cls(
+            rules=list(conf.dxf_rules),
+            dimension_layers=list(conf.dxf_dimension_layers),
+            hidden_linetypes=list(conf.dxf_hidden_linetypes),
+            construction_layers=list(conf.dxf_construction_layers),
+            flatten_curves=conf.dxf_flatten_curves,
+            merge_duplicates=conf.dxf_merge_duplicates,
+            validate_contours=conf.dxf_validate_contours,
+            optimize_path=conf.dxf_optimize_path,
+            compact=conf.dxf_compact,
+            dxf_version=conf.dxf_version,
+            binary=conf.dxf_binary,
+            tolerance=conf.dxf_tolerance,
+            chord_tolerance=conf.dxf_chord_tolerance,
+            snap_tolerance=conf.dxf_snap_tolerance,
+        )
+
+    def signature(self) -> str:
+        """Get a string identifying the options"""
+        return json.dumps(asdict(self), sort_keys=True)
+
+    def is_stream_compatible(self) -> bool:
+        """Return True if the stream engine can apply these options"""
+        return (
+            self.rules == ["solidworks_text"]
+            and not self.flatten_curves
+            and not self.merge_duplicates
+            and not self.validate_contours
+            and not self.optimize_path
+            and not self.changes_output()
+        )
+
+    def changes_output(self) -> bool:
+        """Return True if the options change the size of the saved files"""
+        return self.compact or self.dxf_version != "" or self.binary
+
+
+@dataclass
+class DxfStats:
+    """
+    Class representing the quoting metrics of a dxf file
+    """
+
+    path: str
+    cut_length: float = 0.0
+    pierces: int = 0
+    closed_contours: int = 0
+    min_x: float = 0.0
+    min_y: float = 0.0
+    max_x: float = 0.0
+    max_y: float = 0.0
+    error: str = ""
+
+    @property
+    def width(self) -> float:
+        """Width of the bounding box"""
+        return self.max_x - self.min_x
+
+    @property
+    def height(self) -> float:
+        """Height of the bounding box"""
+        return self.max_y - self.min_y
+
+    def dict(self):
+        """
+        Convert the class to a dict structure
+        """
+        return {**asdict(self), "width": self.width, "height": self.height}
+
+
+@dataclass
+class NestPart:
+    """
+    Class representing a part to nest with the bounding box of its cleaned file
+    """
+
+    path: str
+    quantity: int
+    min_x: float
+    min_y: float
+    max_x: float
+    max_y: float
+
+    @property
+    def width(self) -> float:
+        """Width of the bounding box"""
+        return self.max_x - self.min_x
+
+    @property
+    def height(self) -> float:
+        """Height of the bounding box"""
+        return self.max_y - self.min_y
+
+    @property
+    def area(self) -> float:
+        """Area of the bounding box"""
+        return self.width * self.height
+
+
+@dataclass
+class NestPlacement:
+    """
+    Class representing the place of a copy of a part on a sheet. x and y are the lower
+    left corner of its bounding box, turned by 90 degrees counterclockwise if rotated.
+    """
+
+    part: NestPart
+    sheet: int
+    x: float  # pylint: disable=invalid-name
+    y: float  # pylint: disable=invalid-name
+    rotated: bool = False
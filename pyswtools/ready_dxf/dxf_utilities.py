@@ -1,16 +1,90 @@
-"""Docstring"""
+"""Module to clean dxf documents with ezdxf"""
 
+import io
 import os
+import time
+from dataclasses import replace
+from typing import Iterator
+
 import ezdxf
+from ezdxf.lldxf.const import acad_release_to_dxf_version
+
+from .closure_utilities import (
+    get_validation_path,
+    validate_contours,
+    write_validation,
+)
+from .compact_utilities import compact
+from .definitions import CleanOptions, CleanReport, Engine, FileResult, FileStatus
+from .file_utilities import check_file, discover_files
+from .flatten_utilities import flatten_curves
+from .merge_utilities import merge_duplicates
+from .path_utilities import optimize_path
+from .rule_utilities import CleaningEngine
 
-from .file_utilities import check_file
+# Increase it when the cleaning process changes to clean again the unchanged files
+CLEANING_RULES_VERSION = 7
 
 
 def check_file_and_folder(
-    path, save_path, save=True
+    path, save_path, save=True, keep_docs=False, options: CleanOptions | None = None
+) -> list[FileResult] | list[ezdxf.document.Drawing] | None:
+    """
+    Handle file or folder to apply the cleaning process.
+    Return a result per file. With keep_docs, return the nested lists of the cleaned
+    documents instead, which keeps all of them in memory.
+    """
+    if keep_docs:
+        return load_file_and_folder(path, save_path, save, options)
+    return list(iter_file_and_folder(path, save_path, save, options))
+
+
+def iter_file_and_folder(
+    path, save_path, save=True, options: CleanOptions | None = None
+) -> Iterator[FileResult]:
+    """
+    Apply the cleaning process to a file or to a folder recursively and yield a result
+    per file. Each document is released before the next file is loaded.
+    """
+    if os.path.isdir(path):
+        pairs = discover_files(path, save_path)
+    else:
+        pairs = iter([(path, save_path)])
+
+    for npath, nsave_path in pairs:
+        if not check_file(npath):
+            yield FileResult(npath, nsave_path, FileStatus.IGNORED)
+            continue
+
+        start = time.perf_counter()
+        try:
+            report = clean_and_save(npath, nsave_path if save else None, options)
+        # pylint: disable=broad-except
+        except Exception as err:
+            yield FileResult(
+                npath,
+                nsave_path,
+                FileStatus.ERROR,
+                error=f"{type(err).__name__}: {err}",
+                duration=time.perf_counter() - start,
+                engine=Engine.EZDXF,
+            )
+            continue
+        yield FileResult(
+            npath,
+            nsave_path,
+            FileStatus.CLEANED,
+            duration=time.perf_counter() - start,
+            engine=Engine.EZDXF,
+            report=report,
+        )
+
+
+def load_file_and_folder(
+    path, save_path, save=True, options: CleanOptions | None = None
 ) -> list[ezdxf.document.Drawing] | None:
     """
-    Handle file or folder to apply the cleaning process
+    Handle file or folder to apply the cleaning process and keep the cleaned documents
     """
     if os.path.isdir(path):
         list_dir = os.listdir(path)
@@ -22,13 +96,17 @@ def check_file_and_folder(
         for name in list_dir:
             npath = os.path.join(path, name)
 
-            docs.append(check_file_and_folder(npath, os.path.join(save_path, name)))
+            docs.append(
+                load_file_and_folder(
+                    npath, os.path.join(save_path, name), save, options
+                )
+            )
     else:
         if check_file(path):
             doc = ezdxf.readfile(path)
-            clean(doc)
+            clean(doc, options)
             if save:
-                doc.saveas(save_path)
+                save_doc(doc, save_path, options)
             docs = [doc]
 
         else:
@@ -37,16 +115,127 @@ def check_file_and_folder(
     return docs
 
 
-def clean(doc: ezdxf.document.Drawing) -> None:
-    """Apply functions to clean the doc"""
-    remove_sw(doc)
+def clean_and_save(
+    path: str, save_path: str | None, options: CleanOptions | None = None
+) -> CleanReport:
+    """
+    Load the file at path, clean it and save it to save_path if it is given.
+    The document is released when the function returns.
+    """
+    options = options or CleanOptions()
+    doc = ezdxf.readfile(path)
+    report = clean(doc, replace(options, compact=False))
+    # The bytes saved are measured against the cleaned document saved as it is, the
+    # other stages can make it larger than the input
+    measure = save_path is not None and options.changes_output()
+    if measure:
+        reference_size = get_doc_size(doc)
+    if options.compact:
+        compact_stage(doc, report)
+    if save_path is not None:
+        save_doc(doc, save_path, options)
+        if report.validation is not None:
+            write_validation(report.validation, get_validation_path(save_path))
+        if measure:
+            report.measures["bytes_saved"] = reference_size - os.path.getsize(save_path)
+    return report
+
+
+def get_doc_size(doc: ezdxf.document.Drawing) -> int:
+    """Get the size of the doc saved as ascii dxf in its version"""
+    stream = io.StringIO()
+    doc.write(stream)
+    text = stream.getvalue()
+    # The files are written in text mode, with the newlines of the platform
+    return len(doc.encode(text)) + text.count("\n") * (len(os.linesep) - 1)
+
+
+def save_doc(
+    doc: ezdxf.document.Drawing, save_path: str, options: CleanOptions | None = None
+) -> None:
+    """Save the doc in the dxf version and the format of the options"""
+    options = options or CleanOptions()
+    if options.dxf_version != "":
+        doc.dxfversion = acad_release_to_dxf_version[options.dxf_version]
+    doc.saveas(save_path, fmt="bin" if options.binary else "asc")
+
+
+def get_rules_version(options: CleanOptions | None = None) -> str:
+    """
+    Get the version of the cleaning rules stored with the cleaned files
+    """
+    options = options or CleanOptions()
+    return f"{CLEANING_RULES_VERSION}:{options.signature()}"
+
+
+def clean(
+    doc: ezdxf.document.Drawing, options: CleanOptions | None = None
+) -> CleanReport:
+    """Apply the cleaning rules then the enabled stages to the doc"""
+    options = options or CleanOptions()
+    report = CleaningEngine(options).run(doc)
+
+    if options.flatten_curves:
+        start = time.perf_counter()
+        converted, deviation = flatten_curves(doc, options.chord_tolerance)
+        report.timings["flatten_curves"] = time.perf_counter() - start
+        report.measures["flattened_curves"] = converted
+        report.measures["max_flatten_deviation"] = deviation
+
+    if options.merge_duplicates:
+        run_stage(report, "merge_duplicates", merge_duplicates, doc, options.tolerance)
+
+    if options.validate_contours:
+        start = time.perf_counter()
+        validation = validate_contours(doc, options.tolerance, options.snap_tolerance)
+        report.timings["validate_contours"] = time.perf_counter() - start
+        report.validation = validation
+        report.measures["open_ends"] = len(validation.open_ends)
+        report.measures["open_files"] = 1 if len(validation.open_ends) > 0 else 0
+        report.measures["snapped_gaps"] = len(validation.snapped)
+        report.measures["max_gap"] = validation.max_gap
+
+    if options.optimize_path:
+        start = time.perf_counter()
+        before, after = optimize_path(doc, options.tolerance)
+        report.timings["optimize_path"] = time.perf_counter() - start
+        report.measures["travel_before"] = before
+        report.measures["travel_after"] = after
+
+    if options.compact:
+        compact_stage(doc, report)
+
+    return report
+
+
+def compact_stage(doc: ezdxf.document.Drawing, report: CleanReport) -> None:
+    """Compact the doc and record the exploded blocks and the deletions in the report"""
+    start = time.perf_counter()
+    exploded, deleted = compact(doc)
+    report.timings["compact"] = time.perf_counter() - start
+    report.deleted["compact"] = deleted
+    report.measures["exploded_blocks"] = exploded
+
+
+def run_stage(report: CleanReport, name: str, stage, *args) -> None:
+    """
+    Apply a stage returning its number of deletions and record it in the report
+    """
+    start = time.perf_counter()
+    deleted = stage(*args)
+    report.deleted[name] = report.deleted.get(name, 0) + deleted
+    report.timings[name] = report.timings.get(name, 0.0) + time.perf_counter() - start
 
 
 def remove_sw(doc: ezdxf.document.Drawing) -> None:
     """Remove the text included by solidworks from the doc file"""
     blocks = doc.blocks
     for bloc in blocks:
-        for entity in bloc:
-            if entity.dxftype() == "MTEXT":
-                if "SOLIDWORKS" in entity.text:
-                    bloc.delete_entity(entity)
+        # Collect first, deleting while iterating skips the following entity
+        to_delete = [
+            entity
+            for entity in bloc
+            if entity.dxftype() == "MTEXT" and "SOLIDWORKS" in entity.text
+        ]
+        for entity in to_delete:
+            bloc.delete_entity(entity)
@@ -1,5 +1,9 @@
 """Module to help handling with files"""
 
+import os
+import shutil
+from typing import Iterator
+
 
 def check_file(path: str) -> bool:
     """Check if the file has the dxf extension"""
@@ -20,3 +24,47 @@ def append_name(path: str, text: str) -> str:
         return path + text
     ext = path_splitted[len(path_splitted) - 1]
     return path.replace(f".{ext}", f"{text}.{ext}")
+
+
+def discover_files(
+    path: str, save_path: str, make_dirs: bool = True
+) -> Iterator[tuple[str, str]]:
+    """
+    Walk recursively through path and yield the (input, output) paths of each file.
+    The output directories are created along the way if make_dirs is set.
+    """
+    if make_dirs:
+        try:
+            os.mkdir(save_path)
+        except FileExistsError:
+            pass
+
+    for name in sorted(os.listdir(path)):
+        npath = os.path.join(path, name)
+        nsave_path = os.path.join(save_path, name)
+        if os.path.isdir(npath):
+            yield from discover_files(npath, nsave_path, make_dirs)
+        else:
+            yield npath, nsave_path
+
+
+def link_or_copy(path: str, save_path: str) -> None:
+    """
+    Make save_path a hard link to path, or a copy if the file system does not
+    support it. An existing file at save_path is replaced.
+    """
+    if os.path.exists(save_path):
+        os.remove(save_path)
+    try:
+        os.link(path, save_path)
+    except OSError:
+        shutil.copy2(path, save_path)
+
+
+def unlink_shared(save_path: str) -> None:
+    """
+    Remove save_path if it is a hard link shared with other outputs, so writing it does
+    not change the other outputs
+    """
+    if os.path.exists(save_path) and os.stat(save_path).st_nlink > 1:
+        os.remove(save_path)
@@ -0,0 +1,186 @@
+"""
+Module to flatten the SPLINE and ELLIPSE entities into polylines.
+
+Each curve is sampled on its parameter range. All the samples of a curve are evaluated at
+once: the B-spline basis functions are computed for every parameter with the Cox-de Boor
+recursion on arrays. The distance between the curve and each chord is estimated at the
+middle of the chord and the chords too far from the curve are split until they all are
+within the tolerance.
+"""
+
+import math
+
+import numpy as np
+import ezdxf
+
+# Maximum number of times a chord is split
+MAX_REFINEMENTS = 16
+
+
+def bspline_basis(params: np.ndarray, knots: np.ndarray, degree: int) -> np.ndarray:
+    """
+    Evaluate all the B-spline basis functions at once with the Cox-de Boor recursion.
+    Return an array (parameters, control points).
+    """
+    params = params[:, None]
+    left, right = knots[:-1], knots[1:]
+    basis = ((left <= params) & (params < right)).astype(float)
+    # The end of the range belongs to the last non empty span
+    last = np.flatnonzero(left < right)[-1]
+    basis[params[:, 0] >= knots[last + 1], last] = 1.0
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for k in range(1, degree + 1):
+            width_a = knots[k:-1] - knots[: -k - 1]
+            width_b = knots[k + 1 :] - knots[1:-k]
+            term_a = np.where(width_a > 0, (params - knots[: -k - 1]) / width_a, 0.0)
+            term_b = np.where(width_b > 0, (knots[k + 1 :] - params) / width_b, 0.0)
+            basis = term_a * basis[:, :-1] + term_b * basis[:, 1:]
+    return basis
+
+
+def make_spline_evaluator(entity):
+    """
+    Get a function evaluating the spline in the xy plane and its parameter range.
+    Return None if the spline is not in a plane parallel to xy.
+    """
+    bspline = entity.construction_tool()
+    control = np.array(bspline.control_points, dtype=float)
+    if len(control) < 2 or np.ptp(control[:, 2]) > 1e-9:
+        return None
+    knots = np.array(bspline.knots(), dtype=float)
+    degree = bspline.degree
+    weights = np.array(bspline.weights(), dtype=float)
+    if len(weights) == 0:
+        weights = np.ones(len(control))
+    weighted = control[:, :2] * weights[:, None]
+
+    def evaluate(params: np.ndarray) -> np.ndarray:
+        basis = bspline_basis(params, knots, degree)
+        return (basis @ weighted) / (basis @ weights)[:, None]
+
+    return evaluate, knots[degree], knots[len(control)], float(control[0, 2])
+
+
+def make_ellipse_evaluator(entity):
+    """
+    Get a function evaluating the ellipse in the xy plane and its parameter range.
+    Return None if the ellipse is not in a plane parallel to xy.
+    """
+    ellipse = entity.construction_tool()
+    major, minor = ellipse.major_axis, ellipse.minor_axis
+    if abs(major.z) > 1e-9 or abs(minor.z) > 1e-9:
+        return None
+    center = np.array([ellipse.center.x, ellipse.center.y])
+    axes = np.array([[major.x, major.y], [minor.x, minor.y]])
+    start = ellipse.start_param
+    span = (ellipse.end_param - start) % math.tau
+    if math.isclose(span, 0.0, abs_tol=1e-12):
+        span = math.tau
+
+    def evaluate(params: np.ndarray) -> np.ndarray:
+        return center + np.stack([np.cos(params), np.sin(params)], axis=1) @ axes
+
+    return evaluate, start, start + span, float(ellipse.center.z)
+
+
+def get_deviations(points: np.ndarray, middles: np.ndarray) -> np.ndarray:
+    """Get the distance between the middle point of the curve and each chord"""
+    start, end = points[:-1], points[1:]
+    chord = end - start
+    length2 = np.einsum("ij,ij->i", chord, chord)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = np.clip(np.einsum("ij,ij->i", middles - start, chord) / length2, 0, 1)
+    t = np.where(length2 > 0, t, 0.0)
+    closest = start + t[:, None] * chord
+    return np.hypot(*(middles - closest).T)
+
+
+def flatten_curve(
+    evaluate, start: float, end: float, tolerance: float, segments: int
+) -> tuple[np.ndarray, float]:
+    """
+    Sample a curve between the parameters start and end so each chord is within the
+    tolerance. Return the points and the maximum deviation.
+    """
+    params = np.linspace(start, end, segments + 1)
+    points = evaluate(params)
+    for _ in range(MAX_REFINEMENTS):
+        middle_params = (params[:-1] + params[1:]) / 2
+        middles = evaluate(middle_params)
+        deviations = get_deviations(points, middles)
+        split = np.flatnonzero(deviations > tolerance)
+        if len(split) == 0:
+            break
+        params = np.insert(params, split + 1, middle_params[split])
+        points = np.insert(points, split + 1, middles[split], axis=0)
+
+    # Estimate the final deviation on the chords
+    middles = evaluate((params[:-1] + params[1:]) / 2)
+    return points, float(get_deviations(points, middles).max(initial=0.0))
+
+
+def flatten_entity(entity, tolerance: float) -> tuple[np.ndarray, float, float] | None:
+    """
+    Flatten a SPLINE or an ELLIPSE. Return its points, its elevation and the maximum
+    deviation, or None if it can not be flattened.
+    """
+    if entity.dxftype() == "SPLINE":
+        evaluator = make_spline_evaluator(entity)
+        segments = 4 * max(1, len(entity.control_points) or len(entity.fit_points))
+    else:
+        extrusion = entity.dxf.extrusion
+        if abs(extrusion[0]) > 1e-9 or abs(extrusion[1]) > 1e-9:
+            return None
+        evaluator = make_ellipse_evaluator(entity)
+        segments = 16
+    if evaluator is None:
+        return None
+    evaluate, start, end, elevation = evaluator
+    points, deviation = flatten_curve(evaluate, start, end, tolerance, segments)
+    return points, elevation, deviation
+
+
+def flatten_curves(doc: ezdxf.document.Drawing, tolerance: float) -> tuple[int, float]:
+    """
+    Replace the SPLINE and ELLIPSE of every block by polylines within tolerance,
+    keeping their position in the block.
+    Return the number of converted entities and the maximum deviation.
+    """
+    converted = 0
+    max_deviation = 0.0
+    for bloc in doc.blocks:
+        entities = list(bloc)
+        replaced = {}
+        for entity in entities:
+            if entity.dxftype() not in ("SPLINE", "ELLIPSE"):
+                continue
+            flattened = flatten_entity(entity, tolerance)
+            if flattened is None:
+                continue
+            points, elevation, deviation = flattened
+            closed = (
+                len(points) > 2 and np.hypot(*(points[-1] - points[0])) <= tolerance
+            )
+            if closed:
+                points = points[:-1]
+            attribs = entity.graphic_properties()
+            attribs["elevation"] = elevation
+            polyline = bloc.add_lwpolyline(
+                points.tolist(), close=closed, dxfattribs=attribs
+            )
+            replaced[id(entity)] = polyline
+            max_deviation = max(max_deviation, deviation)
+        if len(replaced) == 0:
+            continue
+
+        # Put each polyline at the place of its curve
+        bloc.entity_space.clear()
+        bloc.entity_space.extend(
+            replaced.get(id(entity), entity) for entity in entities
+        )
+        for entity in entities:
+            if id(entity) in replaced:
+                doc.entitydb.delete_entity(entity)
+        converted += len(replaced)
+    return converted, max_deviation
@@ -0,0 +1,306 @@
+"""Module with geometric helpers shared by the stages working on the dxf entities"""
+
+import itertools
+import math
+
+import numpy as np
+from ezdxf import path
+
+
+def get_arc_wcs(entity) -> tuple[float, float, float, float, float] | None:
+    """
+    Get the (center x, center y, radius, start angle, end angle) of an ARC or a CIRCLE in
+    the world coordinates. The angles are in degrees and go counterclockwise.
+    Return None if the entity is not in the xy plane.
+    """
+    extrusion = entity.dxf.extrusion
+    if abs(extrusion[0]) > 1e-9 or abs(extrusion[1]) > 1e-9:
+        return None
+
+    center = entity.dxf.center
+    radius = entity.dxf.radius
+    if entity.dxftype() == "CIRCLE":
+        start, end = 0.0, 360.0
+    else:
+        start, end = entity.dxf.start_angle, entity.dxf.end_angle
+
+    if extrusion[2] > 0:
+        return center[0], center[1], radius, start % 360, end % 360
+
+    # The x axis of the object coordinates is mirrored for a -z extrusion
+    return -center[0], center[1], radius, (180 - end) % 360, (180 - start) % 360
+
+
+def set_arc_wcs(entity, start: float, end: float) -> None:
+    """Set the angles of an ARC from world coordinates angles"""
+    if entity.dxf.extrusion[2] > 0:
+        entity.dxf.start_angle = start % 360
+        entity.dxf.end_angle = end % 360
+    else:
+        entity.dxf.start_angle = (180 - end) % 360
+        entity.dxf.end_angle = (180 - start) % 360
+
+
+def get_span(start: float, end: float) -> float:
+    """Get the angle covered by an arc going counterclockwise from start to end"""
+    span = (end - start) % 360
+    return 360.0 if math.isclose(span, 0.0, abs_tol=1e-12) else span
+
+
+def quantize(values: np.ndarray, tolerance: float) -> np.ndarray:
+    """Snap values to a grid of size tolerance and return the grid indices"""
+    return np.round(values / tolerance).astype(np.int64)
+
+
+def get_close_cells(
+    cells: np.ndarray, low: np.ndarray, high: np.ndarray, tolerances: np.ndarray
+) -> list[tuple[int, int]]:
+    """
+    Get the pairs of neighbouring cells of a grid whose bounding boxes, low to high, are
+    within the tolerances. The cells must be sorted.
+    """
+    # The cells are sorted, their neighbours are found with a binary search on their
+    # index in the grid, or on records if the grid is too large for an integer
+    base = cells.min(axis=0) - 1
+    spans = cells.max(axis=0) - base + 2
+    if float(np.prod(spans.astype(float))) < 2**62:
+
+        def encode(cells: np.ndarray) -> np.ndarray:
+            return np.ravel_multi_index(tuple((cells - base).T), tuple(spans))
+
+    else:
+
+        def encode(cells: np.ndarray) -> np.ndarray:
+            dtype = [("", np.int64)] * cells.shape[1]
+            return np.ascontiguousarray(cells).view(dtype).reshape(-1)
+
+    records = encode(cells)
+    pairs = []
+    # Half of the neighbours, the other half compares with this cell in its turn
+    for offset in itertools.product((-1, 0, 1), repeat=cells.shape[1]):
+        if offset <= (0,) * cells.shape[1]:
+            continue
+        neighbours = encode(cells + offset)
+        position = np.minimum(np.searchsorted(records, neighbours), len(records) - 1)
+        found = np.flatnonzero(records[position] == neighbours)
+        # Only the cells whose bounding boxes are close can have close rows
+        gap = np.maximum(
+            low[position[found]] - high[found], low[found] - high[position[found]]
+        )
+        close = np.all(gap <= tolerances, axis=1)
+        pairs.extend(zip(found[close].tolist(), position[found[close]].tolist()))
+    return pairs
+
+
+def cluster_nearby(values: np.ndarray, tolerances) -> np.ndarray:
+    """
+    Group the rows of values which are within the tolerance of each column, directly or
+    through other rows. The rows are hashed on a grid of the size of the tolerances, the
+    rows of a cell are always grouped and the rows of the neighbouring cells are
+    compared. Return the group of each row.
+    """
+    values = np.asarray(values, dtype=float).reshape(len(values), -1)
+    tolerances = np.broadcast_to(np.asarray(tolerances, dtype=float), values.shape[1:])
+    cells, cell_of = np.unique(
+        quantize(values, tolerances), axis=0, return_inverse=True
+    )
+    cell_of = cell_of.reshape(-1)
+    order = np.argsort(cell_of, kind="stable")
+    bounds = np.searchsorted(cell_of[order], np.arange(len(cells) + 1))
+    low = np.full(cells.shape, np.inf)
+    np.minimum.at(low, cell_of, values)
+    high = np.full(cells.shape, -np.inf)
+    np.maximum.at(high, cell_of, values)
+
+    pairs = get_close_cells(cells, low, high, tolerances)
+
+    parent = {}
+
+    def find(i: int) -> int:
+        while parent.get(i, i) != i:
+            parent[i] = parent.get(parent[i], parent[i])
+            i = parent[i]
+        return i
+
+    for i, j in pairs:
+        if find(i) == find(j):
+            continue
+        rows = values[order[bounds[i] : bounds[i + 1]]]
+        others = values[order[bounds[j] : bounds[j + 1]]]
+        close = np.abs(rows[:, None, :] - others[None, :, :]) <= tolerances
+        if np.any(np.all(close, axis=2)):
+            parent[find(j)] = find(i)
+
+    roots = np.arange(len(cells))
+    for i in parent:
+        roots[i] = find(i)
+    return roots[cell_of]
+
+
+CURVE_TYPES = (
+    "LINE",
+    "ARC",
+    "CIRCLE",
+    "LWPOLYLINE",
+    "POLYLINE",
+    "SPLINE",
+    "ELLIPSE",
+)
+
+
+def get_curve_points(entity, distance: float) -> np.ndarray | None:
+    """
+    Get the points of a curve entity flattened with a maximum distance in the xy plane.
+    The first and last points are the ends of the curve.
+    Return None for the entities which are not curves.
+    """
+    dxftype = entity.dxftype()
+    if dxftype not in CURVE_TYPES:
+        return None
+    if dxftype == "LINE":
+        start = entity.dxf.start
+        end = entity.dxf.end
+        return np.array([(start.x, start.y), (end.x, end.y)], dtype=float)
+    if dxftype == "POLYLINE" and not entity.is_2d_polyline:
+        return None
+
+    vertices = list(path.make_path(entity).flattening(distance))
+    if len(vertices) == 0:
+        return None
+    return np.array([(vertex.x, vertex.y) for vertex in vertices], dtype=float)
+
+
+def close_pairs(
+    points: np.ndarray, radius: float
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Find the pairs of points closer than radius with a grid of cells of size radius.
+    Only the points in neighbouring cells are compared.
+    Return the arrays (i, j, distance) of the pairs with i < j.
+    """
+    empty = np.zeros(0, dtype=np.int64)
+    if len(points) < 2 or radius <= 0:
+        return empty, empty, np.zeros(0)
+
+    cells = np.floor(points / radius).astype(np.int64)
+    cells -= cells.min(axis=0) - 1
+    width = int(cells[:, 1].max()) + 2
+    code = cells[:, 0] * width + cells[:, 1]
+    order = np.argsort(code, kind="stable")
+    sorted_code = code[order]
+
+    found_i, found_j = [], []
+    # Each pair of neighbouring cells is visited once
+    for di, dj in ((0, 0), (1, -1), (1, 0), (1, 1), (0, 1)):
+        # The queries are sorted too, which keeps the search cache friendly
+        target = sorted_code + di * width + dj
+        low = np.searchsorted(sorted_code, target, side="left")
+        count = np.searchsorted(sorted_code, target, side="right") - low
+        src = np.repeat(order, count)
+        rank = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+        dst = order[np.repeat(low, count) + rank]
+        if (di, dj) == (0, 0):
+            keep = src < dst
+            src, dst = src[keep], dst[keep]
+        found_i.append(src)
+        found_j.append(dst)
+
+    pair_i = np.concatenate(found_i)
+    pair_j = np.concatenate(found_j)
+    dist = np.hypot(*(points[pair_i] - points[pair_j]).T)
+    close = dist <= radius
+    pair_i, pair_j = (
+        np.minimum(pair_i, pair_j)[close],
+        np.maximum(pair_i, pair_j)[close],
+    )
+    return pair_i, pair_j, dist[close]
+
+
+def query_pairs(
+    queries: np.ndarray, points: np.ndarray, radius: float
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Find the pairs of a query and a point closer than radius with a grid of cells of
+    size radius. Only the points in the cells neighbouring a query are compared.
+    Return the arrays (query, point, distance) of the pairs.
+    """
+    empty = np.zeros(0, dtype=np.int64)
+    if len(queries) == 0 or len(points) == 0 or radius <= 0:
+        return empty, empty, np.zeros(0)
+
+    cells = np.floor(points / radius).astype(np.int64)
+    query_cells = np.floor(queries / radius).astype(np.int64)
+    base = np.minimum(cells.min(axis=0), query_cells.min(axis=0)) - 1
+    cells -= base
+    query_cells -= base
+    width = int(max(cells[:, 1].max(), query_cells[:, 1].max())) + 2
+    code = cells[:, 0] * width + cells[:, 1]
+    order = np.argsort(code, kind="stable")
+    sorted_code = code[order]
+    query_code = query_cells[:, 0] * width + query_cells[:, 1]
+    # The queries are sorted too, which keeps the search cache friendly
+    query_order = np.argsort(query_code, kind="stable")
+    query_code = query_code[query_order]
+
+    found_q, found_p = [], []
+    for di, dj in itertools.product((-1, 0, 1), repeat=2):
+        target = query_code + di * width + dj
+        low = np.searchsorted(sorted_code, target, side="left")
+        count = np.searchsorted(sorted_code, target, side="right") - low
+        rank = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+        found_q.append(np.repeat(query_order, count))
+        found_p.append(order[np.repeat(low, count) + rank])
+
+    pair_q = np.concatenate(found_q)
+    pair_p = np.concatenate(found_p)
+    dist = np.hypot(*(queries[pair_q] - points[pair_p]).T)
+    close = dist <= radius
+    return pair_q[close], pair_p[close], dist[close]
+
+
+def connected_components(
+    number: int, edge_i: np.ndarray, edge_j: np.ndarray
+) -> np.ndarray:
+    """
+    Get the label of the connected component of each of the number nodes of a graph
+    """
+    labels = np.arange(number)
+
+    # Propagate the smallest label through the edges until it is stable
+    while len(edge_i) > 0:
+        lowest = np.minimum(labels[edge_i], labels[edge_j])
+        new_labels = labels.copy()
+        np.minimum.at(new_labels, edge_i, lowest)
+        np.minimum.at(new_labels, edge_j, lowest)
+        new_labels = new_labels[new_labels]
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+
+    _, labels = np.unique(labels, return_inverse=True)
+    return labels.reshape(-1)
+
+
+def cluster_points(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Group the points closer than tolerance and return the cluster label of each point
+    """
+    pair_i, pair_j, _ = close_pairs(points, tolerance)
+    return connected_components(len(points), pair_i, pair_j)
+
+
+def polygon_area(polygon: np.ndarray) -> float:
+    """Get the area of a polygon given by its vertices"""
+    x, y = polygon[:, 0], polygon[:, 1]
+    return 0.5 * abs(float(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1))))
+
+
+def point_in_polygon(point, polygon: np.ndarray) -> bool:
+    """Test if a point is inside a polygon given by its vertices with a ray casting"""
+    x, y = point
+    x_a, y_a = polygon[:, 0], polygon[:, 1]
+    x_b, y_b = np.roll(x_a, -1), np.roll(y_a, -1)
+    crossing = (y_a > y) != (y_b > y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_cross = x_a + (y - y_a) * (x_b - x_a) / (y_b - y_a)
+    return bool(np.count_nonzero(crossing & (x < x_cross)) % 2)
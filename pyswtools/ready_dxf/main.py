@@ -2,10 +2,24 @@
 Prepare an output dxf from SW to be laser cutted
 """
 
+import os
+import time
 import click
 
-from .dxf_utilities import check_file_and_folder
-from .file_utilities import append_name
+from ..config import get_config
+from .definitions import DXF_VERSIONS, CleanOptions, Engine, FileStatus, NestPart
+from .batch_utilities import clean_file, clean_folder, summarize
+from .closure_utilities import format_gap
+from .file_utilities import append_name, check_file, discover_files
+from .nest_utilities import (
+    get_quantity,
+    pack,
+    read_quantities,
+    write_nest_report,
+    write_sheets,
+)
+from .rule_utilities import RULES
+from .stats_utilities import export_stats, stats_batch, total_stats
 
 
 @click.command()
@@ -14,9 +28,306 @@ from .file_utilities import append_name
     "input_path",
     type=click.Path(exists=True),
 )
-def ready_dxf(input_path) -> None:
+@click.option(
+    "--jobs",
+    "-j",
+    "jobs",
+    type=click.IntRange(min=0),
+    default=1,
+    help="Number of processes used to clean a directory. 0 uses one per core.",
+)
+@click.option(
+    "--engine",
+    "engine",
+    type=click.Choice(Engine),
+    default=Engine.AUTO,
+    help="Engine used to clean the files. auto uses ezdxf when the stream engine can not.",
+)
+@click.option(
+    "--force",
+    "force",
+    is_flag=True,
+    default=False,
+    help="Clean all the files of a directory, even the ones which did not change.",
+)
+@click.option(
+    "--flatten-curves/--no-flatten-curves",
+    "flatten_curves",
+    default=None,
+    help="Replace the splines and ellipses by polylines. Default from the config.",
+)
+@click.option(
+    "--merge-duplicates/--no-merge-duplicates",
+    "merge_duplicates",
+    default=None,
+    help="Merge the duplicate and overlapping segments. Default from the config.",
+)
+@click.option(
+    "--validate-contours/--no-validate-contours",
+    "validate_contours",
+    default=None,
+    help="Report the open contours of each file. Default from the config.",
+)
+@click.option(
+    "--snap-tolerance",
+    "snap_tolerance",
+    type=click.FloatRange(min=0),
+    default=None,
+    help="Close the gaps smaller than this tolerance when validating the contours. "
+    "Default from the config.",
+)
+@click.option(
+    "--optimize-path/--no-optimize-path",
+    "optimize_path",
+    default=None,
+    help="Reorder the entities to reduce the travel of the laser. Default from the config.",
+)
+@click.option(
+    "--compact/--no-compact",
+    "compact",
+    default=None,
+    help="Explode the blocks used once and purge the unused blocks and table entries. "
+    "Default from the config.",
+)
+@click.option(
+    "--dxf-version",
+    "dxf_version",
+    type=click.Choice(DXF_VERSIONS),
+    default=None,
+    help="Version of the saved files. Default from the config, or the version of the input.",
+)
+@click.option(
+    "--binary/--no-binary",
+    "binary",
+    default=None,
+    help="Save the files as binary dxf. Default from the config.",
+)
+@click.option(
+    "--stats",
+    "stats_path",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Write the cut length, pierces and bounding box of each file to a csv or json "
+    "file instead of saving the cleaned files.",
+)
+@click.option(
+    "--nest",
+    "nest_parts",
+    is_flag=True,
+    default=False,
+    help="Place the cleaned parts on sheets instead of saving the cleaned files.",
+)
+@click.option(
+    "--quantities",
+    "quantities_path",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="Csv file with the name and the quantity of the parts to nest. "
+    "The other parts are nested once.",
+)
+@click.option(
+    "--sheet-width",
+    "sheet_width",
+    type=click.FloatRange(min=0, min_open=True),
+    default=None,
+    help="Width of the sheets to nest on. Default from the config.",
+)
+@click.option(
+    "--sheet-height",
+    "sheet_height",
+    type=click.FloatRange(min=0, min_open=True),
+    default=None,
+    help="Height of the sheets to nest on. Default from the config.",
+)
+@click.option(
+    "--spacing",
+    "spacing",
+    type=click.FloatRange(min=0),
+    default=None,
+    help="Space between the nested parts and the edges of the sheets. "
+    "Default from the config.",
+)
+# pylint: disable=too-many-arguments
+def ready_dxf(
+    input_path,
+    jobs,
+    engine,
+    force,
+    flatten_curves,
+    merge_duplicates,
+    validate_contours,
+    snap_tolerance,
+    optimize_path,
+    compact,
+    dxf_version,
+    binary,
+    stats_path,
+    nest_parts,
+    quantities_path,
+    sheet_width,
+    sheet_height,
+    spacing,
+) -> None:
     """
     Prepare an output dxf from SW to be laser cutted
     """
     click.echo(input_path)
-    check_file_and_folder(input_path, save_path=append_name(input_path, "_cleaned"))
+    save_path = append_name(input_path, "_cleaned")
+    conf = get_config()
+    options = CleanOptions.from_config(conf)
+    if flatten_curves is not None:
+        options.flatten_curves = flatten_curves
+    if merge_duplicates is not None:
+        options.merge_duplicates = merge_duplicates
+    if validate_contours is not None:
+        options.validate_contours = validate_contours
+    if snap_tolerance is not None:
+        options.snap_tolerance = snap_tolerance
+    if optimize_path is not None:
+        options.optimize_path = optimize_path
+    if compact is not None:
+        options.compact = compact
+    if dxf_version is not None:
+        options.dxf_version = dxf_version
+    if binary is not None:
+        options.binary = binary
+    unknown = [name for name in options.rules if name not in RULES]
+    if len(unknown) > 0:
+        raise click.UsageError(
+            f"Unknown cleaning rules in the config: {', '.join(unknown)}. "
+            f"Available rules: {', '.join(RULES)}"
+        )
+    if options.dxf_version not in ["", *DXF_VERSIONS]:
+        raise click.UsageError(
+            f"Unknown dxf version in the config: {options.dxf_version}. "
+            f"Available versions: {', '.join(DXF_VERSIONS)}"
+        )
+
+    start = time.perf_counter()
+    if stats_path is not None:
+        measure(input_path, jobs, options, stats_path)
+        click.echo(f"Measured in {time.perf_counter() - start:.2f}s")
+        return
+    if nest_parts:
+        sheet = (
+            sheet_width if sheet_width is not None else conf.dxf_sheet_width,
+            sheet_height if sheet_height is not None else conf.dxf_sheet_height,
+        )
+        spacing = spacing if spacing is not None else conf.dxf_nest_spacing
+        nest(input_path, jobs, options, quantities_path, sheet, spacing)
+        click.echo(f"Nested in {time.perf_counter() - start:.2f}s")
+        return
+
+    if os.path.isdir(input_path):
+        results_iter = clean_folder(input_path, save_path, jobs, engine, force, options)
+    else:
+        results_iter = iter([clean_file(input_path, save_path, engine, options)])
+
+    results = []
+    for result in results_iter:
+        if result.status is FileStatus.IGNORED:
+            click.echo(f"{result.path} is not a dxf file")
+        elif result.status is FileStatus.ERROR:
+            click.echo(f"{result.path} could not be cleaned")
+        elif result.status is FileStatus.PRUNED:
+            click.echo(f"{result.save_path} removed as {result.path} does not exist")
+        elif result.report is not None:
+            echo_report(result)
+        results.append(result)
+
+    click.echo(summarize(results, time.perf_counter() - start))
+
+
+def measure(input_path, jobs, options, stats_path) -> None:
+    """
+    Measure the cleaned files and write their stats to stats_path
+    """
+    paths = list_files(input_path)
+    stats = []
+    for file_stats in stats_batch(paths, jobs, options):
+        if file_stats.error != "":
+            click.echo(f"{file_stats.path} could not be measured: {file_stats.error}")
+        stats.append(file_stats)
+
+    export_stats(stats, stats_path)
+    total = total_stats(stats)
+    click.echo(
+        f"{len(stats)} files: {total.cut_length:.1f} of cut length, "
+        f"{total.pierces} pierces ({total.closed_contours} closed contours)"
+    )
+
+
+# pylint: disable=too-many-arguments,too-many-locals
+def nest(input_path, jobs, options, quantities_path, sheet, spacing) -> None:
+    """
+    Nest the cleaned parts on sheets of size (width, height) and write a dxf per sheet
+    with a utilisation report to the _nested directory
+    """
+    root = input_path if os.path.isdir(input_path) else os.path.dirname(input_path)
+    paths = list_files(input_path)
+    quantities = {} if quantities_path is None else read_quantities(quantities_path)
+
+    parts = []
+    for file_stats in stats_batch(paths, jobs, options):
+        if file_stats.error != "":
+            click.echo(f"{file_stats.path} could not be measured: {file_stats.error}")
+            continue
+        quantity = get_quantity(file_stats.path, root, quantities)
+        if quantity > 0:
+            parts.append(
+                NestPart(
+                    file_stats.path,
+                    quantity,
+                    file_stats.min_x,
+                    file_stats.min_y,
+                    file_stats.max_x,
+                    file_stats.max_y,
+                )
+            )
+
+    placements, unplaced, number_sheets = pack(parts, *sheet, spacing)
+    for part in unplaced:
+        click.echo(f"{part.path} does not fit on a sheet of {sheet[0]}x{sheet[1]}")
+
+    output_path = append_name(input_path, "_nested")
+    if not os.path.isdir(input_path):
+        output_path = os.path.splitext(output_path)[0]
+    os.makedirs(output_path, exist_ok=True)
+    write_sheets(placements, number_sheets, output_path, options, jobs)
+    utilisations = write_nest_report(placements, number_sheets, *sheet, output_path)
+    for idx, utilisation in enumerate(utilisations):
+        click.echo(f"- sheet_{idx + 1}.dxf: {utilisation:.1%} used")
+    click.echo(
+        f"{len(placements)} parts nested on {number_sheets} sheets in {output_path}, "
+        f"{len(unplaced)} not placed"
+    )
+
+
+def list_files(input_path) -> list[str]:
+    """
+    List the dxf files of a directory, or the file itself
+    """
+    if not os.path.isdir(input_path):
+        return [input_path]
+    save_path = append_name(input_path, "_cleaned")
+    paths = []
+    for npath, _ in discover_files(input_path, save_path, make_dirs=False):
+        if check_file(npath):
+            paths.append(npath)
+        else:
+            click.echo(f"{npath} is not a dxf file")
+    return paths
+
+
+def echo_report(result) -> None:
+    """
+    Display the information of the report of a cleaned file
+    """
+    measures = result.report.measures
+    if measures.get("open_ends", 0) > 0:
+        click.echo(
+            f"{result.path}: {measures['open_ends']:.0f} open ends, "
+            f"largest gap {format_gap(measures['max_gap'])}"
+        )
+    if "bytes_saved" in measures:
+        click.echo(f"{result.path}: {measures['bytes_saved']:.0f} bytes saved")
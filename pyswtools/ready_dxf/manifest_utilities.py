@@ -0,0 +1,134 @@
+"""
+Module to handle the manifest of a cleaned directory.
+
+The manifest is stored in the output directory and records the size, the modification
+time and the hash of each cleaned input. It is used to skip the files that did not
+change since the previous run.
+"""
+
+import json
+import os
+from dataclasses import dataclass, asdict
+
+from ..utils import hash_file
+from .closure_utilities import get_validation_path
+
+MANIFEST_NAME = ".pyswtools_manifest.json"
+MANIFEST_VERSION = 1
+
+
+@dataclass
+class ManifestEntry:
+    """
+    Class representing the state of an input when it was cleaned
+    """
+
+    size: int
+    mtime_ns: int
+    digest: str
+
+
+class Manifest:
+    """
+    Class representing the manifest of a cleaned directory
+    """
+
+    def __init__(self, root: str, save_root: str, rules: str) -> None:
+        self.root = root
+        self.save_root = save_root
+        self.rules = rules
+        self.entries: dict[str, ManifestEntry] = {}
+
+    @property
+    def path(self) -> str:
+        """Path to the manifest file"""
+        return os.path.join(self.save_root, MANIFEST_NAME)
+
+    @classmethod
+    def load(cls, root: str, save_root: str, rules: str) -> "Manifest":
+        """
+        Read the manifest of save_root.
+        The entries are dropped if the file is invalid or if the rules changed.
+        """
+        manifest = cls(root, save_root, rules)
+        try:
+            with open(manifest.path, "r", encoding="utf8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return manifest
+
+        if data.get("version") != MANIFEST_VERSION or data.get("rules") != rules:
+            return manifest
+
+        try:
+            manifest.entries = {
+                key: ManifestEntry(**entry) for key, entry in data["files"].items()
+            }
+        except (KeyError, TypeError, AttributeError):
+            manifest.entries = {}
+        return manifest
+
+    def save(self) -> None:
+        """Write the manifest in the output directory"""
+        data = {
+            "version": MANIFEST_VERSION,
+            "rules": self.rules,
+            "files": {key: asdict(entry) for key, entry in self.entries.items()},
+        }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf8") as f:
+            json.dump(data, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def key(self, path: str) -> str:
+        """Get the key of an input path"""
+        return os.path.relpath(path, self.root).replace(os.sep, "/")
+
+    def is_unchanged(self, path: str, save_path: str, stat: os.stat_result) -> bool:
+        """
+        Return True if the input at path was already cleaned to save_path.
+        The hash is only computed when the size matches but the modification time does not.
+        """
+        entry = self.entries.get(self.key(path))
+        if entry is None or entry.size != stat.st_size:
+            return False
+        if not os.path.exists(save_path):
+            return False
+        if entry.mtime_ns == stat.st_mtime_ns:
+            return True
+        if hash_file(path) != entry.digest:
+            return False
+
+        # Same content, only the modification time changed
+        entry.mtime_ns = stat.st_mtime_ns
+        return True
+
+    def update(self, path: str, stat: os.stat_result, digest: str) -> None:
+        """Record that the input at path was cleaned"""
+        self.entries[self.key(path)] = ManifestEntry(
+            size=stat.st_size, mtime_ns=stat.st_mtime_ns, digest=digest
+        )
+
+    def remove(self, path: str) -> None:
+        """Forget the input at path"""
+        self.entries.pop(self.key(path), None)
+
+    def prune(self, seen: set[str]) -> list[tuple[str, str]]:
+        """
+        Remove the outputs of the inputs which are not in seen anymore, the cleaned file
+        and its report of the contours.
+        Return the (input, output) paths of the pruned entries.
+        """
+        pruned = []
+        for key in sorted(set(self.entries) - seen):
+            path = os.path.join(self.root, *key.split("/"))
+            save_path = os.path.join(self.save_root, *key.split("/"))
+            # The side outputs of a file are written next to it
+            for output_path in (save_path, get_validation_path(save_path)):
+                try:
+                    os.remove(output_path)
+                except FileNotFoundError:
+                    pass
+            del self.entries[key]
+            pruned.append((path, save_path))
+        return pruned
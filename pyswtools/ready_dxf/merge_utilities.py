@@ -0,0 +1,261 @@
+"""
+Module to merge the duplicate and overlapping segments of the model space.
+
+Instead of comparing every pair of segments, each segment is hashed on a grid:
+- a LINE by the angle of its direction and its distance to the origin, so all the
+  collinear lines share the same cell;
+- an ARC or a CIRCLE by its center and its radius.
+
+Only the segments of the same or neighbouring cells are compared, their intervals along
+the line or around the circle are sorted and the overlapping ones are merged into the
+first one. The segments are only merged with the ones of the same layer, linetype and
+color, which can be cut or engraved differently.
+"""
+
+import math
+
+import numpy as np
+import ezdxf
+
+from .geometry_utilities import cluster_nearby, get_arc_wcs, get_span, set_arc_wcs
+
+
+def group_runs(keys: np.ndarray, t_start: np.ndarray, t_end: np.ndarray, tol: float):
+    """
+    Sort the intervals [t_start, t_end] by key and start, then split them in runs of
+    overlapping intervals with the same key. Intervals which only touch are kept apart.
+    Return the sort order and the run of each sorted interval.
+    """
+    _, group = np.unique(keys, axis=0, return_inverse=True)
+    group = group.reshape(-1)
+    order = np.lexsort((t_start, group))
+    group = group[order]
+    t_start = t_start[order]
+    t_end = t_end[order]
+
+    # Shift each group after the previous one to compute the running end in one call
+    group_min = np.full(group.max() + 1, np.inf)
+    np.minimum.at(group_min, group, t_start)
+    spread = float(np.max(t_end - group_min[group])) + 2 * tol + 1
+    shift = group * spread - group_min[group]
+    running_end = np.maximum.accumulate(t_end + shift) - shift
+
+    new_run = np.ones(len(order), dtype=bool)
+    new_run[1:] = (group[1:] != group[:-1]) | (t_start[1:] >= running_end[:-1] - tol)
+    return order, np.cumsum(new_run) - 1
+
+
+def group_collinear(
+    start: np.ndarray, direction: np.ndarray, length: np.ndarray, tolerance: float
+) -> np.ndarray:
+    """
+    Group the collinear lines by the angle of their direction and their distance to the
+    origin. The directions are oriented in place so the lines of a group share it.
+    Return the group of each line.
+    """
+    # Orient all the directions in the same half plane to share a key
+    flip = (direction[:, 0] < -1e-12) | (
+        (np.abs(direction[:, 0]) <= 1e-12) & (direction[:, 1] < 0)
+    )
+    direction[flip] *= -1
+    angle = np.arctan2(direction[:, 1], direction[:, 0])
+    angle_tol = tolerance / max(float(length.max()), tolerance)
+    # Almost vertical lines pointing down are turned upward
+    near_down = angle < -math.pi / 2 + angle_tol
+    angle[near_down] += math.pi
+    direction[near_down] *= -1
+
+    offset = direction[:, 0] * start[:, 1] - direction[:, 1] * start[:, 0]
+    return cluster_nearby(np.stack([angle, offset], axis=1), [angle_tol, tolerance])
+
+
+def set_line_interval(line, p_low, p_high, forward: bool) -> None:
+    """Set the ends of a line, from p_low to p_high if forward else the other way"""
+    if not forward:
+        p_low, p_high = p_high, p_low
+    line.dxf.start = (p_low[0], p_low[1], line.dxf.start.z)
+    line.dxf.end = (p_high[0], p_high[1], line.dxf.end.z)
+
+
+def merge_lines(lines: list, tolerance: float) -> list:
+    """
+    Merge the collinear overlapping lines. The first line of each run is extended to
+    cover the run. Return the lines to delete.
+    """
+    if len(lines) == 0:
+        return []
+
+    points = np.array(
+        [
+            (line.dxf.start.x, line.dxf.start.y, line.dxf.end.x, line.dxf.end.y)
+            for line in lines
+        ],
+        dtype=float,
+    )
+    start = points[:, :2]
+    end = points[:, 2:]
+    delta = end - start
+    length = np.hypot(delta[:, 0], delta[:, 1])
+
+    # Zero length lines are only useless pierces
+    degenerate = length <= tolerance
+    to_delete = [lines[idx] for idx in np.flatnonzero(degenerate)]
+    valid = np.flatnonzero(~degenerate)
+    if len(valid) < 2:
+        return to_delete
+
+    start, end, length = start[valid], end[valid], length[valid]
+    direction = delta[valid] / length[:, None]
+    keys = group_collinear(start, direction, length, tolerance)
+
+    t_a = np.einsum("ij,ij->i", start, direction)
+    t_b = np.einsum("ij,ij->i", end, direction)
+    t_start = np.minimum(t_a, t_b)
+    t_end = np.maximum(t_a, t_b)
+
+    order, run = group_runs(keys, t_start, t_end, tolerance)
+    run_first = np.flatnonzero(np.diff(run, prepend=-1))
+    run_size = np.diff(np.append(run_first, len(run)))
+    run_end = np.maximum.reduceat(t_end[order], run_first)
+
+    # Keep the first line of each run and delete the others
+    duplicate = run_size[run] > 1
+    duplicate[run_first] = False
+    to_delete.extend(lines[idx] for idx in valid[order[duplicate]])
+
+    # Extend the kept line along its own direction when the run is longer
+    for position in np.flatnonzero(
+        (run_size > 1) & (run_end > t_end[order[run_first]])
+    ):
+        idx = order[run_first[position]]
+        origin = start[idx] - t_a[idx] * direction[idx]
+        set_line_interval(
+            lines[valid[idx]],
+            origin + t_start[idx] * direction[idx],
+            origin + run_end[position] * direction[idx],
+            t_a[idx] <= t_b[idx],
+        )
+
+    return to_delete
+
+
+def merge_circular_intervals(
+    intervals: list[tuple[float, float, object]], angle_tol: float
+) -> list[tuple[float, float, list]]:
+    """
+    Merge intervals (start, span, entity) on a circle.
+    Return the merged (start, span, entities) with the first entity kept.
+    """
+    intervals = sorted(intervals, key=lambda i: i[0])
+    merged = []
+    for start, span, entity in intervals:
+        if len(merged) > 0 and start < merged[-1][0] + merged[-1][1] - angle_tol:
+            last = merged[-1]
+            last[1] = max(last[1], start + span - last[0])
+            last[2].append(entity)
+        else:
+            merged.append([start, span, [entity]])
+
+    # The last interval can go over 360 and overlap the first ones
+    while len(merged) > 1 and merged[-1][0] + merged[-1][1] > (
+        merged[0][0] + 360 + angle_tol
+    ):
+        last = merged.pop()
+        first = merged[0]
+        end = max(last[0] + last[1], first[0] + 360 + first[1])
+        first[0] = last[0]
+        first[1] = end - last[0]
+        first[2] = last[2] + first[2]
+
+    # The whole circle is covered, everything is merged
+    if any(span >= 360 - angle_tol for _, span, _ in merged):
+        return [(0.0, 360.0, [entity for *_, entity in intervals])]
+
+    return [tuple(interval) for interval in merged]
+
+
+def merge_arcs(msp, arcs: list, tolerance: float) -> list:
+    """
+    Merge the arcs and circles lying on the same circle.
+    Return the entities to delete.
+    """
+    data = []
+    for entity in arcs:
+        wcs = get_arc_wcs(entity)
+        if wcs is not None:
+            data.append((entity, *wcs))
+    if len(data) < 2:
+        return []
+
+    values = np.array([d[1:4] for d in data], dtype=float)
+    _, group = np.unique(cluster_nearby(values, tolerance), return_inverse=True)
+    group = group.reshape(-1)
+    counts = np.bincount(group)
+
+    groups = {}
+    for idx in np.flatnonzero(counts[group] > 1):
+        groups.setdefault(group[idx], []).append(data[idx])
+
+    to_delete = []
+    for members in groups.values():
+        radius = members[0][3]
+        angle_tol = math.degrees(tolerance / radius) if radius > 0 else 0.0
+        intervals = [(d[4], get_span(d[4], d[5]), d[0]) for d in members]
+        for start, span, entities in merge_circular_intervals(intervals, angle_tol):
+            if len(entities) < 2:
+                continue
+            circles = [e for e in entities if e.dxftype() == "CIRCLE"]
+            if span >= 360 - angle_tol:
+                # Keep a single circle
+                if len(circles) == 0:
+                    kept = entities[0]
+                    attribs = kept.graphic_properties()
+                    attribs["extrusion"] = kept.dxf.extrusion
+                    msp.add_circle(kept.dxf.center, kept.dxf.radius, dxfattribs=attribs)
+                    to_delete.extend(entities)
+                else:
+                    to_delete.extend(e for e in entities if e is not circles[0])
+                continue
+
+            kept = entities[0]
+            set_arc_wcs(kept, start, start + span)
+            to_delete.extend(entities[1:])
+
+    return to_delete
+
+
+def get_style(entity) -> tuple[str, str, int]:
+    """Get the layer, the linetype and the color of an entity"""
+    return (
+        entity.dxf.layer,
+        entity.dxf.get("linetype", "BYLAYER").upper(),
+        entity.dxf.get("color", 256),
+    )
+
+
+def merge_duplicates(doc: ezdxf.document.Drawing, tolerance: float) -> int:
+    """
+    Merge the duplicate and overlapping LINE, ARC and CIRCLE of the model space with
+    the same style. Return the number of deleted entities.
+    """
+    msp = doc.modelspace()
+    lines = {}
+    arcs = {}
+    for entity in msp:
+        dxftype = entity.dxftype()
+        if dxftype == "LINE":
+            lines.setdefault(get_style(entity), []).append(entity)
+        elif dxftype in ("ARC", "CIRCLE"):
+            arcs.setdefault(get_style(entity), []).append(entity)
+
+    to_delete = []
+    for group in lines.values():
+        to_delete.extend(merge_lines(group, tolerance))
+    for group in arcs.values():
+        to_delete.extend(merge_arcs(msp, group, tolerance))
+
+    # Destroy the entities then purge the layout once
+    for entity in to_delete:
+        doc.entitydb.delete_entity(entity)
+    msp.purge()
+    return len(to_delete)
@@ -0,0 +1,266 @@
+"""
+Module to nest the cleaned parts on sheets.
+
+The parts are packed by their bounding box with a skyline algorithm: the top of the
+parts already placed on a sheet is kept as a list of horizontal segments, and each new
+part goes at the lowest position where it fits, turned by 90 degrees if it is lower this
+way. The largest parts are placed first and a new sheet is started when a part fits on
+none of the current ones.
+"""
+
+import csv
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import ezdxf
+from ezdxf.addons import Importer
+
+from .batch_utilities import get_number_jobs
+from .definitions import CleanOptions, NestPart, NestPlacement
+from .dxf_utilities import clean, save_doc
+
+
+class Skyline:
+    """
+    Class representing the top of the parts placed on a sheet
+    """
+
+    def __init__(self, width: float, height: float) -> None:
+        self.width = width
+        self.height = height
+        # Segments [x, y, width] from left to right
+        self.segments = [[0.0, 0.0, width]]
+
+    def find(self, width: float, height: float) -> tuple[float, float] | None:
+        """
+        Find the lowest position of a rectangle, then the leftmost one.
+        Return None if it does not fit.
+        """
+        best = None
+        best_y = math.inf
+        for idx, (x, _, _) in enumerate(self.segments):
+            if x + width > self.width + 1e-9:
+                break
+            y = 0.0
+            end = idx
+            while end < len(self.segments) and self.segments[end][0] < x + width - 1e-9:
+                y = max(y, self.segments[end][1])
+                end += 1
+            if y + height > self.height + 1e-9:
+                continue
+            if y < best_y - 1e-9:
+                best = (x, y)
+                best_y = y
+        return best
+
+    def add(self, x: float, y: float, width: float, height: float) -> None:
+        """Put a rectangle on the skyline"""
+        right = x + width
+        segments = []
+        for seg_x, seg_y, seg_width in self.segments:
+            seg_right = seg_x + seg_width
+            # Keep the parts of the segment outside the rectangle
+            if seg_x < x:
+                segments.append([seg_x, seg_y, min(seg_right, x) - seg_x])
+            if seg_right > right:
+                start = max(seg_x, right)
+                segments.append([start, seg_y, seg_right - start])
+        segments.append([x, y + height, width])
+        segments.sort(key=lambda seg: seg[0])
+
+        # Merge the neighbours at the same height
+        merged = [segments[0]]
+        for segment in segments[1:]:
+            if segment[2] <= 1e-9:
+                continue
+            if abs(segment[1] - merged[-1][1]) <= 1e-9:
+                merged[-1][2] += segment[2]
+            else:
+                merged.append(segment)
+        self.segments = merged
+
+
+def pack(
+    parts: list[NestPart], sheet_width: float, sheet_height: float, spacing: float
+) -> tuple[list[NestPlacement], list[NestPart], int]:
+    """
+    Place the parts with their quantities on sheets, spacing apart from each other and
+    from the edges of the sheets.
+    Return the placements, the parts which fit on no sheet and the number of sheets.
+    """
+    copies = [part for part in parts for _ in range(part.quantity)]
+    copies.sort(
+        key=lambda part: (max(part.width, part.height), part.area), reverse=True
+    )
+
+    # Each part takes the spacing on its right and on its top
+    usable_width = sheet_width - spacing
+    usable_height = sheet_height - spacing
+    sheets = []
+    placements = []
+    unplaced = []
+    for part in copies:
+        orientations = [(part.width + spacing, part.height + spacing, False)]
+        if part.width != part.height:
+            orientations.append((part.height + spacing, part.width + spacing, True))
+
+        placed = False
+        for sheet_idx, skyline in enumerate(sheets + [None]):
+            if skyline is None:
+                skyline = Skyline(usable_width, usable_height)
+            best = None
+            best_top = math.inf
+            for width, height, rotated in orientations:
+                position = skyline.find(width, height)
+                if position is not None and position[1] + height < best_top:
+                    best = (position[0], position[1], width, height, rotated)
+                    best_top = position[1] + height
+            if best is None:
+                continue
+
+            x, y, width, height, rotated = best
+            skyline.add(x, y, width, height)
+            if sheet_idx == len(sheets):
+                sheets.append(skyline)
+            placements.append(
+                NestPlacement(part, sheet_idx, x + spacing, y + spacing, rotated)
+            )
+            placed = True
+            break
+        if not placed:
+            unplaced.append(part)
+    return placements, unplaced, len(sheets)
+
+
+def read_quantities(path: str) -> dict[str, int]:
+    """
+    Read a csv file with the columns name and quantity.
+    The name is the path of the file relative to the input or its name without extension.
+    """
+    quantities = {}
+    with open(path, encoding="utf8", newline="") as f:
+        for row in csv.DictReader(f):
+            quantities[row["name"].strip().replace("\\", "/")] = int(row["quantity"])
+    return quantities
+
+
+def get_quantity(path: str, root: str, quantities: dict[str, int]) -> int:
+    """Get the quantity of a part from its relative path or its name"""
+    relative = os.path.relpath(path, root).replace("\\", "/")
+    if relative in quantities:
+        return quantities[relative]
+    name = os.path.splitext(os.path.basename(path))[0]
+    return quantities.get(name, 1)
+
+
+def write_sheet(
+    placements: list[NestPlacement], path: str, options: CleanOptions
+) -> str:
+    """
+    Write the parts placed on a sheet to a dxf. Each part is cleaned again and imported
+    as a block which is inserted at each of its placements.
+    """
+    doc = ezdxf.new("R2010")
+    msp = doc.modelspace()
+    blocks = {}
+    for placement in placements:
+        part = placement.part
+        if part.path not in blocks:
+            source = ezdxf.readfile(part.path)
+            clean(source, options)
+            blocks[part.path] = f"PART_{len(blocks) + 1}"
+            block = doc.blocks.new(blocks[part.path])
+            importer = Importer(source, doc)
+            importer.import_entities(source.modelspace(), block)
+            importer.finalize()
+
+        # Move the corner of the bounding box to the placement
+        if placement.rotated:
+            insert = (placement.x + part.max_y, placement.y - part.min_x)
+        else:
+            insert = (placement.x - part.min_x, placement.y - part.min_y)
+        msp.add_blockref(
+            blocks[part.path],
+            insert,
+            dxfattribs={"rotation": 90.0 if placement.rotated else 0.0},
+        )
+    save_doc(doc, path, options)
+    return path
+
+
+def write_sheets(
+    placements: list[NestPlacement],
+    number_sheets: int,
+    output_path: str,
+    options: CleanOptions,
+    jobs: int = 1,
+) -> list[str]:
+    """
+    Write a dxf per sheet and return their paths.
+    With more than one job, the sheets are spread over a pool of processes.
+    """
+    jobs = get_number_jobs(jobs)
+    sheets = [[] for _ in range(number_sheets)]
+    for placement in placements:
+        sheets[placement.sheet].append(placement)
+    paths = [
+        os.path.join(output_path, f"sheet_{idx + 1}.dxf")
+        for idx in range(number_sheets)
+    ]
+
+    if jobs == 1 or number_sheets < 2:
+        return [write_sheet(sheet, path, options) for sheet, path in zip(sheets, paths)]
+
+    with ProcessPoolExecutor(max_workers=min(jobs, number_sheets)) as executor:
+        return list(executor.map(partial(write_sheet, options=options), sheets, paths))
+
+
+def write_nest_report(
+    placements: list[NestPlacement],
+    number_sheets: int,
+    sheet_width: float,
+    sheet_height: float,
+    output_path: str,
+) -> list[float]:
+    """
+    Write the number of parts and the utilisation of each sheet to nest_sheets.csv,
+    and the place of each part to nest_placements.csv in output_path.
+    Return the utilisation of each sheet.
+    """
+    used = [0.0] * number_sheets
+    counts = [0] * number_sheets
+    for placement in placements:
+        used[placement.sheet] += placement.part.area
+        counts[placement.sheet] += 1
+    utilisations = [area / (sheet_width * sheet_height) for area in used]
+
+    sheets_path = os.path.join(output_path, "nest_sheets.csv")
+    with open(sheets_path, "w", encoding="utf8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["sheet", "parts", "utilisation"])
+        for sheet_idx in range(number_sheets):
+            writer.writerow(
+                [
+                    f"sheet_{sheet_idx + 1}.dxf",
+                    counts[sheet_idx],
+                    f"{utilisations[sheet_idx]:.4f}",
+                ]
+            )
+
+    placements_path = os.path.join(output_path, "nest_placements.csv")
+    with open(placements_path, "w", encoding="utf8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["part", "sheet", "x", "y", "rotated"])
+        for placement in placements:
+            writer.writerow(
+                [
+                    placement.part.path,
+                    f"sheet_{placement.sheet + 1}.dxf",
+                    f"{placement.x:.3f}",
+                    f"{placement.y:.3f}",
+                    placement.rotated,
+                ]
+            )
+    return utilisations
@@ -0,0 +1,302 @@
+"""
+Module to optimise the order in which the laser cuts the entities of the model space.
+
+The curves are chained into contours by their ends. A contour is cut after all the
+contours it contains, so the holes of a part are cut before its outline. The contours
+at the same level are ordered with a nearest neighbour pass refined by 2-opt, and each
+closed contour starts at its vertex closest to the end of the previous contour.
+"""
+
+import math
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+import ezdxf
+
+from .geometry_utilities import (
+    cluster_points,
+    connected_components,
+    get_curve_points,
+    point_in_polygon,
+    polygon_area,
+)
+
+# Maximum distance between a curve and the polygon used to test the containment
+FLATTENING_DISTANCE = 0.01
+
+
+@dataclass
+class Contour:
+    """
+    Class representing a chain of curves connected by their ends
+    """
+
+    entities: list[int]
+    backward: list[bool]
+    closed: bool
+    polygon: np.ndarray
+    starts: np.ndarray
+    children: list[int] = field(default_factory=list)
+
+    @property
+    def entry_points(self) -> np.ndarray:
+        """Points where the cut of the contour can start"""
+        if self.closed:
+            return self.starts
+        return self.polygon[[0, -1]]
+
+    @property
+    def center(self) -> np.ndarray:
+        """Center of the bounding box of the contour"""
+        return (self.polygon.min(axis=0) + self.polygon.max(axis=0)) / 2
+
+
+def get_travel_distance(curves: list[np.ndarray]) -> float:
+    """
+    Estimate the distance travelled without cutting, starting at the origin.
+    Each curve is cut from its end closest to the current position.
+    """
+    x, y = 0.0, 0.0
+    travel = 0.0
+    for curve in curves:
+        (x_a, y_a), (x_b, y_b) = curve[0], curve[-1]
+        d_a = math.hypot(x_a - x, y_a - y)
+        d_b = math.hypot(x_b - x, y_b - y)
+        if d_a <= d_b:
+            travel += d_a
+            x, y = x_b, y_b
+        else:
+            travel += d_b
+            x, y = x_a, y_a
+    return travel
+
+
+def walk_component(
+    members: list[int], start_node: np.ndarray, end_node: np.ndarray
+) -> tuple[list[int], list[bool], bool]:
+    """
+    Chain the curves of a component from end to end.
+    Return the curves in order, if each one is travelled backward and if the chain is closed.
+    """
+    adjacency = {}
+    for idx in members:
+        adjacency.setdefault(start_node[idx], []).append(idx)
+        adjacency.setdefault(end_node[idx], []).append(idx)
+
+    degrees = [len(edges) for edges in adjacency.values()]
+    closed = all(degree == 2 for degree in degrees)
+    ends = [node for node, edges in adjacency.items() if len(edges) == 1]
+    if not closed and (len(ends) != 2 or any(degree > 2 for degree in degrees)):
+        # Not a simple chain, keep the curves as they are
+        return list(members), [False] * len(members), False
+
+    node = ends[0] if len(ends) > 0 else start_node[members[0]]
+    used = set()
+    order, backward = [], []
+    while len(order) < len(members):
+        idx = next(i for i in adjacency[node] if i not in used)
+        used.add(idx)
+        order.append(idx)
+        backward.append(start_node[idx] != node)
+        node = start_node[idx] if backward[-1] else end_node[idx]
+    return order, backward, closed
+
+
+def build_contours(curves: list[np.ndarray], tolerance: float) -> list[Contour]:
+    """Chain the curves into contours"""
+    number = len(curves)
+    ends = np.array([curve[0] for curve in curves] + [curve[-1] for curve in curves])
+    node = cluster_points(ends, tolerance)
+    start_node, end_node = node[:number], node[number:]
+    component = connected_components(int(node.max()) + 1, start_node, end_node)
+
+    members = {}
+    for idx in range(number):
+        members.setdefault(component[start_node[idx]], []).append(idx)
+
+    contours = []
+    for indices in members.values():
+        order, backward, closed = walk_component(indices, start_node, end_node)
+        parts = [curves[i][::-1] if b else curves[i] for i, b in zip(order, backward)]
+        contours.append(
+            Contour(
+                entities=order,
+                backward=backward,
+                closed=closed,
+                polygon=np.concatenate(parts),
+                starts=np.array([part[0] for part in parts]),
+            )
+        )
+    return contours
+
+
+def build_forest(contours: list[Contour]) -> list[int]:
+    """
+    Set the children of each contour: a contour is the child of the smallest closed
+    contour containing it. Return the roots of the forest.
+    """
+    closed = [idx for idx, contour in enumerate(contours) if contour.closed]
+    areas = np.array([polygon_area(contours[idx].polygon) for idx in closed])
+    low = np.array([contours[idx].polygon.min(axis=0) for idx in closed]).reshape(-1, 2)
+    high = np.array([contours[idx].polygon.max(axis=0) for idx in closed]).reshape(
+        -1, 2
+    )
+
+    roots = []
+    for idx, contour in enumerate(contours):
+        c_low = contour.polygon.min(axis=0)
+        c_high = contour.polygon.max(axis=0)
+        c_area = polygon_area(contour.polygon) if contour.closed else 0.0
+
+        # Only the contours whose box contains this box can contain it
+        candidates = np.flatnonzero(
+            np.all(low <= c_low, axis=1)
+            & np.all(high >= c_high, axis=1)
+            & (areas > c_area)
+        )
+        parent = None
+        for candidate in candidates[np.argsort(areas[candidates])]:
+            if closed[candidate] != idx and point_in_polygon(
+                contour.polygon[0], contours[closed[candidate]].polygon
+            ):
+                parent = closed[candidate]
+                break
+        if parent is None:
+            roots.append(idx)
+        else:
+            contours[parent].children.append(idx)
+    return roots
+
+
+def nearest_neighbour(points: np.ndarray, position: np.ndarray) -> list[int]:
+    """Order the points by going each time to the closest remaining one"""
+    remaining = np.ones(len(points), dtype=bool)
+    route = []
+    for _ in range(len(points)):
+        dist = np.hypot(*(points - position).T)
+        dist[~remaining] = np.inf
+        idx = int(np.argmin(dist))
+        route.append(idx)
+        remaining[idx] = False
+        position = points[idx]
+    return route
+
+
+def two_opt(
+    points: np.ndarray, position: np.ndarray, route: list[int], deadline: float
+) -> list[int]:
+    """
+    Improve an open route starting at position by reversing the sections of the route
+    which shorten it, until no reversal helps or the deadline is reached.
+    """
+    route = np.array(route)
+    number = len(route)
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for i in range(number - 1):
+            path = np.vstack([position, points[route]])
+            a, b = path[i], path[i + 1]
+            c = path[i + 2 :]
+            d = path[i + 3 :]
+            # Reverse route[i:j+1]: (a, b) and (c, d) become (a, c) and (b, d)
+            gain = np.hypot(*(a - c).T) - np.hypot(*(a - b))
+            gain[:-1] += np.hypot(*(b - d).T) - np.hypot(*(c[:-1] - d).T)
+            best = int(np.argmin(gain))
+            if gain[best] < -1e-9:
+                route[i : i + best + 2] = route[i : i + best + 2][::-1].copy()
+                improved = True
+            if time.perf_counter() >= deadline:
+                break
+    return route.tolist()
+
+
+def order_contours(
+    contours: list[Contour], siblings: list[int], position: np.ndarray, deadline: float
+) -> tuple[list[tuple[int, int]], np.ndarray]:
+    """
+    Order recursively the contours, the children of a contour being cut before it.
+    Return the (contour, entry point) to cut and the final position.
+    """
+    if len(siblings) == 0:
+        return [], position
+
+    points = np.array([contours[idx].center for idx in siblings])
+    route = nearest_neighbour(points, position)
+    if len(route) > 2:
+        route = two_opt(points, position, route, deadline)
+
+    ordered = []
+    for idx in (siblings[i] for i in route):
+        contour = contours[idx]
+        inner, position = order_contours(contours, contour.children, position, deadline)
+        ordered.extend(inner)
+
+        entries = contour.entry_points
+        entry = int(np.argmin(np.hypot(*(entries - position).T)))
+        ordered.append((idx, entry))
+        if contour.closed:
+            position = entries[entry]
+        else:
+            position = contour.polygon[-1] if entry == 0 else contour.polygon[0]
+    return ordered, position
+
+
+def get_entity_order(
+    contours: list[Contour], ordered: list[tuple[int, int]]
+) -> list[int]:
+    """Get the order of the curves cutting the contours from their entry point"""
+    order = []
+    for idx, entry in ordered:
+        contour = contours[idx]
+        sequence = contour.entities
+        if contour.closed:
+            # Start the loop at the chosen entry point
+            sequence = sequence[entry:] + sequence[:entry]
+        elif entry == 1:
+            sequence = sequence[::-1]
+        order.extend(sequence)
+    return order
+
+
+def optimize_path(
+    doc: ezdxf.document.Drawing, tolerance: float, time_limit: float = 0.5
+) -> tuple[float, float]:
+    """
+    Reorder the entities of the model space to reduce the travel of the laser, the
+    contours inside another one being always cut first.
+    time_limit only bounds the 2-opt refinement of the routes, the curves are always
+    flattened, chained into contours and nested. The refined order is only kept if it is
+    shorter than the nearest neighbour one.
+    Return the estimated travel distance before and after.
+    """
+    msp = doc.modelspace()
+    entities = list(msp)
+    curve_entities, curves, others = [], [], []
+    for entity in entities:
+        points = get_curve_points(entity, FLATTENING_DISTANCE)
+        if points is None or len(points) < 2:
+            others.append(entity)
+        else:
+            curve_entities.append(entity)
+            curves.append(points)
+
+    before = get_travel_distance(curves)
+    if len(curves) < 2:
+        return before, before
+
+    contours = build_contours(curves, tolerance)
+    roots = build_forest(contours)
+    # Both orders respect the nesting, the deadline of the first one skips the 2-opt
+    after = math.inf
+    for deadline in (0.0, time.perf_counter() + time_limit):
+        ordered, _ = order_contours(contours, roots, np.zeros(2), deadline)
+        order = get_entity_order(contours, ordered)
+        travel = get_travel_distance([curves[idx] for idx in order])
+        if travel < after:
+            new_order, after = order, travel
+
+    msp.entity_space.clear()
+    msp.entity_space.extend([curve_entities[idx] for idx in new_order] + others)
+    return before, after
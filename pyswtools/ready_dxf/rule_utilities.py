@@ -0,0 +1,236 @@
+"""
+Module defining the cleaning rules and the engine applying them.
+
+Each rule declares the entity types it cares about. The engine goes once through the
+entities of every block (model space and paper space included), dispatches each entity
+to the interested rules and deletes all the matched entities in bulk at the end.
+"""
+
+import time
+from fnmatch import fnmatch
+
+import ezdxf
+
+from .definitions import CleanOptions, CleanReport
+
+RULES = {}
+
+
+def register_rule(cls):
+    """Add a rule class to the registry of rules"""
+    RULES[cls.name] = cls
+    return cls
+
+
+def match_patterns(name: str, patterns: list[str]) -> bool:
+    """Return True if name matches one of the patterns (case insensitive)"""
+    return any(fnmatch(name.upper(), pattern.upper()) for pattern in patterns)
+
+
+class Rule:
+    """
+    Base class of a cleaning rule
+    """
+
+    name = ""
+    # None means that the rule wants every entity
+    dxftypes: frozenset[str] | None = None
+
+    def __init__(self, options: CleanOptions) -> None:
+        self.options = options
+
+    def start(self, doc: ezdxf.document.Drawing) -> None:
+        """Prepare the rule before going through the entities"""
+
+    # pylint: disable=unused-argument
+    def match(self, entity) -> bool:
+        """Return True if the entity must be deleted"""
+        return False
+
+    # pylint: disable=unused-argument
+    def finish(self, doc: ezdxf.document.Drawing, kept: dict[str, int]) -> int:
+        """
+        Apply the rule once all the entities were seen.
+        kept is the number of entities left in each block. Return the number of deletions.
+        """
+        return 0
+
+
+@register_rule
+class SolidworksTextRule(Rule):
+    """Remove the text included by solidworks"""
+
+    name = "solidworks_text"
+    dxftypes = frozenset(["MTEXT"])
+
+    def match(self, entity) -> bool:
+        return "SOLIDWORKS" in entity.text
+
+
+@register_rule
+class DimensionLayersRule(Rule):
+    """Remove the dimensions and the entities on the dimension layers"""
+
+    name = "dimension_layers"
+
+    def match(self, entity) -> bool:
+        return entity.dxftype() == "DIMENSION" or match_patterns(
+            entity.dxf.layer, self.options.dimension_layers
+        )
+
+
+@register_rule
+class HiddenGeometryRule(Rule):
+    """Remove the invisible entities, the hidden lines and the entities on layers turned off"""
+
+    name = "hidden_geometry"
+
+    def __init__(self, options: CleanOptions) -> None:
+        super().__init__(options)
+        self.off_layers = set()
+        self.hidden_layers = set()
+
+    def start(self, doc: ezdxf.document.Drawing) -> None:
+        self.off_layers = {
+            layer.dxf.name.upper()
+            for layer in doc.layers
+            if layer.is_off() or layer.is_frozen()
+        }
+        self.hidden_layers = {
+            layer.dxf.name.upper()
+            for layer in doc.layers
+            if match_patterns(layer.dxf.linetype, self.options.hidden_linetypes)
+        }
+
+    def match(self, entity) -> bool:
+        layer = entity.dxf.layer.upper()
+        if entity.dxf.invisible == 1 or layer in self.off_layers:
+            return True
+        linetype = entity.dxf.linetype
+        if linetype.upper() == "BYLAYER":
+            return layer in self.hidden_layers
+        return match_patterns(linetype, self.options.hidden_linetypes)
+
+
+@register_rule
+class ConstructionGeometryRule(Rule):
+    """Remove the construction entities and the entities on the construction layers"""
+
+    name = "construction_geometry"
+
+    def match(self, entity) -> bool:
+        return entity.dxftype() in ("XLINE", "RAY", "POINT") or match_patterns(
+            entity.dxf.layer, self.options.construction_layers
+        )
+
+
+@register_rule
+class EmptyBlocksRule(Rule):
+    """Remove the blocks left empty and their references"""
+
+    name = "empty_blocks"
+    dxftypes = frozenset(["INSERT"])
+
+    def __init__(self, options: CleanOptions) -> None:
+        super().__init__(options)
+        self.inserts = {}
+
+    def start(self, doc: ezdxf.document.Drawing) -> None:
+        self.inserts = {}
+
+    def match(self, entity) -> bool:
+        self.inserts.setdefault(entity.dxf.name.upper(), []).append(entity)
+        return False
+
+    def finish(self, doc: ezdxf.document.Drawing, kept: dict[str, int]) -> int:
+        kept = dict(kept)
+        deleted = 0
+        # A block whose only entities were references to removed blocks is empty in its
+        # turn, so the blocks are checked again until none is removed
+        changed = True
+        while changed:
+            changed = False
+            for bloc in list(doc.blocks):
+                name = bloc.name
+                # Keep the layouts and the anonymous blocks used by other entities
+                if bloc.is_any_layout or name.startswith("*") or kept.get(name, 0) > 0:
+                    continue
+                for insert in self.inserts.get(name.upper(), []):
+                    if insert.is_alive:
+                        layout = insert.get_layout()
+                        owner = layout.block_record.dxf.name
+                        layout.delete_entity(insert)
+                        kept[owner] = kept.get(owner, 1) - 1
+                        deleted += 1
+                doc.blocks.delete_block(name, safe=False)
+                deleted += 1
+                changed = True
+        return deleted
+
+
+class CleaningEngine:
+    """
+    Apply a set of rules to a document in a single pass
+    """
+
+    def __init__(self, options: CleanOptions) -> None:
+        unknown = [name for name in options.rules if name not in RULES]
+        if len(unknown) > 0:
+            raise ValueError(f"Unknown cleaning rules: {', '.join(unknown)}")
+        self.rules = [RULES[name](options) for name in options.rules]
+
+        # Rules interested by every entity are called for each type
+        self.generic_rules = [rule for rule in self.rules if rule.dxftypes is None]
+        self.rules_by_type = {}
+        for rule in self.rules:
+            for dxftype in rule.dxftypes or []:
+                self.rules_by_type.setdefault(dxftype, []).append(rule)
+        self.dispatch = {}
+
+    def get_rules(self, dxftype: str) -> list[Rule]:
+        """Get the rules interested by an entity type"""
+        if dxftype not in self.dispatch:
+            self.dispatch[dxftype] = (
+                self.rules_by_type.get(dxftype, []) + self.generic_rules
+            )
+        return self.dispatch[dxftype]
+
+    def run(self, doc: ezdxf.document.Drawing) -> CleanReport:
+        """Apply the rules to doc and report the deletions and the time of each rule"""
+        report = CleanReport(
+            deleted={rule.name: 0 for rule in self.rules},
+            timings={rule.name: 0.0 for rule in self.rules},
+        )
+        for rule in self.rules:
+            start = time.perf_counter()
+            rule.start(doc)
+            report.timings[rule.name] += time.perf_counter() - start
+
+        kept = {}
+        for bloc in doc.blocks:
+            to_delete = []
+            number = 0
+            for entity in bloc:
+                number += 1
+                for rule in self.get_rules(entity.dxftype()):
+                    start = time.perf_counter()
+                    matched = rule.match(entity)
+                    report.timings[rule.name] += time.perf_counter() - start
+                    if matched:
+                        report.deleted[rule.name] += 1
+                        to_delete.append(entity)
+                        break
+            kept[bloc.name] = number - len(to_delete)
+
+            # Destroy the entities then purge the block once
+            if len(to_delete) > 0:
+                for entity in to_delete:
+                    doc.entitydb.delete_entity(entity)
+                bloc.purge()
+
+        for rule in self.rules:
+            start = time.perf_counter()
+            report.deleted[rule.name] += rule.finish(doc, kept)
+            report.timings[rule.name] += time.perf_counter() - start
+
+        return report
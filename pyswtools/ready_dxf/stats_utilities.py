@@ -0,0 +1,231 @@
+"""
+Module to compute the quoting metrics of dxf files: the cut length, the number of
+pierces and the bounding box.
+
+The entities of the model space are sorted by type and each type is measured with array
+operations: the lines from their ends, the arcs from their radius and angles and the
+other curves (polylines, splines, ellipses) from their flattened points. The blocks
+referenced in the model space are measured through their virtual entities.
+"""
+
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Iterable, Iterator
+
+import numpy as np
+import ezdxf
+
+from .batch_utilities import get_number_jobs
+from .definitions import CleanOptions, DxfStats
+from .dxf_utilities import clean
+from .geometry_utilities import (
+    cluster_points,
+    connected_components,
+    get_arc_wcs,
+    get_curve_points,
+)
+
+# Maximum distance between a curve and the polygon used to measure it
+FLATTENING_DISTANCE = 0.01
+
+STATS_FIELDS = [
+    "path",
+    "cut_length",
+    "pierces",
+    "closed_contours",
+    "min_x",
+    "min_y",
+    "max_x",
+    "max_y",
+    "width",
+    "height",
+    "error",
+]
+
+
+def collect_geometry(entities, lines: list, arcs: list, curves: list) -> None:
+    """
+    Sort the curve entities in lines (x1, y1, x2, y2), arcs (cx, cy, r, start, end)
+    and flattened curves. The references to blocks are followed.
+    """
+    for entity in entities:
+        dxftype = entity.dxftype()
+        if dxftype == "LINE":
+            start, end = entity.dxf.start, entity.dxf.end
+            lines.append((start.x, start.y, end.x, end.y))
+        elif dxftype == "INSERT":
+            collect_geometry(entity.virtual_entities(), lines, arcs, curves)
+        else:
+            wcs = get_arc_wcs(entity) if dxftype in ("ARC", "CIRCLE") else None
+            if wcs is not None:
+                arcs.append(wcs)
+                continue
+            points = get_curve_points(entity, FLATTENING_DISTANCE)
+            if points is not None and len(points) > 1:
+                curves.append(points)
+
+
+def get_arc_extremes(arcs: np.ndarray) -> np.ndarray:
+    """
+    Get the points of the arcs which can bound them: their ends and the points at 0, 90,
+    180 and 270 degrees lying on the arcs
+    """
+    center, radius = arcs[:, :2], arcs[:, 2]
+    start, span = arcs[:, 3], get_spans(arcs[:, 3], arcs[:, 4])
+    angles = [start, start + span]
+    for quadrant in (0.0, 90.0, 180.0, 270.0):
+        # Outside the span, the point is replaced by the start of the arc
+        inside = (quadrant - start) % 360 <= span
+        angles.append(np.where(inside, quadrant, start))
+    angles = np.radians(np.stack(angles, axis=1))
+    x = center[:, 0, None] + radius[:, None] * np.cos(angles)
+    y = center[:, 1, None] + radius[:, None] * np.sin(angles)
+    return np.stack([x.ravel(), y.ravel()], axis=1)
+
+
+def get_spans(start: np.ndarray, end: np.ndarray) -> np.ndarray:
+    """Get the angles covered by arcs going counterclockwise from start to end"""
+    span = (end - start) % 360
+    span[np.isclose(span, 0.0, atol=1e-12)] = 360.0
+    return span
+
+
+def count_contours(
+    starts: np.ndarray, ends: np.ndarray, tolerance: float
+) -> tuple[int, int]:
+    """
+    Chain the curves whose ends are closer than tolerance.
+    Return the number of contours and the number of closed ones.
+    """
+    number = len(starts)
+    if number == 0:
+        return 0, 0
+    node = cluster_points(np.concatenate([starts, ends]), tolerance)
+    start_node, end_node = node[:number], node[number:]
+
+    # The nodes and the curves of a contour share the label of the contour
+    component = connected_components(int(node.max()) + 1, start_node, end_node)
+    used = np.unique(np.concatenate([start_node, end_node]))
+    nodes = np.bincount(component[used], minlength=component.max() + 1)
+    edges = np.bincount(component[start_node], minlength=component.max() + 1)
+    present = edges > 0
+    # A contour with at least as many curves as ends forms a loop
+    return int(np.count_nonzero(present)), int(
+        np.count_nonzero(present & (edges >= nodes))
+    )
+
+
+def compute_stats(path: str, doc: ezdxf.document.Drawing, tolerance: float) -> DxfStats:
+    """Measure the curves of the model space of doc"""
+    lines, arcs, curves = [], [], []
+    collect_geometry(doc.modelspace(), lines, arcs, curves)
+    lines = np.array(lines, dtype=float).reshape(-1, 4)
+    arcs = np.array(arcs, dtype=float).reshape(-1, 5)
+
+    cut_length = float(np.hypot(*(lines[:, 2:] - lines[:, :2]).T).sum())
+    spans = get_spans(arcs[:, 3], arcs[:, 4])
+    cut_length += float((arcs[:, 2] * np.radians(spans)).sum())
+
+    starts = [lines[:, :2]]
+    ends = [lines[:, 2:]]
+    bounds = [lines[:, :2], lines[:, 2:], get_arc_extremes(arcs)]
+    angles = np.radians(np.stack([arcs[:, 3], arcs[:, 3] + spans], axis=1))
+    arc_ends = arcs[:, None, :2] + arcs[:, 2, None, None] * np.stack(
+        [np.cos(angles), np.sin(angles)], axis=2
+    )
+    starts.append(arc_ends[:, 0])
+    ends.append(arc_ends[:, 1])
+
+    if len(curves) > 0:
+        points = np.concatenate(curves)
+        segments = np.hypot(*np.diff(points, axis=0).T)
+        # Drop the segments joining two consecutive curves
+        last = np.cumsum([len(curve) for curve in curves])[:-1] - 1
+        segments[last] = 0.0
+        cut_length += float(segments.sum())
+        starts.append(np.array([curve[0] for curve in curves]))
+        ends.append(np.array([curve[-1] for curve in curves]))
+        bounds.append(points)
+
+    pierces, closed = count_contours(
+        np.concatenate(starts), np.concatenate(ends), tolerance
+    )
+    stats = DxfStats(path, cut_length, pierces, closed)
+    bounds = np.concatenate(bounds)
+    if len(bounds) > 0:
+        low = bounds.min(axis=0)
+        high = bounds.max(axis=0)
+        stats.min_x, stats.min_y = float(low[0]), float(low[1])
+        stats.max_x, stats.max_y = float(high[0]), float(high[1])
+    return stats
+
+
+def stats_file(path: str, options: CleanOptions | None = None) -> DxfStats:
+    """
+    Read and clean a file in memory then measure it.
+    Errors are reported in the stats instead of being raised so a batch is never aborted.
+    """
+    options = options or CleanOptions()
+    try:
+        doc = ezdxf.readfile(path)
+        clean(doc, options)
+        return compute_stats(path, doc, options.tolerance)
+    # pylint: disable=broad-except
+    except Exception as err:
+        return DxfStats(path, error=f"{type(err).__name__}: {err}")
+
+
+def stats_batch(
+    paths: Iterable[str], jobs: int = 1, options: CleanOptions | None = None
+) -> Iterator[DxfStats]:
+    """
+    Measure each file and yield the stats in the same order as the paths.
+    With more than one job, the files are spread over a pool of processes.
+    """
+    jobs = get_number_jobs(jobs)
+    paths = list(paths)
+
+    if jobs == 1 or len(paths) < 2:
+        for path in paths:
+            yield stats_file(path, options)
+        return
+
+    jobs = min(jobs, len(paths))
+    chunksize = max(1, len(paths) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        yield from executor.map(
+            partial(stats_file, options=options), paths, chunksize=chunksize
+        )
+
+
+def total_stats(stats: list[DxfStats]) -> DxfStats:
+    """Sum the stats of the files measured without error"""
+    valid = [s for s in stats if s.error == ""]
+    return DxfStats(
+        "total",
+        cut_length=sum(s.cut_length for s in valid),
+        pierces=sum(s.pierces for s in valid),
+        closed_contours=sum(s.closed_contours for s in valid),
+    )
+
+
+def export_stats(stats: list[DxfStats], output_path: str) -> None:
+    """
+    Write the stats of each file and their total to output_path.
+    The format is json if the extension is .json and csv otherwise.
+    """
+    total = total_stats(stats)
+    if os.path.splitext(output_path)[1].lower() == ".json":
+        data = {"files": [s.dict() for s in stats], "total": total.dict()}
+        with open(output_path, "w", encoding="utf8") as f:
+            json.dump(data, f, indent=2)
+        return
+
+    with open(output_path, "w", encoding="utf8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=STATS_FIELDS)
+        writer.writeheader()
+        for row in stats + [total]:
+            writer.writerow(row.dict())
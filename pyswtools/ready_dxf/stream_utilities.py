@@ -0,0 +1,139 @@
+"""
+Module to clean dxf files as a stream of tags without building the ezdxf document.
+
+A dxf file is a sequence of (group code, value) line pairs. Only the MTEXT entities are
+buffered while they are read, every other tag is written straight to the output so the
+memory used does not depend on the size of the file.
+"""
+
+import os
+import shutil
+import tempfile
+from typing import BinaryIO, Iterator
+
+SW_TEXT = b"SOLIDWORKS"
+BINARY_SENTINEL = b"AutoCAD Binary DXF"
+CLEANED_SECTIONS = (b"BLOCKS", b"ENTITIES")
+
+
+class StreamNotSupported(Exception):
+    """Raised when a file can not be handled by the stream cleaner"""
+
+
+def is_binary_dxf(path: str) -> bool:
+    """Return True if the file is a binary dxf"""
+    with open(path, "rb") as f:
+        return f.read(len(BINARY_SENTINEL)) == BINARY_SENTINEL
+
+
+def iter_tags(stream: BinaryIO) -> Iterator[tuple[int, bytes, bytes]]:
+    """
+    Yield the (group code, raw code line, raw value line) of a dxf stream
+    """
+    for code_line in stream:
+        value_line = stream.readline()
+        if not value_line:
+            raise StreamNotSupported("Unexpected end of file")
+        try:
+            code = int(code_line)
+        except ValueError as err:
+            raise StreamNotSupported(f"Invalid group code {code_line!r}") from err
+        yield code, code_line, value_line
+
+
+def get_value(value_line: bytes) -> bytes:
+    """Get the value of a tag without the line ending"""
+    return value_line.rstrip(b"\r\n")
+
+
+def is_sw_text(entity: list[tuple[int, bytes, bytes]]) -> bool:
+    """
+    Return True if the buffered MTEXT entity contains the solidworks text.
+    The text of a MTEXT is split between the 3 tags and the final 1 tag.
+    """
+    text = b"".join(get_value(value) for code, _, value in entity if code in (1, 3))
+    if SW_TEXT not in text:
+        return False
+
+    # ezdxf also deletes the objects owned by the entity, the stream cannot
+    if any(
+        code == 360 or (code == 102 and b"ACAD_XDICTIONARY" in value)
+        for code, _, value in entity
+    ):
+        raise StreamNotSupported("MTEXT with an extension dictionary")
+    return True
+
+
+def stream_remove_sw(input_stream: BinaryIO, output_stream: BinaryIO) -> int:
+    """
+    Copy the dxf input_stream to output_stream without the MTEXT containing the
+    solidworks text. Return the number of removed entities.
+    """
+    removed = 0
+    section = None
+    entity = None
+    start_section = False
+    end_of_file = False
+
+    for tag in iter_tags(input_stream):
+        code, code_line, value_line = tag
+
+        if code == 0:
+            # A new structure starts, handle the buffered MTEXT
+            if entity is not None:
+                if is_sw_text(entity):
+                    removed += 1
+                else:
+                    for _, buf_code, buf_value in entity:
+                        output_stream.write(buf_code)
+                        output_stream.write(buf_value)
+                entity = None
+
+            value = get_value(value_line).strip()
+            if value == b"ENDSEC":
+                section = None
+            elif value == b"EOF":
+                end_of_file = True
+            elif value == b"MTEXT" and section in CLEANED_SECTIONS:
+                entity = []
+            start_section = value == b"SECTION"
+        else:
+            if code == 2 and start_section:
+                section = get_value(value_line).strip()
+            start_section = False
+
+        if entity is not None:
+            entity.append(tag)
+        else:
+            output_stream.write(code_line)
+            output_stream.write(value_line)
+
+    if not end_of_file:
+        raise StreamNotSupported("Missing EOF tag")
+
+    return removed
+
+
+def stream_clean(path: str, save_path: str) -> int:
+    """
+    Clean the dxf file at path and save it at save_path without loading the document.
+    Raise StreamNotSupported if the file has to be handled by ezdxf instead.
+    Return the number of removed entities.
+    """
+    if is_binary_dxf(path):
+        raise StreamNotSupported("Binary dxf")
+
+    # Write to a temporary file so a failure never leaves a partial output
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(save_path)), suffix=".tmp"
+    )
+    try:
+        with open(path, "rb") as input_stream, os.fdopen(fd, "wb") as output_stream:
+            removed = stream_remove_sw(input_stream, output_stream)
+        # mkstemp creates the file readable by its owner only, keep the input mode
+        shutil.copymode(path, tmp_path)
+        os.replace(tmp_path, save_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return removed
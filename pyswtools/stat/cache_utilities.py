@@ -0,0 +1,186 @@
+"""
+Module to handle the cache of the mass properties of the components.
+
+The mass and the density of a part in a configuration only change with its file. They
+are kept in a sqlite database of the user cache directory with the size and the
+modification time of the file, and its hash if enabled in the config. An entry is only
+used while the file is unchanged, the least recently used entries are evicted above the
+size of the cache. The assemblies are not cached, their mass also changing with their
+components.
+"""
+
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+import click
+from appdirs import user_cache_dir
+
+# pylint: disable=relative-beyond-top-level
+from ..config import get_config
+from ..utils import hash_file
+
+CACHE_NAME = "mass_cache.sqlite3"
+CACHE_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS mass (
+    path TEXT NOT NULL,
+    configuration TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    digest TEXT,
+    mass REAL NOT NULL,
+    density REAL NOT NULL,
+    used REAL NOT NULL,
+    PRIMARY KEY (path, configuration)
+)
+"""
+
+
+def get_cache_dir() -> Path:
+    """Get the cache dir of the project"""
+    return Path(user_cache_dir("pyswtools", "ldevillez"))
+
+
+class MassCache:
+    """
+    Class representing the mass properties of the files already evaluated
+    """
+
+    def __init__(
+        self, path: str, max_entries: int, use_hash: bool = False, read: bool = True
+    ) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self.use_hash = use_hash
+        self.read = read
+        self.hits = 0
+        self.misses = 0
+        # Entries used during the run, their time of use is written on close
+        self._used = {}
+        self._stats = {}
+        self._digests = {}
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path)
+        if self._db.execute("PRAGMA user_version").fetchone()[0] != CACHE_VERSION:
+            self._db.execute("DROP TABLE IF EXISTS mass")
+            self._db.execute(f"PRAGMA user_version = {CACHE_VERSION}")
+        self._db.execute(SCHEMA)
+        self._db.commit()
+
+    @classmethod
+    def open_default(
+        cls, max_entries: int, use_hash: bool = False, read: bool = True
+    ) -> "MassCache":
+        """Open the cache of the user cache directory"""
+        return cls(
+            str(get_cache_dir().joinpath(CACHE_NAME)), max_entries, use_hash, read
+        )
+
+    def key(self, path: str) -> str:
+        """Get the key of a file path"""
+        return os.path.normcase(os.path.abspath(path))
+
+    def stat(self, key: str) -> os.stat_result | None:
+        """Get the size and modification time of a file, once per run"""
+        if key not in self._stats:
+            try:
+                self._stats[key] = os.stat(key)
+            except OSError:
+                self._stats[key] = None
+        return self._stats[key]
+
+    def digest(self, key: str) -> str:
+        """Get the hash of a file, once per run"""
+        if key not in self._digests:
+            self._digests[key] = hash_file(key)
+        return self._digests[key]
+
+    def get(self, path: str, configuration: str) -> tuple[float, float] | None:
+        """
+        Get the mass and density of a file in a configuration if the file is unchanged.
+        The hash is only computed when the size matches but the modification time does
+        not.
+        """
+        key = self.key(path)
+        stat = self.stat(key) if self.read else None
+        if stat is None:
+            self.misses += 1
+            return None
+
+        row = self._db.execute(
+            "SELECT size, mtime_ns, digest, mass, density FROM mass "
+            "WHERE path = ? AND configuration = ?",
+            (key, configuration),
+        ).fetchone()
+        if row is None or row[0] != stat.st_size:
+            self.misses += 1
+            return None
+        if row[1] != stat.st_mtime_ns:
+            if not self.use_hash or row[2] is None or row[2] != self.digest(key):
+                self.misses += 1
+                return None
+            # Same content, only the modification time changed
+            self._db.execute(
+                "UPDATE mass SET mtime_ns = ? WHERE path = ? AND configuration = ?",
+                (stat.st_mtime_ns, key, configuration),
+            )
+
+        self.hits += 1
+        self._used[(key, configuration)] = time.time()
+        return row[3], row[4]
+
+    def put(self, path: str, configuration: str, mass: float, density: float) -> None:
+        """Record the mass and density of a file in a configuration"""
+        key = self.key(path)
+        stat = self.stat(key)
+        if stat is None:
+            return
+        self._db.execute(
+            "INSERT OR REPLACE INTO mass VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                key,
+                configuration,
+                stat.st_size,
+                stat.st_mtime_ns,
+                self.digest(key) if self.use_hash else None,
+                mass,
+                density,
+                time.time(),
+            ),
+        )
+
+    def close(self) -> None:
+        """Write the time of use of the entries, evict the oldest ones and close"""
+        self._db.executemany(
+            "UPDATE mass SET used = ? WHERE path = ? AND configuration = ?",
+            [(used, *key) for key, used in self._used.items()],
+        )
+        count = self._db.execute("SELECT COUNT(*) FROM mass").fetchone()[0]
+        if count > self.max_entries:
+            self._db.execute(
+                "DELETE FROM mass WHERE rowid IN "
+                "(SELECT rowid FROM mass ORDER BY used LIMIT ?)",
+                (count - self.max_entries,),
+            )
+        self._db.commit()
+        self._db.close()
+
+
+def open_mass_cache(read: bool = True) -> MassCache | None:
+    """
+    Open the cache of the user cache directory with the size and hash of the config.
+    The values are not read but only written when read is False.
+    Return None if the cache can not be opened.
+    """
+    conf = get_config()
+    try:
+        return MassCache.open_default(
+            conf.stat_cache_size, conf.stat_cache_hash, read=read
+        )
+    except (OSError, sqlite3.Error) as err:
+        click.echo(f"Could not open the cache of the masses: {err}")
+        return None
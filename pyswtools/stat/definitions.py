@@ -1,5 +1,7 @@
 from enum import Enum
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
+
+from .cache_utilities import MassCache
 
 
 class TypeComponent(str, Enum):
@@ -66,3 +68,21 @@ class StatComponent:
         Convert the class to a dict structure
         """
         return {k: v for k, v in asdict(self).items()}
+
+
+@dataclass
+class StatTraversal:
+    """
+    Class representing the state of the traversal of an assembly.
+    The subtrees already traversed are kept by path and configuration with the
+    (name, number) of the components counted during their traversal. In lightweight
+    mode, the dependencies of the files give the assemblies and the masses missing from
+    the cache are resolved after the traversal.
+    """
+
+    subtrees: dict = field(default_factory=dict)
+    visits: list = field(default_factory=list)
+    hits: int = 0
+    mass_cache: MassCache | None = None
+    dependencies: dict | None = None
+    pending: dict = field(default_factory=dict)
@@ -6,9 +6,20 @@ import os
 import click
 
 # pylint: disable=relative-beyond-top-level
-from ..utils import check_system, check_system_verbose, do_windows_clipboard
-from ..helper_sw import open_app_and_file, is_temp, is_assembly
+from ..utils import check_system_verbose, do_windows_clipboard
+from ..helper_sw import (
+    OPEN_LOAD_LIGHTWEIGHT,
+    OPEN_OVERRIDE_DEFAULT_LIGHTWEIGHT,
+    OPEN_READ_ONLY,
+    OPEN_SILENT,
+    get_byref_int,
+    get_type_file,
+    open_app_and_file,
+    is_temp,
+    is_assembly,
+)
 
+from .cache_utilities import open_mass_cache
 from .definitions import (
     TypeComponent,
     TypeExport,
@@ -16,19 +27,10 @@ from .definitions import (
     TypeSort,
     StatComponent,
     StatComponentTree,
+    StatTraversal,
 )
 
 
-if check_system():
-    # pylint: disable=import-error
-    import win32com.client
-    import pythoncom
-
-    Views = []
-    VT_Views = win32com.client.VARIANT(pythoncom.VT_VARIANT, Views)
-    VT_BYREF = win32com.client.VARIANT(pythoncom.VT_BYREF | pythoncom.VT_I4, -1)
-
-
 def filter_density_list(struct: dict) -> None:
     """
     Filter element from a list struct to get only the ones with a density differnt from 1000
@@ -81,25 +83,48 @@ def clean_confs(tree_struct: dict, dict_struct: dict) -> None:
     Clean the name of the tree and list struct of the conf and remove duplicate.
     """
 
-    remove_duplicate_conf_list(dict_struct, dict_struct)
-    remove_duplicate_conf_tree(tree_struct, dict_struct)
+    groups = group_by_conf(dict_struct)
+    remove_duplicate_conf_list(dict_struct, dict_struct, groups)
+    names = set(dict_struct)
 
-    remove_conf_list(dict_struct)
-    remove_conf_tree(tree_struct, dict_struct)
+    remove_conf_list(dict_struct, groups)
+    remove_conf_tree(tree_struct, dict_struct, names)
 
 
-def remove_conf_tree(tree_struct: dict, dict_of_comp: dict) -> None:
+def group_by_conf(names) -> dict:
     """
-    Clean the name of a tree struct.
-    If there is only one configuration for a component, remove the configuration
-    Otherwise keep it.
+    Group names by their name without the configuration, keeping their order
     """
-    remove_conf_with_list(tree_struct, dict_of_comp)
-    for elem in tree_struct:
-        remove_conf_tree(tree_struct[elem].children, dict_of_comp)
+    groups = {}
+    for name in names:
+        # Same as strip_conf, inlined as it is called for each name
+        stripped_name = name.partition("@")[0]
+        if stripped_name not in groups:
+            groups[stripped_name] = [name]
+        else:
+            groups[stripped_name].append(name)
+    return groups
 
 
-def remove_conf_with_list(list_struct: dict, dict_of_comp: dict) -> None:
+def remove_conf_tree(
+    tree_struct: dict, dict_of_comp: dict, names: set | None = None
+) -> None:
+    """
+    Clean the name of a tree struct in a single pass.
+    The components whose stripped name is in names, the list struct before it was
+    renamed, are merged first. Then if there is only one configuration for a component,
+    remove the configuration. Otherwise keep it.
+    """
+    stacks = [tree_struct]
+    while len(stacks) > 0:
+        list_struct = stacks.pop()
+        if names is not None:
+            remove_conf_with_list(list_struct, names)
+        remove_conf_with_list(list_struct, dict_of_comp)
+        stacks += [v.children for v in list_struct.values()]
+
+
+def remove_conf_with_list(list_struct: dict, dict_of_comp) -> None:
     """
     Clean the name of a tree struct with an additional list.
     If the stripped name is in the list, remove the configuration
@@ -107,9 +132,7 @@ def remove_conf_with_list(list_struct: dict, dict_of_comp: dict) -> None:
     if len(list_struct) == 0:
         return
 
-    list_of_name = list(list_struct.keys())
-
-    for name in list_of_name:
+    for name in list(list_struct):
         stripped_name = strip_conf(name)
         if stripped_name in dict_of_comp:
             if stripped_name not in list_struct:
@@ -119,78 +142,70 @@ def remove_conf_with_list(list_struct: dict, dict_of_comp: dict) -> None:
             del list_struct[name]
 
 
-def remove_conf_list(list_struct: dict) -> None:
+def remove_conf_list(list_struct: dict, groups: dict | None = None) -> None:
     """
-    Clean the name of a list struct.
+    Clean the name of a list struct, groups being its names grouped by configuration
+    if already known.
     If there is only one configuration for a component, remove the configuration
     Otherwise keep it.
     """
     if len(list_struct) == 0:
         return
+    if groups is None:
+        groups = group_by_conf(list_struct)
 
-    # Always strip one elem list
-    if len(list_struct) == 1:
-        name = list(list_struct.keys())[0]
-        list_struct[strip_conf(name)] = list_struct[name]
-        del list_struct[name]
-        return
-
-    # Get keys sorted by name
-    sorted_list = sort_key_struct(list_struct, TypeSort.NAME)
-
-    # Check first case
-    if strip_conf(sorted_list[0]) != strip_conf(sorted_list[1]):
-        # Rename
-        list_struct[strip_conf(sorted_list[0])] = list_struct[sorted_list[0]]
-        del list_struct[sorted_list[0]]
-
-    # Check last case
-    if strip_conf(sorted_list[-1]) != strip_conf(sorted_list[-2]):
-        # Rename
-        list_struct[strip_conf(sorted_list[-1])] = list_struct[sorted_list[-1]]
-        del list_struct[sorted_list[-1]]
-
-    for idx, name in enumerate(sorted_list[1:-1]):
-        # Check all middle cases
-        if strip_conf(name) != strip_conf(sorted_list[idx]) and strip_conf(
-            name
-        ) != strip_conf(sorted_list[idx + 2]):
-            list_struct[strip_conf(name)] = list_struct[name]
-            del list_struct[name]
-
+    singles = {
+        names[0]: stripped_name
+        for stripped_name, names in groups.items()
+        if len(names) == 1
+    }
 
-def remove_duplicate_conf_tree(tree_struct: dict, dict_struct: dict) -> None:
-    """
-    Filter element from struct (tree or list) which have only different configuration names but same Mass
-    """
+    # The names are renamed in the order of the names sorted without case, the first
+    # and the last ones being renamed first
+    first = min(list_struct, key=str.lower)
+    last = max(reversed(list_struct), key=str.lower)
+    ends = [name for name in dict.fromkeys([first, last]) if name in singles]
+    ordered = ends + sorted(
+        (name for name in singles if name not in ends), key=str.lower
+    )
 
-    remove_conf_with_list(tree_struct, dict_struct)
-    for name in list(tree_struct.keys()):
-        remove_duplicate_conf_tree(tree_struct[name].children, dict_struct)
+    for name in ordered:
+        stripped_name = singles[name]
+        if stripped_name != name:
+            list_struct[stripped_name] = list_struct.pop(name)
 
 
-def remove_duplicate_conf_list(struct: dict, mass_struct: dict) -> None:
+def remove_duplicate_conf_list(
+    struct: dict, mass_struct: dict, groups: dict | None = None
+) -> None:
     """
     Filter element from struct (tree or list) which have only different configuration names but same Mass
+    The groups of names by configuration, if given, are updated with the kept names
     """
+    if groups is None:
+        groups = group_by_conf(struct)
 
-    # Get elements sorted by mass part
-    sorted_list = sort_key_struct(struct, TypeSort.MASS_PART)
-    for idx, name in enumerate(sorted_list[:-1]):
-        # If the elem was removed
-        if name not in struct:
+    # Each element absorbs the following ones of its group, sorted by mass part, while
+    # their mass is the same
+    for stripped_name, names in groups.items():
+        if len(names) == 1:
             continue
-
-        # We test the following elements
-        for name_test in sorted_list[idx + 1 :]:
-            # if we do not have the same mass, we end
-            if abs(mass_struct[name].mass - mass_struct[name_test].mass) > 1e-5:
-                break
-            # We compare the names
-            if strip_conf(name_test) == strip_conf(name):
+        names = sorted(names, key=lambda i: mass_struct[i].mass, reverse=True)
+        kept = []
+        idx = 0
+        while idx < len(names):
+            name = names[idx]
+            kept.append(name)
+            idx += 1
+            while (
+                idx < len(names)
+                and abs(mass_struct[name].mass - mass_struct[names[idx]].mass) <= 1e-5
+            ):
                 # We fused data
-                struct[name].number += struct[name_test].number
-                del struct[name_test]
+                struct[name].number += struct[names[idx]].number
+                del struct[names[idx]]
+                idx += 1
+        groups[stripped_name] = kept
 
 
 def sort_tulpe(
@@ -379,7 +394,7 @@ def strip_conf(name: str) -> str:
     """
     Get the name without the configuration
     """
-    return name.split("@")[0]
+    return name.partition("@")[0]
 
 
 def fill_drawing_dependencies(sw_app, input_path: str, struct: dict):
@@ -410,7 +425,9 @@ def fill_drawing_dependencies(sw_app, input_path: str, struct: dict):
     return parts_in_plan_dict
 
 
-def complete_info_on_list(sw_comp_children, dict_of_comp: dict) -> dict:
+def complete_info_on_list(
+    sw_comp_children, dict_of_comp: dict, traversal: StatTraversal | None = None
+) -> dict:
     """
     Get all the info from a list of component
     """
@@ -428,7 +445,7 @@ def complete_info_on_list(sw_comp_children, dict_of_comp: dict) -> dict:
         sw_child_name = get_clean_name(sw_child)
 
         # Get the info of the assembly
-        child = complete_info_assembly(sw_child, dict_of_comp)
+        child = complete_info_assembly(sw_child, dict_of_comp, traversal)
 
         # If the child is already here, only increase the number
         if sw_child_name not in children:
@@ -439,7 +456,161 @@ def complete_info_on_list(sw_comp_children, dict_of_comp: dict) -> dict:
     return children
 
 
-def complete_info_assembly(sw_comp, dict_of_comp: dict) -> dict:
+def copy_tree(tree_struct: dict) -> dict:
+    """
+    Copy a tree struct, its components being modified in place once built
+    """
+    return {
+        k: StatComponentTree(number=v.number, children=copy_tree(v.children))
+        for k, v in tree_struct.items()
+    }
+
+
+def get_dependencies(sw_app, input_path: str) -> dict:
+    """
+    Get the documents referenced by the assembly and by each sub assembly from their
+    files, without loading them
+    """
+    dependencies = {}
+    pending = [os.path.abspath(input_path)]
+    while len(pending) > 0:
+        path = pending.pop()
+        if os.path.normcase(path) in dependencies:
+            continue
+        sw_dependencies = sw_app.GetDocumentDependencies2(path, False, True, False)
+        references = list(sw_dependencies[1::2]) if sw_dependencies else []
+        dependencies[os.path.normcase(path)] = [
+            os.path.normcase(reference) for reference in references
+        ]
+        pending += [reference for reference in references if is_assembly(reference)]
+    return dependencies
+
+
+def has_children(sw_comp, traversal: StatTraversal | None = None) -> bool:
+    """
+    Check if a component is an assembly with components, from the dependencies of its
+    file in lightweight mode
+    """
+    if traversal is not None and traversal.dependencies is not None:
+        sw_path = sw_comp.GetPathName
+        if sw_path:
+            return len(traversal.dependencies.get(os.path.normcase(sw_path), [])) > 0
+    sw_comp_children = sw_comp.GetChildren
+    return sw_comp_children is not None and len(sw_comp_children) > 0
+
+
+def complete_info_children(
+    sw_comp, dict_of_comp: dict, traversal: StatTraversal | None = None
+) -> dict:
+    """
+    Get the info about the children of a component.
+    The subtree of a file and configuration is traversed once, its components are
+    counted again and its tree copied for the next instances.
+    """
+    # The virtual components have no file to identify them
+    sw_path = sw_comp.GetPathName if traversal is not None else None
+    if not sw_path:
+        return complete_info_on_list(sw_comp.GetChildren, dict_of_comp, traversal)
+    if traversal.dependencies is not None and not has_children(sw_comp, traversal):
+        return {}
+
+    key = (os.path.normcase(sw_path), sw_comp.ReferencedConfiguration)
+    if key in traversal.subtrees:
+        children, visits = traversal.subtrees[key]
+        for name, number in visits.items():
+            dict_of_comp[name].number += number
+        traversal.visits.extend(visits.items())
+        traversal.hits += 1
+        return copy_tree(children)
+
+    start = len(traversal.visits)
+    children = complete_info_on_list(sw_comp.GetChildren, dict_of_comp, traversal)
+    visits = {}
+    for name, number in traversal.visits[start:]:
+        visits[name] = visits.get(name, 0) + number
+    traversal.subtrees[key] = (copy_tree(children), visits)
+    return children
+
+
+def read_mass(sw_comp, sw_comp_name: str, traversal: StatTraversal | None = None):
+    """
+    Get the mass and density of a component from the cache or from its document.
+    In lightweight mode, the masses missing from the cache are resolved later.
+    Only the masses of the parts are cached, the mass of an assembly changing with its
+    components.
+    """
+    mass_cache = traversal.mass_cache if traversal is not None else None
+    lightweight = traversal is not None and traversal.dependencies is not None
+    sw_path = sw_comp.GetPathName if mass_cache is not None or lightweight else None
+    if sw_path and is_assembly(sw_path):
+        mass_cache = None
+    if sw_path and mass_cache is not None:
+        cached = mass_cache.get(sw_path, sw_comp.ReferencedConfiguration)
+        if cached is not None:
+            return cached
+    if sw_path and lightweight:
+        key = (sw_path, sw_comp.ReferencedConfiguration)
+        traversal.pending.setdefault(key, []).append(sw_comp_name)
+        return 0, 0
+
+    sw_mass = 0
+    sw_density = 0
+    # set the configuration
+    sw_comp_doc = sw_comp.GetModelDoc2
+    if sw_comp_doc is not None:
+        sw_comp_doc.ShowConfiguration2(sw_comp.ReferencedConfiguration)
+        # Get extension manager
+        sw_comp_doc_ext = sw_comp_doc.Extension
+        sw_mass_property = sw_comp_doc_ext.CreateMassProperty2
+
+        # Get mass and density
+        sw_mass = sw_mass_property.Mass if sw_mass_property is not None else 0
+        sw_density = sw_mass_property.Density if sw_mass_property is not None else 0
+        if sw_path and mass_cache is not None:
+            mass_cache.put(
+                sw_path, sw_comp.ReferencedConfiguration, sw_mass, sw_density
+            )
+    else:
+        click.echo(f"Could not evaluate {sw_comp_name}")
+    return sw_mass, sw_density
+
+
+def resolve_pending_masses(sw_app, dict_of_comp: dict, traversal: StatTraversal):
+    """
+    Open the documents whose mass is missing in their configuration, read only, to get
+    their mass and density. The assemblies are always opened.
+    """
+    for (sw_path, sw_conf), names in traversal.pending.items():
+        sw_doc = sw_app.OpenDoc6(
+            sw_path,
+            get_type_file(sw_path),
+            OPEN_SILENT | OPEN_READ_ONLY,
+            sw_conf,
+            get_byref_int(),
+            get_byref_int(),
+        )
+        if sw_doc is None:
+            for name in names:
+                click.echo(f"Could not evaluate {name}")
+            continue
+
+        # A document already opened keeps its configuration
+        sw_doc.ShowConfiguration2(sw_conf)
+        sw_mass_property = sw_doc.Extension.CreateMassProperty2
+        sw_mass = sw_mass_property.Mass if sw_mass_property is not None else 0
+        sw_density = sw_mass_property.Density if sw_mass_property is not None else 0
+        for name in names:
+            dict_of_comp[name].mass = sw_mass
+            dict_of_comp[name].density = sw_density
+        if traversal.mass_cache is not None and not is_assembly(sw_path):
+            traversal.mass_cache.put(sw_path, sw_conf, sw_mass, sw_density)
+        sw_app.CloseDoc(os.path.basename(sw_path))
+    traversal.pending = {}
+
+
+def complete_info_assembly(
+    sw_comp, dict_of_comp: dict, traversal: StatTraversal | None = None
+) -> dict:
     """
     Get all the information from an assembly
     """
@@ -451,40 +622,27 @@ def complete_info_assembly(sw_comp, dict_of_comp: dict) -> dict:
     if sw_comp_name in dict_of_comp:
         dict_of_comp[sw_comp_name].number += 1
     else:
-        sw_mass = 0
-        sw_density = 0
-        # set the configuration
-        sw_comp_doc = sw_comp.GetModelDoc2
-        if sw_comp_doc is not None:
-            sw_comp_doc.ShowConfiguration2(sw_comp.ReferencedConfiguration)
-            # Get extension manager
-            sw_comp_doc_ext = sw_comp_doc.Extension
-            sw_mass_property = sw_comp_doc_ext.CreateMassProperty2
-
-            # Get mass and density
-            sw_mass = sw_mass_property.Mass if sw_mass_property is not None else 0
-            sw_density = sw_mass_property.Density if sw_mass_property is not None else 0
-        else:
-            click.echo(f"Could not evaluate {sw_comp_name}")
+        sw_mass, sw_density = read_mass(sw_comp, sw_comp_name, traversal)
 
         print(sw_comp_name)
         # Create an new entity in the general dict
-        sw_comp_children = sw_comp.GetChildren
         dict_of_comp[sw_comp_name] = StatComponent(
             mass=sw_mass,
             density=sw_density,
             number=1,
             typeComponent=(
                 TypeComponent.ASSEMBLY
-                if sw_comp_children is not None and len(sw_comp_children) > 0
+                if has_children(sw_comp, traversal)
                 else TypeComponent.PART
             ),
             numberDrawing=0,
         )
 
+    if traversal is not None:
+        traversal.visits.append((sw_comp_name, 1))
+
     # Get info about children
-    sw_comp_children = sw_comp.GetChildren
-    children = complete_info_on_list(sw_comp_children, dict_of_comp)
+    children = complete_info_children(sw_comp, dict_of_comp, traversal)
 
     # Create the entry in the tree dict
     return StatComponentTree(
@@ -521,6 +679,28 @@ def complete_info_assembly(sw_comp, dict_of_comp: dict) -> dict:
     default=TypeComponent.ALL,
 )
 @click.option("--only-default-density", "only_default_density", is_flag=True)
+@click.option(
+    "--no-cache",
+    "no_cache",
+    is_flag=True,
+    default=False,
+    help="Evaluate the mass of each component without the cache.",
+)
+@click.option(
+    "--refresh-cache",
+    "refresh_cache",
+    is_flag=True,
+    default=False,
+    help="Evaluate the mass of each component again and update the cache.",
+)
+@click.option(
+    "--lightweight",
+    "lightweight",
+    is_flag=True,
+    default=False,
+    help="Load the components lightweight, only open the files missing from the cache.",
+)
+# pylint: disable=too-many-arguments,too-many-locals
 def stat(
     input_path: str,
     export: TypeExport,
@@ -528,6 +708,9 @@ def stat(
     type_sort: TypeSort,
     type_component: TypeComponent,
     only_default_density: bool,
+    no_cache: bool,
+    refresh_cache: bool,
+    lightweight: bool,
 ) -> None:
     """
     Display stat about an assembly
@@ -540,7 +723,10 @@ def stat(
         click.echo(f"{input_path} is not an assembly file")
         return
 
-    sw_app, sw_doc, filename = open_app_and_file(input_path)
+    options = OPEN_SILENT
+    if lightweight:
+        options |= OPEN_OVERRIDE_DEFAULT_LIGHTWEIGHT | OPEN_LOAD_LIGHTWEIGHT
+    sw_app, sw_doc, filename = open_app_and_file(input_path, options)
 
     # Get list of components
     sw_comps = sw_doc.GetComponents(True)
@@ -557,12 +743,21 @@ def stat(
         )
     }
 
-    tree_of_comp = {
-        assembly_name: StatComponentTree(
-            number=1,
-            children=complete_info_on_list(sw_comps, dict_of_comp),
-        )
-    }
+    traversal = StatTraversal(
+        mass_cache=None if no_cache else open_mass_cache(read=not refresh_cache),
+        dependencies=get_dependencies(sw_app, input_path) if lightweight else None,
+    )
+    try:
+        tree_of_comp = {
+            assembly_name: StatComponentTree(
+                number=1,
+                children=complete_info_on_list(sw_comps, dict_of_comp, traversal),
+            )
+        }
+        resolve_pending_masses(sw_app, dict_of_comp, traversal)
+    finally:
+        if traversal.mass_cache is not None:
+            traversal.mass_cache.close()
 
     fill_drawing_dependencies(sw_app, input_path, dict_of_comp)
 
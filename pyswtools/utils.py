@@ -2,21 +2,40 @@
 Module of generic functions
 """
 
+import ctypes
+import hashlib
 import platform
 import click
-import ctypes
+
+from .backends import get_backend
+
+HASH_CHUNK_SIZE = 1 << 20
 
 
 def check_system_verbose() -> bool:
     """
-    Check if the system is windows otherwise print a message
+    Check if the backend can reach solidworks otherwise print a message
     """
-    if platform.system() != "Windows":
+    if not get_backend().is_available():
         click.echo("Sorry but you need windows to execute this function")
+        click.echo(
+            "On other systems, use a description of the documents with --backend fake"
+        )
         return False
     return True
 
 
+def hash_file(path: str) -> str:
+    """
+    Get the sha256 hash of the content of a file
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
 def check_system() -> bool:
     """
     Check if the system is windows